@@ -13,31 +13,3344 @@ Select the mode 'load' to set the relevant exe and vst as the active version
 Select the mode 'store' to save the currently active versions for future loading.
 Select the mode 'read' to see what version is currently loaded.
 
+Run with arguments to use it from the command line instead, for example
+    "Kontakt Version Manager.exe" load 8.0.0 --output result.json
+    "Kontakt Version Manager.exe" batch operations.txt --output results.json
+
 Make sure that the correct version of Kontakt is selected.
 
-Here is the working command for pyinstaller that successfully compiles the program wihtout using th spec file:
-pyinstaller --onefile --noconsole --uac-admin --clean --icon "kvm_icon.ico" --manifest "Kontakt Version Manager.exe.manifest" --version-file "version_info.txt" --name "Kontakt Version Manager" Kontakt_Version_Manager.py
-'''
+Here is the working command for pyinstaller that successfully compiles the program wihtout using th spec file:
+pyinstaller --onefile --noconsole --uac-admin --clean --icon "kvm_icon.ico" --manifest "Kontakt Version Manager.exe.manifest" --version-file "version_info.txt" --name "Kontakt Version Manager" Kontakt_Version_Manager.py
+'''
+
+# ----------------------------------------------------------------------------------]
+# Imports
+
+from appdirs import user_config_dir
+import os
+import shutil
+from colorama import Fore, Style
+import configparser
+import webbrowser
+import hashlib
+import json
+import re
+import sys
+import time
+import zlib
+import lzma
+import bz2
+import struct
+import queue
+import threading
+import mmap
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+import argparse
+import shlex
+import http.client
+import urllib.parse
+
+# ----------------------------------------------------------------------------------]
+# Options
+
+APP_NAME             = 'Kontakt Version Manager'
+APP_AUTHOR           = 'Its All Noise'     
+CONFIG_SECTION       = "Settings"
+VERSIONS_SECTION     = "Versions"
+PROFILES_SECTION     = "Profiles"
+PINNED_SECTION       = "Pinned"
+KONTAKT_VERSIONS     = [5, 6, 7, 8]
+END                  = "end"     # tkinter.END, so operations can write output without importing tkinter
+
+# Library storage formats.  'files' keeps a full 'Kontakt <version><ext>' copy per version,
+# 'chunked' splits each binary into content-defined chunks that are shared between versions,
+# 'compressed' keeps the most recently used versions as files and compresses the others,
+# 'delta' stores each version as a binary patch against its nearest stored neighbour.
+STORAGE_MODES        = ["files", "chunked", "compressed", "delta"]
+CHUNK_STORE_DIR      = ".kvm_store"
+CHUNK_MIN_SIZE       = 128 * 1024
+CHUNK_MAX_SIZE       = 4 * 1024 * 1024
+CHUNK_WINDOW         = 64
+CHUNK_MASK           = 0x3FF
+READ_BUFFER_SIZE     = 8 * 1024 * 1024
+
+# Candidate chunk boundaries are found with a cheap byte pattern, then accepted only when the
+# hash of the preceding window matches CHUNK_MASK.  Both only depend on local content, so an
+# insertion early in a binary only moves the boundaries around it.
+CHUNK_ANCHOR         = re.compile(rb'[\x10-\x1f][\x80-\x8f]')
+
+# ioctl request number of FICLONE on Linux (btrfs, xfs, bcachefs ...)
+FICLONE              = 0x40049409
+
+# ----------------------------------------------------------------------------------]
+# Copy Engine
+
+def clone_file(source_fd, dest_fd):
+    """
+    Makes dest_fd share the data blocks of source_fd.  Only supported by copy-on-write
+    filesystems, raises OSError everywhere else.
+    """
+    if not sys.platform.startswith("linux"):
+        raise OSError("File cloning is not available on this platform")
+    import fcntl
+    fcntl.ioctl(dest_fd, FICLONE, source_fd)
+
+def copy_file_descriptors(source_fd, dest_fd, size, progress=None, stream_hash=None):
+    """
+    Copies size bytes between two open files, trying reflink, copy_file_range, sendfile and
+    a buffered stream in that order.  A primitive that fails part way is picked up by the
+    next one from the same offset.  Returns the name of the primitive that finished the copy.
+
+    progress(copied, size) is called between blocks and may raise to abandon the copy.
+    stream_hash, when given, is updated with the whole file in the same pass: the buffered
+    stream hashes what it writes, and behind a kernel primitive each block is read from the
+    source right after it was copied, while it is still in the page cache.  The destination
+    is never read back.
+    """
+    hashed = 0
+
+    def hash_source(end):
+        nonlocal hashed
+        os.lseek(source_fd, hashed, os.SEEK_SET)
+        while hashed < end:
+            block = os.read(source_fd, min(end - hashed, READ_BUFFER_SIZE))
+            if not block:
+                break
+            stream_hash.update(block)
+            hashed += len(block)
+            if progress and end == size:
+                progress(hashed, size)
+
+    try:
+        clone_file(source_fd, dest_fd)
+        cloned = True
+    except OSError:
+        cloned = False
+    if cloned:
+        # No data moved, so the hash costs a read of the source only
+        if stream_hash is not None:
+            hash_source(size)
+        elif progress:
+            progress(size, size)
+        return "reflink"
+
+    copied = 0
+    if hasattr(os, "copy_file_range"):
+        try:
+            while copied < size:
+                sent = os.copy_file_range(source_fd, dest_fd, min(size - copied, READ_BUFFER_SIZE), copied, copied)
+                if sent == 0:
+                    break
+                copied += sent
+                if stream_hash is not None:
+                    hash_source(copied)
+                if progress:
+                    progress(copied, size)
+            if copied >= size:
+                return "copy_file_range"
+        except OSError:
+            pass
+
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        try:
+            os.lseek(dest_fd, copied, os.SEEK_SET)
+            while copied < size:
+                sent = os.sendfile(dest_fd, source_fd, copied, min(size - copied, READ_BUFFER_SIZE))
+                if sent == 0:
+                    break
+                copied += sent
+                if stream_hash is not None:
+                    hash_source(copied)
+                if progress:
+                    progress(copied, size)
+            if copied >= size:
+                return "sendfile"
+        except OSError:
+            pass
+
+    if stream_hash is not None and hashed < copied:
+        # A primitive failed between copying a block and hashing it
+        hash_source(copied)
+    os.lseek(source_fd, copied, os.SEEK_SET)
+    os.lseek(dest_fd, copied, os.SEEK_SET)
+    while True:
+        block = os.read(source_fd, READ_BUFFER_SIZE)
+        if not block:
+            break
+        if stream_hash is not None:
+            stream_hash.update(block)
+        view = memoryview(block)
+        while view:
+            view = view[os.write(dest_fd, view):]
+        copied += len(block)
+        if progress:
+            progress(copied, size)
+    return "stream"
+
+def get_part_path(path):
+    """
+    Returns a temporary name next to path that is unique to the calling thread.
+    """
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.kvm-part"
+
+def remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def copy_file_fast(source, destination, progress=None, stream_hash=None):
+    """
+    Copies source over destination with the cheapest primitive the platform and filesystem
+    allow, keeping metadata like shutil.copy2.  Returns the name of the method used.
+
+    The copy is written next to destination and renamed over it at the end, so a failed or
+    cancelled copy leaves the previous file untouched.  stream_hash is passed on to
+    copy_file_descriptors.
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+    part_path = get_part_path(destination)
+
+    try:
+        method = None
+        if os.name == "nt" and stream_hash is None:
+            # CopyFile2 block clones on ReFS / Dev Drive volumes and is the native copy elsewhere.
+            # It runs as a single call, so progress is only reported once it is done, and a
+            # copy that has to be hashed goes through copy_file_descriptors instead.
+            try:
+                import _winapi
+                if progress:
+                    progress(0, os.path.getsize(source))
+                _winapi.CopyFile2(source, part_path, 0)
+                method = "CopyFile2"
+                if progress:
+                    progress(os.path.getsize(source), os.path.getsize(source))
+            except (ImportError, AttributeError, OSError):
+                pass
+
+        if method is None:
+            with open(source, "rb") as src, open(part_path, "wb") as dst:
+                size = os.fstat(src.fileno()).st_size
+                method = copy_file_descriptors(src.fileno(), dst.fileno(), size, progress, stream_hash)
+            shutil.copystat(source, part_path)
+
+        os.replace(part_path, destination)
+        return method
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+def copy_file_hashed(source, destination, progress=None):
+    """
+    Copies source over destination with copy_file_fast and returns the content hash of the
+    copy along with the method used.  The hash is taken in the same pass as the copy, so the
+    new copy, usually on the library share, is never read back.  Behind a kernel primitive
+    the source is read alongside the copy, which is a local read of blocks just copied, and
+    on Windows the copy goes through the descriptor path rather than CopyFile2.
+    """
+    file_hash = new_content_hash()
+    method = copy_file_fast(source, destination, progress, file_hash)
+    return file_hash.hexdigest(), method
+
+# ----------------------------------------------------------------------------------]
+# Chunk Store
+
+def new_content_hash():
+    """
+    Returns the hash object used for every content hash in the library.
+    """
+    return hashlib.blake2b(digest_size=32)
+
+def find_chunk_boundary(buffer, end):
+    """
+    Returns the length of the next chunk at the start of buffer.
+    """
+    if end <= CHUNK_MIN_SIZE:
+        return end
+
+    limit = min(end, CHUNK_MAX_SIZE)
+    for match in CHUNK_ANCHOR.finditer(buffer, CHUNK_MIN_SIZE, limit):
+        position = match.end()
+        if not zlib.crc32(buffer[position - CHUNK_WINDOW:position]) & CHUNK_MASK:
+            return position
+    return limit
+
+def iter_content_chunks(file_obj):
+    """
+    Yields the content-defined chunks of an open binary file, reading it as a stream.
+    """
+    buffer = bytearray()
+    end_of_file = False
+    while True:
+        # Keep at least one maximum sized chunk buffered so every cut sees the same window
+        while not end_of_file and len(buffer) < CHUNK_MAX_SIZE:
+            block = file_obj.read(READ_BUFFER_SIZE)
+            if not block:
+                end_of_file = True
+            buffer += block
+        if not buffer:
+            return
+        cut = find_chunk_boundary(buffer, len(buffer))
+        yield bytes(buffer[:cut])
+        del buffer[:cut]
+
+def get_chunk_store_path(library_path):
+    return os.path.join(library_path, CHUNK_STORE_DIR)
+
+def get_chunk_path(library_path, chunk_hash):
+    return os.path.join(get_chunk_store_path(library_path), "chunks", chunk_hash[:2], chunk_hash)
+
+def get_manifest_path(library_path, file_name):
+    return os.path.join(get_manifest_dir(library_path), f"{file_name}.json")
+
+def get_manifest_dir(library_path):
+    return os.path.join(get_chunk_store_path(library_path), "manifests")
+
+def write_file_atomic(path, data):
+    """
+    Writes data next to path and renames it into place, so readers never see a partial file.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = get_part_path(path)
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        remove_quietly(temp_path)
+        raise
+
+def store_file_chunked(source_path, library_path, file_name, progress=None):
+    """
+    Splits source_path into chunks, writes the chunks the store does not hold yet and
+    records a manifest for file_name.  Returns (chunk count, new chunks, bytes written).
+    """
+    manifest, new_chunks, bytes_written = write_file_chunks(source_path, library_path, progress)
+    manifest = {"name": file_name, **manifest}
+    # The manifest goes last, so a version only appears once all of its chunks are present
+    write_file_atomic(get_manifest_path(library_path, file_name), json.dumps(manifest).encode("utf-8"))
+    return len(manifest["chunks"]), new_chunks, bytes_written
+
+def write_file_chunks(source_path, library_path, progress=None):
+    """
+    Splits source_path into chunks and writes the ones the store does not hold yet.
+    Returns (manifest without a name, new chunks, bytes written).
+    """
+    file_hash = new_content_hash()
+    chunks = []
+    new_chunks = 0
+    bytes_written = 0
+    size = os.path.getsize(source_path)
+    stored = 0
+
+    with open(source_path, "rb") as f:
+        for chunk in iter_content_chunks(f):
+            file_hash.update(chunk)
+            chunk_hash = new_content_hash()
+            chunk_hash.update(chunk)
+            chunk_hash = chunk_hash.hexdigest()
+            chunks.append([chunk_hash, len(chunk)])
+
+            chunk_path = get_chunk_path(library_path, chunk_hash)
+            if not os.path.exists(chunk_path):
+                write_file_atomic(chunk_path, chunk)
+                new_chunks += 1
+                bytes_written += len(chunk)
+            stored += len(chunk)
+            if progress:
+                progress(stored, size)
+
+    manifest = {
+        "size": sum(length for _, length in chunks),
+        "mtime": os.path.getmtime(source_path),
+        "hash": file_hash.hexdigest(),
+        "chunks": chunks,
+    }
+    return manifest, new_chunks, bytes_written
+
+def restore_file_chunked(library_path, file_name, destination, progress=None):
+    """
+    Rebuilds file_name from its manifest into destination, checking the result against the
+    hash recorded at store time.
+    """
+    with open(get_manifest_path(library_path, file_name), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    restore_chunks(library_path, manifest, destination, progress)
+
+def restore_chunks(library_path, manifest, destination, progress=None):
+    """
+    Writes the chunks listed in a manifest to destination and checks the result.
+    """
+    file_name = manifest["name"]
+    file_hash = new_content_hash()
+    part_path = get_part_path(destination)
+    restored = 0
+    try:
+        with open(part_path, "wb") as out:
+            for chunk_hash, length in manifest["chunks"]:
+                with open(get_chunk_path(library_path, chunk_hash), "rb") as chunk_file:
+                    chunk = chunk_file.read()
+                if len(chunk) != length:
+                    raise IOError(f"Chunk {chunk_hash} of {file_name} is damaged")
+                file_hash.update(chunk)
+                out.write(chunk)
+                restored += length
+                if progress:
+                    progress(restored, manifest["size"])
+
+        if file_hash.hexdigest() != manifest["hash"]:
+            raise IOError(f"{file_name} does not match its stored hash")
+        os.utime(part_path, (manifest["mtime"], manifest["mtime"]))
+        os.replace(part_path, destination)
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+# ----------------------------------------------------------------------------------]
+# Compressed Storage
+
+# A compressed library entry is 'Kontakt <version><ext>.kvmz': a fixed size JSON header
+# holding the codec, original size, hash and mtime, followed by the compressed stream.
+COMPRESSED_SUFFIX        = ".kvmz"
+COMPRESSED_MAGIC         = b"KVMZ1\n"
+COMPRESSED_HEADER_SIZE   = 512
+
+# Any codec with streaming compressor / decompressor objects in the style of zlib or lzma
+# can be added here
+COMPRESSION_CODECS = {
+    "lzma": {"compressor": lambda: lzma.LZMACompressor(preset=6), "decompressor": lzma.LZMADecompressor},
+    "zlib": {"compressor": lambda: zlib.compressobj(6), "decompressor": zlib.decompressobj},
+    "bz2":  {"compressor": lambda: bz2.BZ2Compressor(9), "decompressor": bz2.BZ2Decompressor},
+}
+
+def get_compressed_path(library_path, file_name):
+    return os.path.join(library_path, f"{file_name}{COMPRESSED_SUFFIX}")
+
+def read_compressed_header(path):
+    with open(path, "rb") as f:
+        header = f.read(COMPRESSED_HEADER_SIZE)
+    if not header.startswith(COMPRESSED_MAGIC):
+        raise IOError(f"{os.path.basename(path)} is not a compressed library entry")
+    return json.loads(header[len(COMPRESSED_MAGIC):].decode("utf-8"))
+
+def compress_file(source_path, compressed_path, codec_name, progress=None):
+    """
+    Compresses source_path into compressed_path block by block.  Returns the compressed size.
+    """
+    codec = COMPRESSION_CODECS[codec_name]
+    compressor = codec["compressor"]()
+    file_hash = new_content_hash()
+    size = os.path.getsize(source_path)
+    compressed = 0
+    part_path = get_part_path(compressed_path)
+    try:
+        with open(source_path, "rb") as src, open(part_path, "wb") as out:
+            # The header is only known at the end, so space is left for it
+            out.write(b" " * COMPRESSED_HEADER_SIZE)
+            while True:
+                block = src.read(READ_BUFFER_SIZE)
+                if not block:
+                    break
+                file_hash.update(block)
+                out.write(compressor.compress(block))
+                compressed += len(block)
+                if progress:
+                    progress(compressed, size)
+            out.write(compressor.flush())
+            compressed_size = out.tell()
+
+            header = {"codec": codec_name, "size": size, "hash": file_hash.hexdigest(),
+                      "mtime": os.path.getmtime(source_path)}
+            header = COMPRESSED_MAGIC + json.dumps(header).encode("utf-8")
+            out.seek(0)
+            out.write(header.ljust(COMPRESSED_HEADER_SIZE - 1) + b"\n")
+        os.replace(part_path, compressed_path)
+        return compressed_size
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+def iter_decompressed(decompressor, file_obj):
+    """
+    Yields the output of a streaming decompressor in blocks of at most READ_BUFFER_SIZE,
+    so highly compressed data never expands into one large buffer.
+    """
+    pending = b""
+    while not decompressor.eof:
+        # zlib returns unused input in unconsumed_tail, lzma and bz2 keep it internally
+        if (decompressor.needs_input if hasattr(decompressor, "needs_input") else not pending):
+            pending = file_obj.read(READ_BUFFER_SIZE)
+            if not pending:
+                raise IOError("Compressed data ends unexpectedly")
+        yield decompressor.decompress(pending, READ_BUFFER_SIZE)
+        pending = getattr(decompressor, "unconsumed_tail", b"")
+
+def decompress_file(compressed_path, destination, progress=None):
+    """
+    Streams a compressed library entry into destination, checking it against the hash
+    recorded when it was compressed.
+    """
+    header = read_compressed_header(compressed_path)
+    decompressor = COMPRESSION_CODECS[header["codec"]]["decompressor"]()
+    file_hash = new_content_hash()
+    written = 0
+    part_path = get_part_path(destination)
+    try:
+        with open(compressed_path, "rb") as src, open(part_path, "wb") as out:
+            src.seek(COMPRESSED_HEADER_SIZE)
+            for block in iter_decompressed(decompressor, src):
+                file_hash.update(block)
+                out.write(block)
+                written += len(block)
+                if progress:
+                    progress(written, header["size"])
+
+        if written != header["size"] or file_hash.hexdigest() != header["hash"]:
+            raise IOError(f"{os.path.basename(compressed_path)} does not match its stored hash")
+        os.utime(part_path, (header["mtime"], header["mtime"]))
+        os.replace(part_path, destination)
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+def get_usage_path(library_path):
+    return os.path.join(get_chunk_store_path(library_path), "usage.json")
+
+USAGE_LOCK = threading.Lock()
+
+def load_library_usage(library_path):
+    """
+    Returns {library name: time it was last loaded}.
+    """
+    try:
+        with open(get_usage_path(library_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def record_library_use(library_path, file_name):
+    with USAGE_LOCK:
+        usage = load_library_usage(library_path)
+        usage[file_name] = time.time()
+        write_file_atomic(get_usage_path(library_path), json.dumps(usage).encode("utf-8"))
+
+def get_compression_tier_path(library_path):
+    return os.path.join(get_chunk_store_path(library_path), "compressed.json")
+
+def load_compression_tier(library_path):
+    """
+    Returns the names of the versions stored with 'compressed' storage.  Only these are
+    ever compressed, so versions stored as plain files stay plain.
+    """
+    try:
+        with open(get_compression_tier_path(library_path), "r", encoding="utf-8") as f:
+            return set(json.load(f))
+    except (OSError, ValueError):
+        return set()
+
+def add_to_compression_tier(library_path, file_name):
+    with USAGE_LOCK:
+        names = load_compression_tier(library_path)
+        names.add(file_name)
+        write_file_atomic(get_compression_tier_path(library_path), json.dumps(sorted(names)).encode("utf-8"))
+
+def apply_compression_policy(library_path, codec_name, keep_uncompressed, text_widget):
+    """
+    Keeps the keep_uncompressed most recently loaded versions of each Kontakt and file type
+    as plain files for fast loading and compresses the rest.  A compressed version that has
+    become one of the most recently used is expanded again.  Only the versions stored with
+    'compressed' storage take part.
+    """
+    index = get_library_index(library_path)
+    usage = load_library_usage(library_path)
+    tier = load_compression_tier(library_path)
+
+    groups = {}
+    for name, entry in index.entries.items():
+        if entry["format"] == "compressed" or (entry["format"] == "files" and name in tier):
+            groups.setdefault((entry["major"], entry["extension"]), []).append(name)
+
+    try:
+        for names in groups.values():
+            # Most recently loaded first, newest version first among those never loaded
+            names.sort(key=lambda name: (usage.get(name, 0), version_sort_key(index.entries[name]["version"])), reverse=True)
+            for position, name in enumerate(names):
+                entry = index.entries[name]
+                plain_path = os.path.join(library_path, name)
+                compressed_path = get_compressed_path(library_path, name)
+                progress = make_progress_callback(text_widget, name)
+
+                if position >= keep_uncompressed and entry["format"] == "files":
+                    compressed_size = compress_file(plain_path, compressed_path, codec_name, progress)
+                    os.remove(plain_path)
+                    record_library_checksums(library_path, {name: None})
+                    text_widget.insert(END,f"\n{name} compressed to {compressed_size / 1048576:.1f} MB ({codec_name})")
+                elif position < keep_uncompressed and entry["format"] == "compressed":
+                    decompress_file(compressed_path, plain_path, progress)
+                    record_library_checksums(library_path, {name: read_compressed_header(compressed_path)["hash"]})
+                    os.remove(compressed_path)
+                    text_widget.insert(END,f"\n{name} expanded for fast loading")
+    except OperationCancelled:
+        text_widget.insert(END,"\nCompressing the library cancelled")
+    except Exception as e:
+        text_widget.insert(END,f"\nFailed to compress the library. Error: {e}\n")
+    finally:
+        index.invalidate()
+
+def measure_compression(path, text_widget):
+    """
+    Compresses and expands path with every codec and reports the ratio and throughput.
+    """
+    size = os.path.getsize(path)
+    megabytes = size / 1048576
+    text_widget.insert(END,f"\n{os.path.basename(path)} ({megabytes:.1f} MB):")
+    temp_dir = tempfile.mkdtemp(prefix="kvm-")
+    try:
+        for codec_name in COMPRESSION_CODECS:
+            compressed_path = os.path.join(temp_dir, f"measure{COMPRESSED_SUFFIX}")
+            started = time.perf_counter()
+            compressed_size = compress_file(path, compressed_path, codec_name)
+            compress_seconds = time.perf_counter() - started
+
+            started = time.perf_counter()
+            decompress_file(compressed_path, os.path.join(temp_dir, "measure"))
+            decompress_seconds = time.perf_counter() - started
+
+            text_widget.insert(END,f"\n    {codec_name}: ratio {size / max(compressed_size, 1):.2f}, "
+                                      f"compress {megabytes / max(compress_seconds, 1e-9):.1f} MB/s, "
+                                      f"decompress {megabytes / max(decompress_seconds, 1e-9):.1f} MB/s")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+# ----------------------------------------------------------------------------------]
+# Library Index
+
+# Library file extensions and the target type they hold
+LIBRARY_TYPES = {".exe": "exe", ".vst3": "vst", ".dll": "vst", ".aaxplugin": "aax"}
+
+def parse_library_name(file_name):
+    """
+    Splits 'Kontakt <version><ext>' into (version, extension), or returns None for any
+    other file name.
+    """
+    if not file_name.startswith("Kontakt "):
+        return None
+    version, extension = os.path.splitext(file_name[len("Kontakt "):])
+    if extension not in LIBRARY_TYPES or not version:
+        return None
+    return version, extension
+
+def version_sort_key(version):
+    """
+    Orders version strings numerically, so 8.10.0 sorts after 8.9.1.
+    """
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.findall(r"\d+|[^\d.\s]+", version)]
+
+def hash_file(path, progress=None):
+    """
+    Returns the content hash of a file, read as a stream.
+    """
+    file_hash = new_content_hash()
+    size = os.path.getsize(path)
+    hashed = 0
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_BUFFER_SIZE)
+            if not block:
+                break
+            file_hash.update(block)
+            hashed += len(block)
+            if progress:
+                progress(hashed, size)
+    return file_hash.hexdigest()
+
+class FingerprintCache:
+    """
+    Content hashes of files, kept in the config directory and keyed by path, size and
+    mtime.  A file is only read again once its size or mtime changes, so checking an
+    unchanged file costs a single stat.
+    """
+    def __init__(self):
+        self.cache_path = os.path.join(get_config_dir(), "fingerprints.json")
+        self.lock = threading.RLock()
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def save(self):
+        with self.lock:
+            write_file_atomic(self.cache_path, json.dumps(self.cache).encode("utf-8"))
+
+    def lookup(self, path, stat=None):
+        """
+        Returns the cached hash of path, or None when the file changed since it was hashed.
+        """
+        stat = stat or os.stat(path)
+        with self.lock:
+            cached = self.cache.get(os.path.abspath(path))
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+            return cached["hash"]
+        return None
+
+    def record(self, path, content_hash, stat=None, save=True):
+        """
+        Remembers content_hash for the current size and mtime of path, e.g. after copying
+        a file whose hash is already known.
+        """
+        stat = stat or os.stat(path)
+        with self.lock:
+            self.cache[os.path.abspath(path)] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": content_hash}
+            if save:
+                self.save()
+
+    def content_hash(self, path, progress=None, save=True):
+        """
+        Returns the content hash of path, from the cache when the file is unchanged.
+        """
+        stat = os.stat(path)
+        content_hash = self.lookup(path, stat)
+        if content_hash is None:
+            content_hash = hash_file(path, progress)
+            self.record(path, content_hash, stat, save)
+        return content_hash
+
+FINGERPRINT_CACHE = None
+FINGERPRINT_CACHE_LOCK = threading.Lock()
+
+def get_fingerprint_cache():
+    global FINGERPRINT_CACHE
+    with FINGERPRINT_CACHE_LOCK:
+        if FINGERPRINT_CACHE is None:
+            FINGERPRINT_CACHE = FingerprintCache()
+        return FINGERPRINT_CACHE
+
+def is_already_current(index, file_name, destination, progress=None):
+    """
+    True when destination already holds the content of library entry file_name.  Sizes
+    are compared first, so a hash is only needed when they agree, and both hashes are cached.
+    """
+    entry = index.find(file_name)
+    try:
+        stat = os.stat(destination)
+    except OSError:
+        return False
+    if stat.st_size != entry["size"]:
+        return False
+    return get_fingerprint_cache().content_hash(destination, progress) == index.content_hash(file_name)
+
+class LibraryIndex:
+    """
+    On-disk index of one version library, kept in the config directory.
+
+    Each entry records the parsed version, type, size, mtime, storage format and content
+    hash of a library version.  A refresh only stats the library directories; a directory
+    is only listed again when its mtime has changed, so lookups on a slow network share
+    stay cheap no matter how many versions the library holds.
+    """
+    def __init__(self, library_path):
+        self.library_path = library_path
+        self.lock = threading.RLock()
+        name = hashlib.blake2b(os.path.abspath(library_path).encode("utf-8"), digest_size=8).hexdigest()
+        self.index_path = os.path.join(get_config_dir(), f"library_index_{name}.json")
+        # Plain files come last so they win over a manifest of the same name, as when loading
+        self.formats = {get_manifest_dir(library_path): "chunked", library_path: "files"}
+        self.directories = {}
+        self.scanned = {}
+        self.entries = {}
+        self.available = False
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.directories = data["directories"]
+            self.scanned = data["scanned"]
+            self.merge()
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self):
+        data = {"library": self.library_path, "directories": self.directories, "scanned": self.scanned}
+        write_file_atomic(self.index_path, json.dumps(data).encode("utf-8"))
+
+    def merge(self):
+        self.entries = {}
+        for directory in self.formats:
+            self.entries.update(self.scanned.get(directory, {}))
+
+    def scan_directory(self, directory, storage_format):
+        """
+        Lists one library directory, reusing the entries whose size and mtime are unchanged.
+        """
+        previous = self.scanned.get(directory, {})
+        found = {}
+        for item in os.scandir(directory):
+            name = item.name
+            entry_format = storage_format
+            if item.is_dir():
+                if storage_format != "files" or not name.endswith(BUNDLE_EXTENSIONS):
+                    continue
+                entry_format = "bundle"
+            elif storage_format == "chunked":
+                if not name.endswith(".json"):
+                    continue
+                name = name[:-len(".json")]
+            elif name.endswith(COMPRESSED_SUFFIX):
+                name = name[:-len(COMPRESSED_SUFFIX)]
+                entry_format = "compressed"
+            elif name.endswith(DELTA_SUFFIX):
+                name = name[:-len(DELTA_SUFFIX)]
+                entry_format = "delta"
+            parsed = parse_library_name(name)
+            # A plain file or bundle wins over a compressed or delta copy of the same version
+            if parsed is None or (name in found and found[name]["format"] in ("files", "bundle")):
+                continue
+
+            stat = item.stat()
+            known = previous.get(name)
+            if known and known["format"] == entry_format and known["mtime"] == stat.st_mtime_ns:
+                found[name] = known
+                continue
+
+            major = re.match(r"\d+", parsed[0])
+            entry = {"version": parsed[0], "major": int(major.group()) if major else None,
+                     "extension": parsed[1], "type": LIBRARY_TYPES[parsed[1]],
+                     "format": entry_format, "size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": None}
+            if entry_format == "chunked":
+                with open(item.path, "r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+                entry["size"] = manifest["size"]
+                entry["hash"] = manifest["hash"]
+            elif entry_format in ("compressed", "delta"):
+                header = read_compressed_header(item.path) if entry_format == "compressed" else read_delta_header(item.path)
+                entry["size"] = header["size"]
+                entry["hash"] = header["hash"]
+            elif entry_format == "bundle":
+                manifest = load_bundle_manifest(self.library_path, name)
+                entry["size"] = manifest["size"]
+                entry["hash"] = manifest["hash"]
+            found[name] = entry
+        return found
+
+    def refresh(self):
+        """
+        Brings the index up to date with the library.  Returns False when the library
+        directory cannot be accessed.
+        """
+        with self.lock:
+            mtimes = {}
+            for directory in self.formats:
+                try:
+                    mtimes[directory] = os.stat(directory).st_mtime_ns
+                except OSError:
+                    mtimes[directory] = None
+            self.available = mtimes[self.library_path] is not None
+            if mtimes == self.directories:
+                return self.available
+
+            for directory, storage_format in self.formats.items():
+                if mtimes[directory] is None:
+                    self.scanned[directory] = {}
+                elif mtimes[directory] != self.directories.get(directory):
+                    self.scanned[directory] = self.scan_directory(directory, storage_format)
+            self.directories = mtimes
+            self.merge()
+            if self.available:
+                self.save()
+            return self.available
+
+    def invalidate(self):
+        """
+        Makes the next refresh list the library again, for changes made within the mtime
+        resolution of the filesystem.
+        """
+        with self.lock:
+            self.directories = {}
+
+    def find(self, file_name):
+        """
+        Returns the index entry for file_name, or None when the library does not hold it.
+        """
+        with self.lock:
+            return self.entries.get(file_name)
+
+    def versions(self, kontakt_version=None, file_extension=None):
+        """
+        Returns the library names for one Kontakt major version and file type, in version order.
+        """
+        with self.lock:
+            names = [name for name, entry in self.entries.items()
+                     if (file_extension is None or entry["extension"] == file_extension)
+                     and (kontakt_version is None or entry["major"] == kontakt_version)]
+        return sorted(names, key=lambda name: version_sort_key(self.entries[name]["version"]))
+
+    def content_hash(self, file_name, save=True):
+        """
+        Returns the content hash of a library entry, hashing plain files on first use only.
+        With save=False neither the index nor the fingerprint cache is written, so a caller
+        hashing many entries saves both once afterwards, see save_hashes.
+        """
+        with self.lock:
+            entry = self.entries.get(file_name)
+            if entry is None:
+                return None
+            if entry["hash"] is None:
+                entry["hash"] = get_fingerprint_cache().content_hash(os.path.join(self.library_path, file_name), save=save)
+                if save:
+                    self.save()
+            return entry["hash"]
+
+    def save_hashes(self):
+        """
+        Writes the index and the fingerprint cache after a batch of content_hash(save=False).
+        """
+        with self.lock:
+            self.save()
+        get_fingerprint_cache().save()
+
+def restore_library_entry(index, file_name, destination, progress=None):
+    """
+    Writes library entry file_name to destination from whichever format it is stored in.
+    Returns a short description of how it was restored.
+    """
+    entry = index.find(file_name)
+    if entry["format"] == "files":
+        return copy_file_fast(os.path.join(index.library_path, file_name), destination, progress)
+    elif entry["format"] == "compressed":
+        decompress_file(get_compressed_path(index.library_path, file_name), destination, progress)
+        return "decompressed"
+    elif entry["format"] == "delta":
+        started = time.perf_counter()
+        header = restore_file_delta(index, file_name, destination, progress)
+        return f"delta of {header['base']}, chain of {header['depth']}, rebuilt in {time.perf_counter() - started:.2f}s"
+    restore_file_chunked(index.library_path, file_name, destination, progress)
+    return "chunk store"
+
+@contextmanager
+def materialized_library_entry(index, file_name):
+    """
+    Yields the path of a plain file or bundle holding library entry file_name, rebuilding it
+    into a temporary folder when it is not stored as either.
+    """
+    entry = index.find(file_name)
+    if entry is None:
+        raise IOError(f"{file_name} is not in {index.library_path}")
+    if entry["format"] in ("files", "bundle"):
+        yield os.path.join(index.library_path, file_name)
+        return
+
+    temp_dir = tempfile.mkdtemp(prefix="kvm-")
+    try:
+        temp_path = os.path.join(temp_dir, file_name)
+        restore_library_entry(index, file_name, temp_path)
+        yield temp_path
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+LIBRARY_INDEXES = {}
+LIBRARY_INDEXES_LOCK = threading.Lock()
+
+def get_library_index(library_path, refresh=True):
+    """
+    Returns the shared LibraryIndex for library_path, refreshed against the disk.  For a
+    remote library it is the index of the local cache.
+    """
+    if is_remote_library(library_path):
+        library_path = get_remote_library(library_path).cache_path
+    with LIBRARY_INDEXES_LOCK:
+        index = LIBRARY_INDEXES.get(library_path)
+        if index is None:
+            index = LIBRARY_INDEXES[library_path] = LibraryIndex(library_path)
+    if refresh:
+        index.refresh()
+    return index
+
+# ----------------------------------------------------------------------------------]
+# Delta Storage
+
+# A delta library entry is 'Kontakt <version><ext>.kvmdelta': a fixed size JSON header naming
+# its base version, followed by operations that copy ranges of the base ('C' offset length)
+# or insert new zlib compressed data ('I' length compressed length data).  Ranges are found
+# by matching content-defined chunks, so they line up even when code moved between releases.
+DELTA_SUFFIX         = ".kvmdelta"
+DELTA_MAGIC          = b"KVMD1\n"
+DELTA_HEADER_SIZE    = 1024
+DELTA_RANGE          = struct.Struct("<QQ")
+
+def get_delta_path(library_path, file_name):
+    return os.path.join(library_path, f"{file_name}{DELTA_SUFFIX}")
+
+def read_delta_header(path):
+    with open(path, "rb") as f:
+        header = f.read(DELTA_HEADER_SIZE)
+    if not header.startswith(DELTA_MAGIC):
+        raise IOError(f"{os.path.basename(path)} is not a delta library entry")
+    return json.loads(header[len(DELTA_MAGIC):].decode("utf-8"))
+
+def find_delta_base(index, file_name):
+    """
+    Returns the stored version of the same Kontakt and file type that is closest to
+    file_name in version order, preferring the release before it.
+    """
+    version, extension = parse_library_name(file_name)
+    major = re.match(r"\d+", version)
+    names = [name for name in index.versions(int(major.group()) if major else None, extension)
+             if name != file_name and index.find(name)["format"] != "bundle"]
+    if not names:
+        return None
+    key = version_sort_key(version)
+    older = [name for name in names if version_sort_key(index.find(name)["version"]) < key]
+    return older[-1] if older else names[0]
+
+def get_delta_depth(index, file_name):
+    """
+    Returns how many patches have to be applied to rebuild file_name.
+    """
+    if index.find(file_name)["format"] != "delta":
+        return 0
+    return read_delta_header(get_delta_path(index.library_path, file_name))["depth"]
+
+def store_file_delta(source_path, index, file_name, keyframe_interval, progress=None):
+    """
+    Stores source_path as a patch against its nearest stored neighbour.  The first version
+    of a type, and every version that would make the patch chain keyframe_interval long,
+    is stored as a plain file instead.  Returns (base name or None, depth, bytes written).
+    """
+    library_path = index.library_path
+    base_name = find_delta_base(index, file_name)
+    depth = get_delta_depth(index, base_name) + 1 if base_name else 0
+    if base_name is None or depth >= keyframe_interval:
+        # A keyframe is a plain file, so it is recorded like one stored with 'files' storage
+        store_file_hashed(source_path, library_path, file_name, progress)
+        return None, 0, os.path.getsize(source_path)
+
+    size = os.path.getsize(source_path)
+    file_hash = new_content_hash()
+    written = 0
+    delta_path = get_delta_path(library_path, file_name)
+    part_path = get_part_path(delta_path)
+    try:
+        with materialized_library_entry(index, base_name) as base_path:
+            # Where each chunk of the base sits, so matching chunks become copy operations
+            base_chunks = {}
+            offset = 0
+            with open(base_path, "rb") as base:
+                for chunk in iter_content_chunks(base):
+                    base_chunks.setdefault(hashlib.blake2b(chunk, digest_size=16).digest(), (offset, len(chunk)))
+                    offset += len(chunk)
+
+            with open(source_path, "rb") as src, open(part_path, "wb") as out:
+                out.write(b" " * DELTA_HEADER_SIZE)
+                pending = None
+                for chunk in iter_content_chunks(src):
+                    file_hash.update(chunk)
+                    match = base_chunks.get(hashlib.blake2b(chunk, digest_size=16).digest())
+                    if match and pending and pending[0] + pending[1] == match[0]:
+                        pending = (pending[0], pending[1] + match[1])
+                    else:
+                        if pending:
+                            out.write(b"C" + DELTA_RANGE.pack(*pending))
+                        pending = match
+                        if match is None:
+                            literal = zlib.compress(chunk, 6)
+                            out.write(b"I" + DELTA_RANGE.pack(len(chunk), len(literal)) + literal)
+                    written += len(chunk)
+                    if progress:
+                        progress(written, size)
+                if pending:
+                    out.write(b"C" + DELTA_RANGE.pack(*pending))
+                delta_size = out.tell()
+
+                header = {"base": base_name, "depth": depth, "size": size, "hash": file_hash.hexdigest(),
+                          "mtime": os.path.getmtime(source_path)}
+                header = DELTA_MAGIC + json.dumps(header).encode("utf-8")
+                out.seek(0)
+                out.write(header.ljust(DELTA_HEADER_SIZE - 1) + b"\n")
+        os.replace(part_path, delta_path)
+        return base_name, depth, delta_size
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+def restore_file_delta(index, file_name, destination, progress=None):
+    """
+    Rebuilds file_name into destination by streaming its patch over the rebuilt base.
+    Returns the delta header.
+    """
+    delta_path = get_delta_path(index.library_path, file_name)
+    header = read_delta_header(delta_path)
+    file_hash = new_content_hash()
+    written = 0
+    part_path = get_part_path(destination)
+    try:
+        with materialized_library_entry(index, header["base"]) as base_path, \
+                open(base_path, "rb") as base, open(delta_path, "rb") as delta, open(part_path, "wb") as out:
+            delta.seek(DELTA_HEADER_SIZE)
+            while True:
+                operation = delta.read(1)
+                if not operation:
+                    break
+                first, second = DELTA_RANGE.unpack(delta.read(DELTA_RANGE.size))
+                if operation == b"C":
+                    base.seek(first)
+                    remaining = second
+                    while remaining:
+                        block = base.read(min(remaining, READ_BUFFER_SIZE))
+                        if not block:
+                            raise IOError(f"{header['base']} is shorter than the delta of {file_name} expects")
+                        file_hash.update(block)
+                        out.write(block)
+                        remaining -= len(block)
+                elif operation == b"I":
+                    block = zlib.decompress(delta.read(second))
+                    file_hash.update(block)
+                    out.write(block)
+                else:
+                    raise IOError(f"The delta of {file_name} is damaged")
+                written = out.tell()
+                if progress:
+                    progress(written, header["size"])
+
+        if written != header["size"] or file_hash.hexdigest() != header["hash"]:
+            raise IOError(f"{file_name} does not match its stored hash")
+        os.utime(part_path, (header["mtime"], header["mtime"]))
+        os.replace(part_path, destination)
+        return header
+    except BaseException:
+        remove_quietly(part_path)
+        raise
+
+# ----------------------------------------------------------------------------------]
+# Bundles
+
+# VST3 and AAX plugins can be bundle folders rather than single files.  A bundle is stored as
+# a copy of the folder, 'Kontakt <version>.vst3', with a manifest in .kvm_store/bundles giving
+# the size, mtime and hash of every file in it.  Loading compares that manifest with the
+# installed bundle and only copies the files that differ and removes the ones that are gone,
+# so switching between neighbouring versions touches few files.
+BUNDLE_EXTENSIONS    = (".vst3", ".aaxplugin")
+BUNDLE_COPY_WORKERS  = 8
+
+def get_bundle_manifest_path(library_path, file_name):
+    return os.path.join(get_chunk_store_path(library_path), "bundles", f"{file_name}.json")
+
+def get_bundle_file_path(bundle_path, relative_path):
+    return os.path.join(bundle_path, *relative_path.split("/"))
+
+def walk_bundle(bundle_path):
+    """
+    Returns the stat of every file in a bundle, keyed by its '/' separated relative path.
+    """
+    files = {}
+    for directory, _, names in os.walk(bundle_path):
+        for name in names:
+            path = os.path.join(directory, name)
+            files[os.path.relpath(path, bundle_path).replace(os.sep, "/")] = os.stat(path)
+    return files
+
+def get_target_size(path):
+    """
+    Returns the size of a file, or the total size of the files in a bundle.
+    """
+    if os.path.isdir(path):
+        return sum(stat.st_size for stat in walk_bundle(path).values())
+    return os.path.getsize(path)
+
+def make_bundle_manifest(bundle_path, file_name):
+    """
+    Lists every file of a bundle with its size, mtime and content hash.  The bundle hash
+    covers every path and file hash, so equal bundles have equal hashes.
+    """
+    cache = get_fingerprint_cache()
+    files = {}
+    for relative_path, stat in walk_bundle(bundle_path).items():
+        content_hash = cache.content_hash(get_bundle_file_path(bundle_path, relative_path), save=False)
+        files[relative_path] = [stat.st_size, stat.st_mtime_ns, content_hash]
+    cache.save()
+    return build_bundle_manifest(file_name, files)
+
+def build_bundle_manifest(file_name, files):
+    """
+    Returns the manifest of a bundle from {relative path: [size, mtime, hash]}.
+    """
+    files = dict(sorted(files.items()))
+    bundle_hash = new_content_hash()
+    for relative_path, (_, _, content_hash) in files.items():
+        bundle_hash.update(f"{relative_path}\0{content_hash}\n".encode("utf-8"))
+    return {"name": file_name, "size": sum(size for size, _, _ in files.values()),
+            "hash": bundle_hash.hexdigest(), "files": files}
+
+def load_bundle_manifest(library_path, file_name):
+    """
+    Returns the manifest of a stored bundle, making it for a bundle copied into the library by hand.
+    """
+    manifest_path = get_bundle_manifest_path(library_path, file_name)
+    try:
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        manifest = make_bundle_manifest(os.path.join(library_path, file_name), file_name)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        write_file_atomic(manifest_path, json.dumps(manifest).encode("utf-8"))
+        return manifest
+
+def find_bundle_binary(bundle_path):
+    """
+    Returns the plugin binary inside a bundle: the file named like the bundle, else the
+    largest file with the bundle's extension, else the largest file.
+    """
+    files = walk_bundle(bundle_path)
+    if not files:
+        raise IOError(f"{os.path.basename(bundle_path)} is an empty bundle")
+    name = os.path.basename(bundle_path)
+    extension = os.path.splitext(name)[1]
+    named = [path for path in files if path.split("/")[-1] == name]
+    candidates = named or [path for path in files if path.endswith(extension)] or list(files)
+    return get_bundle_file_path(bundle_path, max(candidates, key=lambda path: files[path].st_size))
+
+def copy_bundle_files(source_path, destination_path, relative_paths, progress=None):
+    """
+    Copies the given files of one bundle folder to another in parallel.  progress is called
+    with the bytes done after each file, so a cancel stops the copy between files.
+    Returns the bytes copied and the content hash of each file, taken while copying.
+    """
+    total = sum(os.path.getsize(get_bundle_file_path(source_path, path)) for path in relative_paths)
+    done = [0]
+    hashes = {}
+    lock = threading.Lock()
+
+    def copy_one(relative_path):
+        source = get_bundle_file_path(source_path, relative_path)
+        destination = get_bundle_file_path(destination_path, relative_path)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        content_hash, _ = copy_file_hashed(source, destination)
+        with lock:
+            hashes[relative_path] = content_hash
+            done[0] += os.path.getsize(source)
+            if progress:
+                progress(done[0], total)
+
+    with ThreadPoolExecutor(max_workers=BUNDLE_COPY_WORKERS) as pool:
+        for job in [pool.submit(copy_one, path) for path in relative_paths]:
+            job.result()
+    return total, hashes
+
+def store_bundle(source_path, library_path, file_name, progress=None):
+    """
+    Copies an installed bundle into the library and writes its manifest.
+    Returns the number of files and bytes stored.
+    """
+    files = walk_bundle(source_path)
+    destination = os.path.join(library_path, file_name)
+    part_path = get_part_path(destination)
+    try:
+        bytes_written, hashes = copy_bundle_files(source_path, part_path, list(files), progress)
+        manifest = build_bundle_manifest(file_name, {path: [stat.st_size, stat.st_mtime_ns, hashes[path]]
+                                                     for path, stat in files.items()})
+        manifest_path = get_bundle_manifest_path(library_path, file_name)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        write_file_atomic(manifest_path, json.dumps(manifest).encode("utf-8"))
+        os.replace(part_path, destination)
+    except BaseException:
+        shutil.rmtree(part_path, ignore_errors=True)
+        raise
+    return len(manifest["files"]), bytes_written
+
+def restore_bundle_chunked(library_path, file_name, files):
+    """
+    Assembles bundle file_name in the library from chunks its chunk store already holds.
+    files maps each relative path to the chunk manifest of that file.
+    """
+    bundle_path = os.path.join(library_path, file_name)
+    part_path = get_part_path(bundle_path)
+    try:
+        for relative_path, manifest in files.items():
+            destination = get_bundle_file_path(part_path, relative_path)
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            restore_chunks(library_path, {"name": f"{file_name}/{relative_path}", **manifest}, destination)
+        manifest = build_bundle_manifest(file_name, {path: [stat.st_size, stat.st_mtime_ns, files[path]["hash"]]
+                                                     for path, stat in walk_bundle(part_path).items()})
+        remove_tree_quietly(bundle_path)
+        os.replace(part_path, bundle_path)
+        write_file_atomic(get_bundle_manifest_path(library_path, file_name), json.dumps(manifest).encode("utf-8"))
+    except BaseException:
+        remove_tree_quietly(part_path)
+        raise
+
+def plan_bundle_sync(manifest, destination):
+    """
+    Compares a bundle manifest with the installed bundle.  A file is copied when its size
+    differs, or when its mtime differs and so does its hash.  Returns the files to copy with
+    their hashes, the copied files that are new, the stale files to remove and the bytes to copy.
+    """
+    installed = walk_bundle(destination) if os.path.isdir(destination) else {}
+    cache = get_fingerprint_cache()
+    copied = []
+    for relative_path, (size, mtime, content_hash) in manifest["files"].items():
+        stat = installed.get(relative_path)
+        if stat is not None and stat.st_size == size:
+            if stat.st_mtime_ns == mtime:
+                continue
+            if cache.content_hash(get_bundle_file_path(destination, relative_path), save=False) == content_hash:
+                continue
+        copied.append(relative_path)
+    cache.save()
+    return {"copied": copied,
+            "hashes": {path: manifest["files"][path][2] for path in copied},
+            "added": [path for path in copied if path not in installed],
+            "removed": [path for path in installed if path not in manifest["files"]],
+            "bytes": sum(manifest["files"][path][0] for path in copied)}
+
+def stage_bundle(library_path, file_name, plan, staged_path, progress=None):
+    """
+    Copies the changed files of a bundle into staged_path, ready for switch_bundle, checking
+    each one against the manifest as it is copied.
+    """
+    _, hashes = copy_bundle_files(os.path.join(library_path, file_name), staged_path, plan["copied"], progress)
+    damaged = [path for path in plan["copied"] if hashes[path] != plan["hashes"][path]]
+    if damaged:
+        raise IOError(f"{file_name}/{damaged[0]} does not match its checksum, run a library scrub")
+    return f"synced {len(plan['copied'])} files, removed {len(plan['removed'])}"
+
+def remove_empty_parents(path, top):
+    """
+    Removes the folders above path that are left empty, stopping at top.
+    """
+    parent = os.path.dirname(path)
+    while len(parent) > len(top) and parent.startswith(top):
+        try:
+            os.rmdir(parent)
+        except OSError:
+            return
+        parent = os.path.dirname(parent)
+
+def switch_bundle(target):
+    """
+    Moves the files a bundle load replaces or removes into the backup folder, then the staged
+    files into the bundle.  Safe to repeat after an interruption.
+    """
+    destination, staged, backup = target["destination"], target["staged"], get_backup_path(target["destination"])
+    plan = target["bundle"]
+    for relative_path in plan["copied"] + plan["removed"]:
+        current = get_bundle_file_path(destination, relative_path)
+        saved = get_bundle_file_path(backup, relative_path)
+        still_staged = os.path.exists(get_bundle_file_path(staged, relative_path))
+        if os.path.exists(current) and not os.path.exists(saved) and (still_staged or relative_path in plan["removed"]):
+            os.makedirs(os.path.dirname(saved), exist_ok=True)
+            os.replace(current, saved)
+    for relative_path in plan["copied"]:
+        new = get_bundle_file_path(staged, relative_path)
+        if os.path.exists(new):
+            current = get_bundle_file_path(destination, relative_path)
+            os.makedirs(os.path.dirname(current), exist_ok=True)
+            os.replace(new, current)
+            get_fingerprint_cache().record(current, plan["hashes"][relative_path], save=False)
+    for relative_path in plan["removed"]:
+        remove_empty_parents(get_bundle_file_path(destination, relative_path), destination)
+    get_fingerprint_cache().save()
+    shutil.rmtree(staged, ignore_errors=True)
+
+def roll_back_bundle(target):
+    """
+    Puts back the files switch_bundle moved aside and removes the files it added.
+    """
+    destination, staged, backup = target["destination"], target["staged"], get_backup_path(target["destination"])
+    plan = target["bundle"]
+    for relative_path in plan["copied"] + plan["removed"]:
+        current = get_bundle_file_path(destination, relative_path)
+        saved = get_bundle_file_path(backup, relative_path)
+        if os.path.exists(saved):
+            os.makedirs(os.path.dirname(current), exist_ok=True)
+            os.replace(saved, current)
+        elif relative_path in plan["added"] and os.path.exists(current) and not os.path.exists(get_bundle_file_path(staged, relative_path)):
+            os.remove(current)
+            remove_empty_parents(current, destination)
+    shutil.rmtree(staged, ignore_errors=True)
+    shutil.rmtree(backup, ignore_errors=True)
+
+def remove_tree_quietly(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        remove_quietly(path)
+
+# ----------------------------------------------------------------------------------]
+# Library Integrity
+
+# Checksums are taken in the same pass that copies a version into the library, so recording
+# them costs no read of the library copy.  Plain files have theirs in
+# '.kvm_store/checksums.json'; chunked, compressed and delta entries and bundle manifests
+# already carry the hash of their content.  A scrub reads the whole library on a few threads
+# and reports every entry that no longer matches, picking up where it stopped when it was
+# cancelled.
+
+SCRUB_WORKERS        = 4         # files read at once, more only queues on the same disk
+SCRUB_SAVE_INTERVAL  = 2.0       # seconds between saves of the scrub progress
+
+CHECKSUMS_LOCK = threading.Lock()
+
+def get_checksums_path(library_path):
+    return os.path.join(get_chunk_store_path(library_path), "checksums.json")
+
+def get_scrub_state_path(library_path):
+    return os.path.join(get_chunk_store_path(library_path), "scrub.json")
+
+def load_library_checksums(library_path):
+    """
+    Returns {library name: content hash recorded when it was stored}.
+    """
+    try:
+        with open(get_checksums_path(library_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def record_library_checksums(library_path, checksums):
+    """
+    Records the given {library name: hash} checksums, removing the names whose hash is None.
+    """
+    with CHECKSUMS_LOCK:
+        recorded = load_library_checksums(library_path)
+        for name, content_hash in checksums.items():
+            if content_hash is None:
+                recorded.pop(name, None)
+            else:
+                recorded[name] = content_hash
+        write_file_atomic(get_checksums_path(library_path), json.dumps(recorded).encode("utf-8"))
+
+def store_file_hashed(source_path, library_path, file_name, progress=None):
+    """
+    Copies source_path into the library as the plain file file_name, recording its checksum
+    for scrubs and the fingerprint of both copies for later lookups.  Returns the content
+    hash and the copy method used.
+    """
+    dest_file_path = os.path.join(library_path, file_name)
+    content_hash, method = copy_file_hashed(source_path, dest_file_path, progress)
+    record_library_checksums(library_path, {file_name: content_hash})
+    get_fingerprint_cache().record(source_path, content_hash, save=False)
+    get_fingerprint_cache().record(dest_file_path, content_hash)
+    return content_hash, method
+
+def hash_mapped_file(path):
+    """
+    Returns the content hash of path, read through a memory map so the data is hashed
+    straight from the page cache without copying it into Python buffers.
+    """
+    file_hash = new_content_hash()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped, memoryview(mapped) as view:
+                for offset in range(0, size, READ_BUFFER_SIZE):
+                    file_hash.update(view[offset:offset + READ_BUFFER_SIZE])
+    return file_hash.hexdigest()
+
+def check_chunk(library_path, chunk_hash, length):
+    """
+    Returns a description of what is wrong with one chunk, or None when it is intact.
+    """
+    try:
+        if os.path.getsize(get_chunk_path(library_path, chunk_hash)) != length:
+            return "has the wrong size"
+        if hash_mapped_file(get_chunk_path(library_path, chunk_hash)) != chunk_hash:
+            return "does not match its checksum"
+    except OSError:
+        return "is missing"
+    return None
+
+def check_library_entry(index, file_name, checksums, chunk_results, chunk_lock):
+    """
+    Reads one library entry back and compares it with the checksums taken when it was
+    stored.  Returns (problem or None, hash to record), where the hash is only set for a
+    plain file that had no checksum yet.  Chunks shared between versions are only read once.
+    """
+    library_path = index.library_path
+    entry = index.entries[file_name]
+    try:
+        if entry["format"] == "files":
+            content_hash = hash_mapped_file(os.path.join(library_path, file_name))
+            if file_name not in checksums:
+                return None, content_hash
+            if content_hash != checksums[file_name]:
+                return "does not match its checksum", None
+
+        elif entry["format"] == "chunked":
+            with open(get_manifest_path(library_path, file_name), "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            for chunk_hash, length in manifest["chunks"]:
+                with chunk_lock:
+                    known = chunk_hash in chunk_results
+                if not known:
+                    result = check_chunk(library_path, chunk_hash, length)
+                    with chunk_lock:
+                        chunk_results[chunk_hash] = result
+                if chunk_results[chunk_hash]:
+                    return f"chunk {chunk_hash[:12]} {chunk_results[chunk_hash]}", None
+
+        elif entry["format"] == "bundle":
+            bundle_path = os.path.join(library_path, file_name)
+            for relative_path, (_, _, content_hash) in load_bundle_manifest(library_path, file_name)["files"].items():
+                file_path = get_bundle_file_path(bundle_path, relative_path)
+                if not os.path.isfile(file_path):
+                    return f"{relative_path} is missing", None
+                if hash_mapped_file(file_path) != content_hash:
+                    return f"{relative_path} does not match its checksum", None
+
+        elif entry["format"] == "compressed":
+            compressed_path = get_compressed_path(library_path, file_name)
+            header = read_compressed_header(compressed_path)
+            decompressor = COMPRESSION_CODECS[header["codec"]]["decompressor"]()
+            file_hash = new_content_hash()
+            with open(compressed_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                mapped.seek(COMPRESSED_HEADER_SIZE)
+                for block in iter_decompressed(decompressor, mapped):
+                    file_hash.update(block)
+            if file_hash.hexdigest() != header["hash"]:
+                return "does not match its checksum", None
+
+        elif entry["format"] == "delta":
+            # Rebuilding checks the patch and every base it depends on against their hashes
+            with tempfile.TemporaryDirectory(prefix="kvm-") as temp_dir:
+                restore_file_delta(index, file_name, os.path.join(temp_dir, file_name))
+    except (OSError, ValueError, KeyError, lzma.LZMAError, zlib.error) as e:
+        return str(e) or type(e).__name__, None
+    return None, None
+
+def load_scrub_state(library_path):
+    try:
+        with open(get_scrub_state_path(library_path), "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if not state["complete"]:
+            return state
+    except (OSError, ValueError, KeyError):
+        pass
+    return {"complete": False, "results": {}}
+
+def scrub_library(library_path, text_widget):
+    """
+    Checks every library entry against its checksums on SCRUB_WORKERS threads and reports
+    the damaged and missing ones.  Progress is saved as it goes, so a cancelled scrub
+    carries on from where it stopped the next time.  Returns {checked, damaged, missing}.
+    """
+    index = get_library_index(library_path)
+    checksums = load_library_checksums(library_path)
+    state = load_scrub_state(library_path)
+    results = state["results"]
+
+    # An entry checked by the stopped scrub is skipped unless it has changed since
+    pending = [name for name, entry in sorted(index.entries.items())
+               if results.get(name, {}).get("mtime") != entry["mtime"]]
+    if results:
+        text_widget.insert(END,f"\nResuming the library scrub, {len(index.entries) - len(pending)} versions already checked")
+
+    progress = make_progress_callback(text_widget, "Library scrub")
+    total = sum(index.entries[name]["size"] for name in pending)
+    done = 0
+    baselines = {}
+    chunk_results = {}
+    chunk_lock = threading.Lock()
+    last_saved = time.monotonic()
+
+    def save_state():
+        write_file_atomic(get_scrub_state_path(library_path), json.dumps(state).encode("utf-8"))
+
+    pool = ThreadPoolExecutor(max_workers=SCRUB_WORKERS)
+    try:
+        jobs = {pool.submit(check_library_entry, index, name, checksums, chunk_results, chunk_lock): name for name in pending}
+        for job in as_completed(jobs):
+            name = jobs[job]
+            problem, content_hash = job.result()
+            results[name] = {"mtime": index.entries[name]["mtime"], "problem": problem}
+            if content_hash:
+                baselines[name] = content_hash
+            done += index.entries[name]["size"]
+            if progress:
+                progress(done, total)
+            if time.monotonic() - last_saved > SCRUB_SAVE_INTERVAL:
+                save_state()
+                last_saved = time.monotonic()
+    except OperationCancelled:
+        pool.shutdown(wait=True, cancel_futures=True)
+        save_state()
+        text_widget.insert(END,f"\nLibrary scrub cancelled, {len(results)} of {len(index.entries)} versions checked")
+        return None
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if baselines:
+            record_library_checksums(library_path, baselines)
+
+    # A checksum without a library entry is a version that has disappeared from the library
+    missing = sorted(name for name in checksums if name not in index.entries)
+    if missing:
+        record_library_checksums(library_path, {name: None for name in missing})
+    damaged = sorted(name for name, result in results.items() if result["problem"] and name in index.entries)
+    state["complete"] = True
+    save_state()
+
+    for name in damaged:
+        text_widget.insert(END,f"\n{name} : {results[name]['problem']}")
+    for name in missing:
+        text_widget.insert(END,f"\n{name} : missing from the library")
+    if baselines:
+        text_widget.insert(END,f"\nRecorded checksums for {len(baselines)} versions stored before checksums were kept")
+    text_widget.insert(END,f"\nScrubbed {len(index.entries)} versions: {len(damaged)} damaged, {len(missing)} missing")
+    return {"checked": len(index.entries), "damaged": damaged, "missing": missing}
+
+# ----------------------------------------------------------------------------------]
+# Retention
+
+# With LibraryBudgetGB set in settings.ini, the library folder is kept under that size by
+# moving the versions loaded least recently to the ArchivePath folder, compressed with
+# ArchiveCodec when one is set.  Pinned versions and the installed ones are never moved.
+# The archive is laid out like a library, and loading an archived version moves it back
+# first.  Chunked versions share their chunks with each other, so they stay in the library.
+
+ARCHIVE_FORMATS      = ("files", "compressed", "delta", "bundle")
+
+def get_entry_disk_paths(library_path, file_name, storage_format):
+    """
+    Returns the files and folders holding one library entry in a library or archive.
+    """
+    if storage_format == "compressed":
+        return [get_compressed_path(library_path, file_name)]
+    if storage_format == "delta":
+        return [get_delta_path(library_path, file_name)]
+    if storage_format == "bundle":
+        return [os.path.join(library_path, file_name), get_bundle_manifest_path(library_path, file_name)]
+    return [os.path.join(library_path, file_name)]
+
+def get_entry_disk_size(library_path, file_name, entry):
+    if entry["format"] in ("compressed", "delta"):
+        return os.path.getsize(get_entry_disk_paths(library_path, file_name, entry["format"])[0])
+    return entry["size"]
+
+def get_chunk_store_size(library_path):
+    size = 0
+    for directory, _, files in os.walk(os.path.join(get_chunk_store_path(library_path), "chunks")):
+        size += sum(os.path.getsize(os.path.join(directory, name)) for name in files)
+    return size
+
+def load_pinned_versions():
+    """
+    Returns the library names that are never moved to the archive.
+    """
+    return set(get_config_store().items(PINNED_SECTION).values())
+
+def set_version_pinned(new_version, pinned):
+    """
+    Pins or unpins every file type of one version.
+    """
+    with get_config_store().batch():
+        for file_extension in LIBRARY_TYPES:
+            name = f'Kontakt {new_version}{file_extension}'
+            get_config_store().set(PINNED_SECTION, name, name if pinned else None)
+
+def move_library_item(source, destination):
+    """
+    Moves a file or folder into another library, copying it when that is on another drive.
+    """
+    os.makedirs(os.path.dirname(destination), exist_ok=True)
+    remove_tree_quietly(destination)
+    shutil.move(source, destination)
+
+def archive_library_entry(index, file_name, archive_path, codec_name=None, progress=None):
+    """
+    Moves one library entry to the archive, compressing a plain file with codec_name.
+    Its checksum moves with it.  Returns the bytes freed in the library.
+    """
+    library_path = index.library_path
+    entry = index.find(file_name)
+    freed = get_entry_disk_size(library_path, file_name, entry)
+    content_hash = load_library_checksums(library_path).get(file_name)
+    # An older copy left in the archive by a version that was stored again is replaced
+    for storage_format in ARCHIVE_FORMATS:
+        for path in get_entry_disk_paths(archive_path, file_name, storage_format):
+            remove_tree_quietly(path)
+    os.makedirs(archive_path, exist_ok=True)
+    if entry["format"] == "files" and codec_name:
+        compress_file(os.path.join(library_path, file_name), get_compressed_path(archive_path, file_name), codec_name, progress)
+        os.remove(os.path.join(library_path, file_name))
+    else:
+        for path in get_entry_disk_paths(library_path, file_name, entry["format"]):
+            move_library_item(path, os.path.join(archive_path, os.path.relpath(path, library_path)))
+        if content_hash:
+            record_library_checksums(archive_path, {file_name: content_hash})
+    record_library_checksums(library_path, {file_name: None})
+    index.invalidate()
+    get_library_index(archive_path, refresh=False).invalidate()
+    return freed
+
+def find_archived_entry(file_name):
+    """
+    Returns the archive index entry of file_name, or None when it has not been archived.
+    """
+    archive_path = load_config_settings()["ArchivePath"]
+    if not archive_path or not os.path.isdir(archive_path):
+        return None
+    return get_library_index(archive_path).find(file_name)
+
+def unarchive_library_entry(index, file_name, progress=None):
+    """
+    Moves an archived entry back into the library, along with the delta bases it needs.
+    Returns False when the archive does not hold it.
+    """
+    entry = find_archived_entry(file_name)
+    if entry is None:
+        return False
+    archive_path = load_config_settings()["ArchivePath"]
+    library_path = index.library_path
+    if entry["format"] == "delta":
+        base_name = read_delta_header(get_delta_path(archive_path, file_name))["base"]
+        index.refresh()
+        if index.find(base_name) is None and not unarchive_library_entry(index, base_name, progress):
+            raise IOError(f"{file_name} needs {base_name}, which is neither in the library nor the archive")
+
+    if entry["format"] == "compressed":
+        # It is about to be loaded, so it comes back ready for fast loading
+        compressed_path = get_compressed_path(archive_path, file_name)
+        decompress_file(compressed_path, os.path.join(library_path, file_name), progress)
+        record_library_checksums(library_path, {file_name: entry["hash"]})
+        os.remove(compressed_path)
+    else:
+        content_hash = load_library_checksums(archive_path).get(file_name)
+        for path in get_entry_disk_paths(archive_path, file_name, entry["format"]):
+            move_library_item(path, os.path.join(library_path, os.path.relpath(path, archive_path)))
+        if content_hash:
+            record_library_checksums(library_path, {file_name: content_hash})
+    record_library_checksums(archive_path, {file_name: None})
+    get_library_index(archive_path, refresh=False).invalidate()
+    index.invalidate()
+    index.refresh()
+    return True
+
+def plan_retention(library_path, budget):
+    """
+    Works out which versions have to move to the archive to bring the library under budget
+    bytes, least recently loaded first.  Returns {size, evict: [(name, bytes)], remaining}.
+    """
+    index = get_library_index(library_path)
+    usage = load_library_usage(library_path)
+    protected = load_pinned_versions() | set(get_config_store().items(VERSIONS_SECTION).values())
+    # A version that a delta in the library is built on has to stay with it
+    for name, entry in index.entries.items():
+        if entry["format"] == "delta":
+            protected.add(read_delta_header(get_delta_path(library_path, name))["base"])
+
+    sizes = {name: get_entry_disk_size(library_path, name, entry)
+             for name, entry in index.entries.items() if entry["format"] != "chunked"}
+    size = remaining = sum(sizes.values()) + get_chunk_store_size(library_path)
+    candidates = sorted((name for name in sizes if index.entries[name]["format"] in ARCHIVE_FORMATS and name not in protected),
+                        key=lambda name: usage.get(name, index.entries[name]["mtime"] / 1e9))
+    evict = []
+    for name in candidates:
+        if remaining <= budget:
+            break
+        evict.append((name, sizes[name]))
+        remaining -= sizes[name]
+    return {"size": size, "evict": evict, "remaining": remaining}
+
+def apply_retention_policy(library_path, text_widget, dry_run=False):
+    """
+    Moves the least recently loaded versions to the archive until the library fits its
+    LibraryBudgetGB, or only reports what would be moved when dry_run is set.
+    Returns the plan, or None when no budget is set.
+    """
+    settings = load_config_settings()
+    if settings["LibraryBudgetGB"] <= 0:
+        text_widget.insert(END,"\nNo library size budget is set, add LibraryBudgetGB to settings.ini")
+        return None
+    budget = int(settings["LibraryBudgetGB"] * 1073741824)
+    plan = plan_retention(library_path, budget)
+    freed = sum(size for _, size in plan["evict"])
+
+    if dry_run:
+        text_widget.insert(END,f"\nThe library holds {plan['size'] / 1048576:.0f} MB of its {budget / 1048576:.0f} MB budget")
+        for name, size in plan["evict"]:
+            text_widget.insert(END,f"\n{name} would be archived ({size / 1048576:.1f} MB)")
+        text_widget.insert(END,f"\n{len(plan['evict'])} versions would free {freed / 1048576:.1f} MB")
+    elif plan["evict"]:
+        if not settings["ArchivePath"]:
+            text_widget.insert(END,"\nThe library is over its size budget, add ArchivePath to settings.ini to archive old versions")
+            return plan
+        index = get_library_index(library_path)
+        codec_name = settings["ArchiveCodec"] or None
+        try:
+            for name, _ in plan["evict"]:
+                archive_library_entry(index, name, settings["ArchivePath"], codec_name, make_progress_callback(text_widget, name))
+                text_widget.insert(END,f"\n{name} moved to the archive")
+        except OperationCancelled:
+            text_widget.insert(END,"\nArchiving cancelled")
+        except Exception as e:
+            text_widget.insert(END,f"\nFailed to archive old versions. Error: {e}\n")
+    if plan["remaining"] > budget:
+        text_widget.insert(END,"\nThe library stays over its budget, the rest is pinned, installed or chunked")
+    return plan
+
+# ----------------------------------------------------------------------------------]
+# Remote Library
+
+# A library path starting with http:// or https:// is a library shared by library_server.py.
+# Versions are fetched into a local cache library in the config directory, split into the
+# same content defined chunks as the chunk store, so only the chunks this machine does not
+# hold yet are downloaded.  Runs of missing chunks are fetched as parallel ranged requests
+# over a small pool of kept-alive connections, and every chunk is kept as soon as it arrives,
+# so an interrupted fetch carries on where it stopped.  The cache is trimmed to RemoteCacheMB
+# by dropping the versions loaded least recently.  Storing uploads only the chunks the
+# server does not hold yet.
+
+REMOTE_CONNECTIONS   = 4
+REMOTE_RANGE_SIZE    = 8 * 1024 * 1024    # largest run of chunks fetched in one request
+REMOTE_TIMEOUT       = 30
+REMOTE_BUSY_WAIT     = 120                # seconds a request waits for a server still indexing its library
+REMOTE_INDEX_AGE     = 5.0                # seconds the listing of the server is reused
+
+def is_remote_library(library_path):
+    return library_path.startswith(("http://", "https://"))
+
+class RemoteLibrary:
+    """
+    Client of one library server, with its local cache library.
+    """
+    def __init__(self, url):
+        parts = urllib.parse.urlsplit(url)
+        self.url = url.rstrip("/")
+        self.host = parts.hostname
+        self.port = parts.port
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.base_path = parts.path.rstrip("/")
+        self.connections = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(REMOTE_CONNECTIONS)
+        self.lock = threading.RLock()
+        self.listing = None
+        self.listed = 0.0
+        self.pinned = {}
+        name = hashlib.blake2b(self.url.encode("utf-8"), digest_size=8).hexdigest()
+        self.cache_path = os.path.join(get_config_dir(), "remote_cache", name)
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    @contextmanager
+    def connection(self):
+        """
+        Lends a kept-alive connection from the pool, opening one when none is free.
+        """
+        with self.slots:
+            try:
+                connection = self.connections.get_nowait()
+            except queue.Empty:
+                connection = self.connection_class(self.host, self.port, timeout=REMOTE_TIMEOUT)
+            try:
+                yield connection
+            except BaseException:
+                connection.close()
+                raise
+            self.connections.put(connection)
+
+    def request(self, method, path, body=None, headers=None):
+        """
+        Sends one request and returns (response, body).  While the server is still indexing
+        its library it answers 503 with a Retry-After, and the request is sent again after
+        that wait, for up to REMOTE_BUSY_WAIT seconds.
+        """
+        deadline = time.monotonic() + REMOTE_BUSY_WAIT
+        while True:
+            response, data = self.send_request(method, path, body, headers)
+            retry_after = response.getheader("Retry-After", "")
+            if response.status == 503 and retry_after.isdigit() and time.monotonic() + int(retry_after) < deadline:
+                time.sleep(int(retry_after))
+                continue
+            if response.status >= 400:
+                raise IOError(f"{self.url}{path} answered {response.status} {response.reason}")
+            return response, data
+
+    def send_request(self, method, path, body=None, headers=None):
+        """
+        Sends one request and returns (response, body), whatever its status.  A kept-alive
+        connection that the server has closed in the meantime is opened again once.
+        """
+        for attempt in range(2):
+            with self.connection() as connection:
+                try:
+                    connection.request(method, self.base_path + urllib.parse.quote(path), body=body, headers=headers or {})
+                    response = connection.getresponse()
+                    data = response.read()
+                except (http.client.RemoteDisconnected, http.client.CannotSendRequest, ConnectionResetError, BrokenPipeError):
+                    connection.close()
+                    if attempt:
+                        raise
+                    continue
+            return response, data
+
+    def request_json(self, method, path, value=None):
+        body = None if value is None else json.dumps(value).encode("utf-8")
+        _, data = self.request(method, path, body, {"Content-Type": "application/json"} if body else None)
+        return json.loads(data)
+
+    def entries(self):
+        """
+        Returns the entries of the server library by name, with their content hash.
+        """
+        with self.lock:
+            if self.listing is None or time.monotonic() - self.listed > REMOTE_INDEX_AGE:
+                self.listing = self.request_json("GET", "/index")["entries"]
+                self.listed = time.monotonic()
+            return self.listing
+
+    def versions(self, kontakt_version=None, file_extension=None):
+        names = [name for name, entry in self.entries().items()
+                 if (file_extension is None or entry["extension"] == file_extension)
+                 and (kontakt_version is None or entry["major"] == kontakt_version)]
+        names.sort(key=lambda name: version_sort_key(self.entries()[name]["version"]))
+        return names
+
+    def plan_ranges(self, content_hash, chunks):
+        """
+        Groups the chunks of one content that the cache lacks into runs of at most
+        REMOTE_RANGE_SIZE bytes.  Returns [(content hash, offset, [(chunk hash, length)])].
+        """
+        ranges = []
+        offset = 0
+        end = None
+        for chunk_hash, length in chunks:
+            if not os.path.exists(get_chunk_path(self.cache_path, chunk_hash)):
+                if end == offset and sum(part[1] for part in ranges[-1][2]) + length <= REMOTE_RANGE_SIZE:
+                    ranges[-1][2].append((chunk_hash, length))
+                else:
+                    ranges.append((content_hash, offset, [(chunk_hash, length)]))
+                end = offset + length
+            offset += length
+        return ranges
+
+    def download_ranges(self, ranges, progress=None):
+        """
+        Fetches the planned ranges in parallel, checking and keeping every chunk as it arrives.
+        Returns the bytes downloaded.
+        """
+        total = sum(length for _, _, parts in ranges for _, length in parts)
+        done = [0]
+        lock = threading.Lock()
+
+        def fetch(content_hash, offset, parts):
+            size = sum(length for _, length in parts)
+            response, data = self.request("GET", f"/content/{content_hash}",
+                                          headers={"Range": f"bytes={offset}-{offset + size - 1}"})
+            if response.status != 206 or len(data) != size:
+                raise IOError(f"{self.url} sent a wrong range of {content_hash}")
+            position = 0
+            for chunk_hash, length in parts:
+                chunk = data[position:position + length]
+                position += length
+                received_hash = new_content_hash()
+                received_hash.update(chunk)
+                if received_hash.hexdigest() != chunk_hash:
+                    raise IOError(f"Chunk {chunk_hash} arrived damaged from {self.url}")
+                write_file_atomic(get_chunk_path(self.cache_path, chunk_hash), chunk)
+            with lock:
+                done[0] += size
+                if progress:
+                    progress(done[0], total)
+
+        # A cancel or failure drops the ranges not started yet; the chunks already kept stay
+        # in the cache, so the next fetch resumes where this one stopped
+        pool = ThreadPoolExecutor(max_workers=REMOTE_CONNECTIONS)
+        try:
+            for job in [pool.submit(fetch, *planned) for planned in ranges]:
+                job.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        return total
+
+    def fetch_entry(self, file_name, progress=None):
+        """
+        Makes sure the cache library holds the current content of file_name, downloading
+        the chunks it lacks.  Returns the bytes downloaded, or None when the server does not
+        hold file_name.
+        """
+        entry = self.entries().get(file_name)
+        if entry is None:
+            return None
+        # One version at a time, so trimming the cache never drops a version being fetched
+        with self.lock:
+            index = get_library_index(self.cache_path)
+            cached = index.find(file_name)
+            downloaded = 0
+            if cached is None or cached["hash"] != entry["hash"]:
+                contents = entry["files"] if entry["format"] == "bundle" else {file_name: [entry["size"], entry["mtime"], entry["hash"]]}
+                chunk_lists = {content_hash: self.request_json("GET", f"/chunks/{content_hash}")["chunks"]
+                               for _, _, content_hash in contents.values()}
+                ranges = [planned for content_hash, chunks in chunk_lists.items()
+                          for planned in self.plan_ranges(content_hash, chunks)]
+                downloaded = self.download_ranges(ranges, progress)
+                if entry["format"] == "bundle":
+                    restore_bundle_chunked(self.cache_path, file_name, {
+                        path: {"size": size, "mtime": mtime / 1e9, "hash": content_hash, "chunks": chunk_lists[content_hash]}
+                        for path, (size, mtime, content_hash) in contents.items()})
+                else:
+                    manifest = {"name": file_name, "size": entry["size"], "mtime": entry["mtime"] / 1e9,
+                                "hash": entry["hash"], "chunks": chunk_lists[entry["hash"]]}
+                    write_file_atomic(get_manifest_path(self.cache_path, file_name), json.dumps(manifest).encode("utf-8"))
+                self.record_chunks(file_name, [chunk_hash for chunks in chunk_lists.values() for chunk_hash, _ in chunks])
+                index.invalidate()
+                index.refresh()
+            record_library_use(self.cache_path, file_name)
+            self.trim_cache()
+        return downloaded
+
+    def get_chunk_refs_path(self):
+        return os.path.join(get_chunk_store_path(self.cache_path), "remote_chunks.json")
+
+    def load_chunk_refs(self):
+        try:
+            with open(self.get_chunk_refs_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record_chunks(self, file_name, chunk_hashes):
+        refs = self.load_chunk_refs()
+        refs[file_name] = sorted(set(chunk_hashes))
+        write_file_atomic(self.get_chunk_refs_path(), json.dumps(refs).encode("utf-8"))
+
+    @contextmanager
+    def pinning(self, file_names):
+        """
+        Keeps file_names in the cache while the enclosed operation runs, so fetching one
+        target of a load never trims away another target fetched for the same load.
+        """
+        with self.lock:
+            for file_name in file_names:
+                self.pinned[file_name] = self.pinned.get(file_name, 0) + 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                for file_name in file_names:
+                    self.pinned[file_name] -= 1
+                    if not self.pinned[file_name]:
+                        del self.pinned[file_name]
+
+    def trim_cache(self):
+        """
+        Drops the versions loaded least recently until the cache fits RemoteCacheMB, then
+        removes the chunks no remaining version uses.  The version used last and the
+        versions pinned by a running operation always stay.
+        """
+        budget = load_config_settings()["RemoteCacheMB"] * 1048576
+        index = get_library_index(self.cache_path)
+        chunk_sizes = {}
+        for directory, _, files in os.walk(os.path.join(get_chunk_store_path(self.cache_path), "chunks")):
+            for chunk_hash in files:
+                chunk_sizes[chunk_hash] = os.path.getsize(os.path.join(directory, chunk_hash))
+        size = sum(chunk_sizes.values()) + sum(entry["size"] for entry in index.entries.values() if entry["format"] == "bundle")
+        if size <= budget:
+            return
+
+        usage = load_library_usage(self.cache_path)
+        refs = self.load_chunk_refs()
+        names = sorted(index.entries, key=lambda name: usage.get(name, 0))
+        for name in names[:-1]:
+            if name in self.pinned:
+                continue
+            for path in get_entry_disk_paths(self.cache_path, name, index.entries[name]["format"]):
+                remove_tree_quietly(path)
+            remove_quietly(get_manifest_path(self.cache_path, name))
+            refs.pop(name, None)
+            if index.entries[name]["format"] == "bundle":
+                size -= index.entries[name]["size"]
+            used = {chunk_hash for chunk_hashes in refs.values() for chunk_hash in chunk_hashes}
+            for chunk_hash in [chunk_hash for chunk_hash in chunk_sizes if chunk_hash not in used]:
+                remove_quietly(get_chunk_path(self.cache_path, chunk_hash))
+                size -= chunk_sizes.pop(chunk_hash)
+            if size <= budget:
+                break
+        write_file_atomic(self.get_chunk_refs_path(), json.dumps(refs).encode("utf-8"))
+        index.invalidate()
+
+    def upload(self, source_path, file_name, progress=None):
+        """
+        Stores a file or bundle on the server as file_name, sending only the chunks it lacks.
+        The chunks are kept in the cache too, since the version is installed on this machine.
+        Returns (chunk count, chunks sent, bytes sent).
+        """
+        if os.path.isdir(source_path):
+            files = {relative_path: write_file_chunks(get_bundle_file_path(source_path, relative_path), self.cache_path)[0]
+                     for relative_path in walk_bundle(source_path)}
+            update = ("PUT", f"/bundle/{file_name}", {"files": files})
+        else:
+            manifest = write_file_chunks(source_path, self.cache_path, progress)[0]
+            files = {file_name: manifest}
+            update = ("PUT", f"/manifest/{file_name}", {"name": file_name, **manifest})
+        lengths = dict(chunk for manifest in files.values() for chunk in manifest["chunks"])
+        missing = self.request_json("POST", "/missing", sorted(lengths))
+
+        def send(chunk_hash):
+            with open(get_chunk_path(self.cache_path, chunk_hash), "rb") as f:
+                self.request("PUT", f"/chunk/{chunk_hash}", f.read(), {"Content-Type": "application/octet-stream"})
+
+        pool = ThreadPoolExecutor(max_workers=REMOTE_CONNECTIONS)
+        try:
+            for job in [pool.submit(send, chunk_hash) for chunk_hash in missing]:
+                job.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        # The manifest goes last, so the version only appears once all of its chunks are there
+        self.request_json(*update)
+
+        with self.lock:
+            if os.path.isdir(source_path):
+                restore_bundle_chunked(self.cache_path, file_name, files)
+            else:
+                write_file_atomic(get_manifest_path(self.cache_path, file_name), json.dumps(update[2]).encode("utf-8"))
+            self.record_chunks(file_name, list(lengths))
+            record_library_use(self.cache_path, file_name)
+            get_library_index(self.cache_path, refresh=False).invalidate()
+            self.listing = None
+        return len(lengths), len(missing), sum(lengths[chunk_hash] for chunk_hash in missing)
+
+REMOTE_LIBRARIES = {}
+
+def get_remote_library(url):
+    """
+    Returns the shared RemoteLibrary for url, so its connections are reused.
+    """
+    with LIBRARY_INDEXES_LOCK:
+        remote = REMOTE_LIBRARIES.get(url)
+        if remote is None:
+            remote = REMOTE_LIBRARIES[url] = RemoteLibrary(url)
+        return remote
+
+@contextmanager
+def pin_remote_entries(library_path, file_names):
+    """
+    Pins file_names in the cache of a remote library for the enclosed block, see RemoteLibrary.pinning.
+    """
+    if not is_remote_library(library_path):
+        yield
+        return
+    with get_remote_library(library_path).pinning(file_names):
+        yield
+
+def is_remote_entry_installed(entry, destination):
+    """
+    True when destination already holds the content of a remote library entry, judged by
+    the sizes and cached fingerprints of the installed files, so nothing needs fetching.
+    """
+    try:
+        if entry["format"] == "bundle":
+            if not os.path.isdir(destination):
+                return False
+            installed = walk_bundle(destination)
+            if set(installed) != set(entry["files"]):
+                return False
+            cache = get_fingerprint_cache()
+            return all(installed[path].st_size == size and
+                       cache.content_hash(get_bundle_file_path(destination, path), save=False) == content_hash
+                       for path, (size, _, content_hash) in entry["files"].items())
+        if os.path.isdir(destination):
+            destination = find_bundle_binary(destination)
+        return (os.path.getsize(destination) == entry["size"] and
+                get_fingerprint_cache().content_hash(destination) == entry["hash"])
+    except (OSError, ValueError):
+        return False
+
+def get_library_versions(library_path, kontakt_version=None, file_extension=None):
+    """
+    Returns the library names for one Kontakt and file type, from the server for a remote library.
+    """
+    if is_remote_library(library_path):
+        return get_remote_library(library_path).versions(kontakt_version, file_extension)
+    return get_library_index(library_path).versions(kontakt_version, file_extension)
+
+# ----------------------------------------------------------------------------------]
+# Background Operations
+
+class OperationCancelled(Exception):
+    """
+    Raised between chunks of a copy once the user has pressed Cancel.
+    """
+
+class QueueWriter:
+    """
+    Stands in for the feedback text widget while an operation runs on worker threads.
+    Text and progress are queued here and drawn by the Tk thread, the only thread allowed
+    to touch widgets.
+    """
+    def __init__(self):
+        self.messages = queue.Queue()
+        self.cancel_event = threading.Event()
+
+    def insert(self, index, text):
+        self.messages.put(("text", text))
+
+    def see(self, index):
+        pass
+
+    def cancel(self):
+        self.cancel_event.set()
+
+def make_progress_callback(text_widget, file_name):
+    """
+    Returns a copy progress callback that reports to a QueueWriter and stops the copy once
+    it has been cancelled, or None when the output is an ordinary text widget.
+    """
+    if not isinstance(text_widget, QueueWriter):
+        return None
+
+    def progress(copied, total):
+        if text_widget.cancel_event.is_set():
+            raise OperationCancelled(file_name)
+        text_widget.messages.put(("progress", file_name, copied, total))
+    return progress
+
+# ----------------------------------------------------------------------------------]
+# Operation Timing
+
+# Each operation records spans for its phases (validation, lookup, copy, switch, config
+# write) per target.  When the operation ends, its spans are appended as one JSON line to
+# timings.jsonl in the config directory, which is rotated once it grows past a limit.
+# With TimingLog = False in settings.ini a NullTimer is used, whose spans do nothing.
+TIMING_LOG_NAME      = "timings.jsonl"
+TIMING_LOG_MAX_SIZE  = 1024 * 1024
+TIMING_LOG_BACKUPS   = 3
+TIMING_LOG_LOCK      = threading.Lock()
+
+class OperationTimer:
+    """
+    Collects the timed phases of one operation.  Spans can be recorded from several threads.
+    """
+    def __init__(self, operation):
+        self.operation = operation
+        self.started = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase, target=None, size=None):
+        """
+        Times the enclosed block as one phase of target, size being the bytes it processes.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            span = {"phase": phase, "target": target, "start": round(started - self.started, 6), "seconds": round(seconds, 6)}
+            if size is not None:
+                span["bytes"] = size
+                span["mb_per_s"] = round(size / 1048576 / max(seconds, 1e-9), 1)
+            with self.lock:
+                self.spans.append(span)
+
+    def phase_totals(self):
+        """
+        Returns the wall clock seconds of each phase, in the order the phases started, along
+        with its spans.  Targets run in parallel, so the seconds are the time covered by any
+        of the phase's spans rather than their sum.
+        """
+        totals = {}
+        for span in sorted(self.spans, key=lambda span: span["start"]):
+            total = totals.setdefault(span["phase"], {"seconds": 0.0, "end": None, "spans": []})
+            start = span["start"]
+            end = start + span["seconds"]
+            if total["end"] is None or start >= total["end"]:
+                total["seconds"] += span["seconds"]
+                total["end"] = end
+            elif end > total["end"]:
+                total["seconds"] += end - total["end"]
+                total["end"] = end
+            total["spans"].append(span)
+        return totals
+
+    def summary(self):
+        """
+        Returns a one line summary for the output window, with the speed of each target
+        taken from its own span.
+        """
+        parts = []
+        for phase, total in self.phase_totals().items():
+            speeds = [span for span in total["spans"] if span.get("bytes")]
+            if len(speeds) == 1:
+                parts.append(f"{phase} {total['seconds']:.2f}s ({speeds[0]['mb_per_s']:.0f} MB/s)")
+            elif speeds:
+                rates = ", ".join(f"{os.path.splitext(span['target'] or '')[1] or span['target']} {span['mb_per_s']:.0f} MB/s" for span in speeds)
+                parts.append(f"{phase} {total['seconds']:.2f}s ({rates})")
+            else:
+                parts.append(f"{phase} {total['seconds']:.2f}s")
+        return f"Timings : {', '.join(parts)}, total {time.perf_counter() - self.started:.2f}s"
+
+    def write_log(self, details):
+        """
+        Appends the operation and its spans to the timing log.
+        """
+        record = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "operation": self.operation,
+                  "seconds": round(time.perf_counter() - self.started, 6), "spans": self.spans}
+        record.update(details)
+        path = os.path.join(get_config_dir(), TIMING_LOG_NAME)
+        with TIMING_LOG_LOCK:
+            try:
+                if os.path.getsize(path) > TIMING_LOG_MAX_SIZE:
+                    rotate_timing_log(path)
+            except OSError:
+                pass
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+
+class NullTimer:
+    """
+    Stands in for OperationTimer when timing is turned off.
+    """
+    spans = []
+
+    def span(self, phase, target=None, size=None):
+        return NULL_SPAN
+
+NULL_SPAN  = nullcontext()
+NULL_TIMER = NullTimer()
+
+def rotate_timing_log(path):
+    """
+    Shifts timings.jsonl to timings.1.jsonl and so on, dropping the oldest.
+    """
+    stem, extension = os.path.splitext(path)
+    for number in range(TIMING_LOG_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{stem}.{number}{extension}"):
+            os.replace(f"{stem}.{number}{extension}", f"{stem}.{number + 1}{extension}")
+    os.replace(path, f"{stem}.1{extension}")
+
+# ----------------------------------------------------------------------------------]
+# Load Transactions
+
+# A load writes every target to '<installed file>.kvm-staged' first.  Once all targets are
+# staged, each installed file is renamed to '.kvm-backup' and the staged file renamed into
+# its place, so the switch only takes a few renames.  A journal in the config directory
+# lets the next start finish or undo a switch that was interrupted.
+STAGED_SUFFIX        = ".kvm-staged"
+BACKUP_SUFFIX        = ".kvm-backup"
+
+def get_staged_path(destination):
+    return f"{destination}{STAGED_SUFFIX}"
+
+def get_backup_path(destination):
+    return f"{destination}{BACKUP_SUFFIX}"
+
+def get_journal_path():
+    return os.path.join(get_config_dir(), "load_transaction.json")
+
+def write_load_journal(state, targets):
+    journal = {"state": state, "targets": targets}
+    write_file_atomic(get_journal_path(), json.dumps(journal).encode("utf-8"))
+
+def get_staging_paths(destination):
+    """
+    Returns every path a load of destination may stage to.  A version stored as a single
+    file is staged next to the binary inside an installed bundle rather than the bundle.
+    """
+    paths = [get_staged_path(destination)]
+    if os.path.isdir(destination):
+        try:
+            paths.append(get_staged_path(find_bundle_binary(destination)))
+        except (OSError, ValueError):
+            pass
+    return paths
+
+def begin_load_transaction(destinations):
+    """
+    Records the targets about to be staged, so leftovers can be cleaned up after a crash.
+    """
+    write_load_journal("staging", [{"destination": destination, "staged": get_staged_path(destination),
+                                    "staging_paths": get_staging_paths(destination)}
+                                   for destination in destinations])
+
+def abort_load_transaction(destinations, staging_paths=None):
+    """
+    Throws away the staged files of a load that will not be committed.
+    """
+    if staging_paths is None:
+        staging_paths = [path for destination in destinations for path in get_staging_paths(destination)]
+    for path in staging_paths:
+        remove_tree_quietly(path)
+    remove_quietly(get_journal_path())
+
+def switch_staged_file(target):
+    """
+    Moves the installed file aside and the staged file into its place.
+    """
+    if target.get("bundle"):
+        switch_bundle(target)
+        return
+    destination = target["destination"]
+    if os.path.exists(target["staged"]):
+        if os.path.exists(destination) and not os.path.exists(get_backup_path(destination)):
+            os.replace(destination, get_backup_path(destination))
+        os.replace(target["staged"], destination)
+
+def roll_back_target(target):
+    """
+    Puts the previously installed file back, or removes a file the load added.
+    """
+    if target.get("bundle"):
+        roll_back_bundle(target)
+        return
+    destination = target["destination"]
+    if os.path.exists(get_backup_path(destination)):
+        os.replace(get_backup_path(destination), destination)
+    elif not target["existed"] and os.path.exists(destination):
+        os.remove(destination)
+    remove_quietly(target["staged"])
+
+def finish_load_transaction(targets):
+    """
+    Records the loaded versions and removes the backups of a committed load.
+    """
+    with get_config_store().batch():
+        for target in targets:
+            store_kontakt_version_in_config(target["kontakt_version"], target["extension"], target["version"])
+    for target in targets:
+        # A backup of a plugin still open in a DAW cannot be deleted yet, the next load retries
+        remove_tree_quietly(get_backup_path(target["destination"]))
+        try:
+            record_library_use(target["library_path"], target["file_name"])
+        except OSError:
+            pass
+    remove_quietly(get_journal_path())
+
+def commit_load_transaction(targets, text_widget, timer=NULL_TIMER):
+    """
+    Switches every staged target into place.  If any rename fails, the targets already
+    switched are rolled back so all formats stay on the same version.  Returns True when
+    the load was committed.
+    """
+    for target in targets:
+        target["existed"] = os.path.exists(target["destination"])
+        remove_tree_quietly(get_backup_path(target["destination"]))
+    staged = [target for target in targets if target["staged"]]
+    write_load_journal("committing", targets)
+
+    switched = []
+    try:
+        for target in staged:
+            switched.append(target)
+            with timer.span("switch", target["file_name"]):
+                switch_staged_file(target)
+    except OSError as e:
+        failed = switched[-1]["file_name"]
+        for target in reversed(switched):
+            try:
+                roll_back_target(target)
+            except OSError:
+                pass
+        for target in staged:
+            remove_tree_quietly(target["staged"])
+        remove_quietly(get_journal_path())
+        text_widget.insert(END,f"\nFailed to switch {failed}, the previous versions were put back. Error: {e}\n")
+        return False
+
+    for target in targets:
+        if target["staged"] is None:
+            text_widget.insert(END,f"\n{target['file_name']} already current")
+        else:
+            # The installed file now has the library content, so the next check needs no read
+            if not target.get("bundle"):
+                get_fingerprint_cache().record(target["destination"], target["hash"])
+            text_widget.insert(END,f"\n{target['file_name']} loaded ({target['method']})")
+    with timer.span("finish"):
+        finish_load_transaction(targets)
+    return True
+
+def is_target_switched(target):
+    """
+    True when switch_staged_file has moved a target into place.  A file that was installed
+    before is switched once its backup exists, which tells it apart from an installed file
+    whose staged copy was lost.
+    """
+    if target.get("bundle") or not target["existed"]:
+        return os.path.exists(target["destination"])
+    return os.path.exists(get_backup_path(target["destination"]))
+
+def recover_load_transaction(text_widget):
+    """
+    Finishes or undoes a load that was interrupted, using the journal it left behind.
+    """
+    try:
+        with open(get_journal_path(), "r", encoding="utf-8") as f:
+            journal = json.load(f)
+    except (OSError, ValueError):
+        return
+
+    targets = journal["targets"]
+    if journal["state"] == "staging":
+        abort_load_transaction([], [path for target in targets
+                                    for path in target.get("staging_paths", [target["staged"]])])
+        text_widget.insert(END,"\nCleaned up the files of a load that was interrupted before anything was switched\n")
+        return
+
+    # Every target is either switched already or still has its staged file, unless files
+    # were removed by hand.  In that case the load is undone instead.
+    staged = [target for target in targets if target["staged"]]
+    complete = all(os.path.exists(target["staged"]) or is_target_switched(target) for target in staged)
+    try:
+        if complete:
+            for target in staged:
+                switch_staged_file(target)
+            finish_load_transaction(targets)
+            text_widget.insert(END,"\nCompleted a load that was interrupted while switching files\n")
+            return
+    except OSError:
+        pass
+
+    for target in staged:
+        try:
+            roll_back_target(target)
+        except OSError as e:
+            text_widget.insert(END,f"\nCould not restore {target['destination']}. Error: {e}")
+    remove_quietly(get_journal_path())
+    text_widget.insert(END,"\nUndid a load that was interrupted while switching files\n")
+
+# ----------------------------------------------------------------------------------]
+# Prefetch
+
+# While a detail version is typed or picked, the library files it would load are read into
+# the OS page cache on a background thread, followed by the most recently loaded versions,
+# so pressing Load does not wait for a cold disk or NAS.  Each pass reads at most
+# PrefetchBudgetMB (settings.ini, 0 turns prefetching off), files read recently are skipped,
+# and a new request or an operation starting cancels the pass in progress.
+PREFETCH_DEBOUNCE    = 0.4       # seconds without typing before a pass starts
+PREFETCH_RECENT      = 3         # recently loaded versions kept warm
+PREFETCH_REWARM_AGE  = 300       # seconds before a warmed file is read again
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+def get_library_entry_files(index, file_name):
+    """
+    Returns the files read when loading library entry file_name, including delta bases and chunks.
+    """
+    entry = index.find(file_name)
+    if entry is None:
+        return []
+    if entry["format"] == "files":
+        return [os.path.join(index.library_path, file_name)]
+    if entry["format"] == "bundle":
+        bundle_path = os.path.join(index.library_path, file_name)
+        return [get_bundle_file_path(bundle_path, path) for path in load_bundle_manifest(index.library_path, file_name)["files"]]
+    if entry["format"] == "compressed":
+        return [get_compressed_path(index.library_path, file_name)]
+    if entry["format"] == "delta":
+        delta_path = get_delta_path(index.library_path, file_name)
+        return [delta_path] + get_library_entry_files(index, read_delta_header(delta_path)["base"])
+    manifest_path = get_manifest_path(index.library_path, file_name)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return [manifest_path] + [get_chunk_path(index.library_path, chunk_hash) for chunk_hash, _ in manifest["chunks"]]
+
+def warm_file(path, buffer, is_cancelled):
+    """
+    Gets path into the page cache, through readahead where the OS offers it and by reading it
+    otherwise.  Returns False when cancelled part way.
+    """
+    with open(path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_WILLNEED)
+            return True
+        while f.readinto(buffer):
+            if is_cancelled():
+                return False
+    return True
+
+def lower_thread_priority():
+    """
+    Puts the calling thread in background mode on Windows, which also lowers its disk priority.
+    """
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            kernel32 = ctypes.windll.kernel32
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+        except (ImportError, AttributeError, OSError):
+            pass
+
+class LibraryPrefetcher:
+    """
+    Background thread warming the library files of the wanted and recently loaded versions.
+    A version is (library_path, kontakt_version, new_version, include_vst, include_aax).
+    """
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.wanted = None
+        self.recent = []
+        self.generation = 0
+        self.requested = 0.0
+        self.stopped = False
+        self.warmed = {}
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def request(self, version):
+        """
+        Asks for version to be warmed, cancelling the pass in progress.
+        """
+        with self.condition:
+            self.wanted = version
+            self.generation += 1
+            self.requested = time.monotonic()
+            self.condition.notify()
+
+    def remember(self, version):
+        """
+        Moves a version that was just loaded to the front of the recently loaded list.
+        """
+        with self.condition:
+            if version in self.recent:
+                self.recent.remove(version)
+            self.recent.insert(0, version)
+            del self.recent[PREFETCH_RECENT:]
+
+    def cancel(self):
+        """
+        Stops the pass in progress, leaving the thread waiting for the next request.
+        """
+        with self.condition:
+            self.wanted = None
+            self.generation += 1
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.generation += 1
+            self.condition.notify()
+
+    def run(self):
+        lower_thread_priority()
+        buffer = bytearray(READ_BUFFER_SIZE)
+        while True:
+            with self.condition:
+                while not self.stopped and self.wanted is None:
+                    self.condition.wait()
+                # Wait for typing to pause, so every keystroke does not start a pass
+                while not self.stopped and self.wanted is not None and time.monotonic() - self.requested < PREFETCH_DEBOUNCE:
+                    self.condition.wait(PREFETCH_DEBOUNCE)
+                if self.stopped:
+                    return
+                if self.wanted is None:
+                    # Cancelled while waiting, e.g. by Load being pressed
+                    continue
+                versions = [self.wanted] + [version for version in self.recent if version != self.wanted]
+                self.wanted = None
+                generation = self.generation
+            try:
+                self.warm(versions, buffer, lambda: self.generation != generation)
+            except Exception:
+                # Prefetching is only a hint, a library that cannot be read is reported by the load
+                pass
+
+    def warm(self, versions, buffer, is_cancelled):
+        budget = load_config_settings()["PrefetchBudgetMB"] * 1048576
+        if budget <= 0:
+            return
+        now = time.monotonic()
+        self.warmed = {key: warmed for key, warmed in self.warmed.items() if now - warmed < PREFETCH_REWARM_AGE}
+        for library_path, kontakt_version, new_version, include_vst, include_aax in versions:
+            if not is_remote_library(library_path) and not os.path.isdir(library_path):
+                continue
+            index = get_library_index(library_path)
+            if not index.available:
+                continue
+            extensions = ['.exe'] + (['.vst3'] if include_vst else []) + (['.aaxplugin'] if include_aax else [])
+            for extension in extensions:
+                for path in get_library_entry_files(index, f'Kontakt {new_version}{extension}'):
+                    if is_cancelled():
+                        return
+                    stat = os.stat(path)
+                    key = (path, stat.st_size, stat.st_mtime_ns)
+                    if now - self.warmed.get(key, -PREFETCH_REWARM_AGE) < PREFETCH_REWARM_AGE:
+                        continue
+                    if stat.st_size > budget:
+                        return
+                    if not warm_file(path, buffer, is_cancelled):
+                        return
+                    budget -= stat.st_size
+                    self.warmed[key] = now
+
+# ----------------------------------------------------------------------------------]
+# Install Discovery
+
+# The folders in InstallRoots and PluginRoots (settings.ini, separated by ';') are searched a
+# few levels deep for Kontakt executables, VST and AAX plugins, and each one found is classed
+# by Kontakt version and type from its name.  The result is kept in the config directory with
+# the mtime of every folder searched, so a start only stats those folders, and a root is only
+# searched again once one of its folders has changed.  A Kontakt version or type that is not
+# installed anywhere gets the path the installer would use, which is where a load writes it.
+
+INSTALL_SCAN_DEPTH   = 2         # folder levels searched below each root
+INSTALL_INDEX_AGE    = 30.0      # seconds before the folders are checked for changes again
+INSTALL_NAME         = re.compile(r"Kontakt(?: (\d+))?(\.exe|\.vst3|\.dll|\.aaxplugin)", re.IGNORECASE)
+INSTALL_TYPES        = ("exe", "vst", "aax")
+
+def get_default_install_paths(kontakt_version):
+    """
+    Returns the exe, vst and aax paths the Kontakt installers use by default.
+    """
+    if kontakt_version == 6:
+        name = 'Kontakt'
+    else:
+        name = f'Kontakt {kontakt_version}'
+    if kontakt_version == 5:
+        vst_path = get_install_path('Steinberg', 'VSTPlugins', 'Native Instruments64', 'Kontakt 5.dll')
+    else:
+        vst_path = get_install_path('Common Files', 'VST3', f'{name}.vst3')
+    return (get_install_path('Native Instruments', name, f'{name}.exe'),
+            vst_path,
+            get_install_path('Common Files', 'Avid', 'Audio', 'Plug-Ins', f'{name}.aaxplugin'))
+
+def get_install_roots():
+    """
+    Returns the folders searched for installs, from settings.ini or the default locations.
+    """
+    settings = load_config_settings()
+    install_roots = [root.strip() for root in settings["InstallRoots"].split(";") if root.strip()]
+    plugin_roots = [root.strip() for root in settings["PluginRoots"].split(";") if root.strip()]
+    return (install_roots or [get_install_path('Native Instruments')]) + (plugin_roots or [
+        get_install_path('Common Files', 'VST3'),
+        get_install_path('Common Files', 'Avid', 'Audio', 'Plug-Ins'),
+        get_install_path('Steinberg', 'VSTPlugins')])
+
+def classify_install(path, name, is_dir):
+    """
+    Returns (Kontakt version, type) for a Kontakt binary or bundle, or None for anything else.
+    """
+    match = INSTALL_NAME.fullmatch(name)
+    if match is None:
+        return None
+    extension = match.group(2).lower()
+    # The exe and dll are files, an AAX plugin is always a bundle and a VST3 can be either
+    if is_dir != (extension in BUNDLE_EXTENSIONS) and extension != ".vst3":
+        return None
+    if match.group(1):
+        return int(match.group(1)), LIBRARY_TYPES[extension]
+
+    # Kontakt 6 dropped the number from its name, so an unnumbered install is asked its version
+    try:
+        version_info = get_version_detector().detect(find_bundle_binary(path) if is_dir else path)
+    except (OSError, ValueError):
+        version_info = None
+    numbers = re.findall(r"\d+", format_pe_version(version_info)) if version_info else []
+    return (int(numbers[0]) if numbers else 6), LIBRARY_TYPES[extension]
+
+class InstallIndex:
+    """
+    The Kontakt installs found under the install and plugin roots, kept in the config
+    directory.  Like the library index, a refresh only stats the folders that were searched,
+    so resolving the install paths at start costs a handful of stats.
+    """
+    def __init__(self):
+        self.index_path = os.path.join(get_config_dir(), "install_index.json")
+        self.lock = threading.RLock()
+        self.roots = {}
+        self.installs = {}
+        self.refreshed = None
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.roots = json.load(f)["roots"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def save(self):
+        write_file_atomic(self.index_path, json.dumps({"roots": self.roots}).encode("utf-8"))
+
+    def scan_root(self, root):
+        """
+        Searches one root, returning the mtime of every folder listed and the installs found.
+        """
+        directories = {}
+        found = []
+        pending = [(root, 0)]
+        while pending:
+            directory, depth = pending.pop()
+            try:
+                directories[directory] = os.stat(directory).st_mtime_ns
+                items = list(os.scandir(directory))
+            except OSError:
+                directories[directory] = None
+                continue
+            for item in items:
+                is_dir = item.is_dir()
+                classified = classify_install(item.path, item.name, is_dir)
+                if classified:
+                    found.append([item.path, classified[0], classified[1]])
+                elif is_dir and depth < INSTALL_SCAN_DEPTH and not item.name.lower().endswith(BUNDLE_EXTENSIONS):
+                    pending.append((item.path, depth + 1))
+        return {"directories": directories, "found": sorted(found)}
+
+    def is_current(self, scanned):
+        for directory, mtime in scanned["directories"].items():
+            try:
+                if os.stat(directory).st_mtime_ns != mtime:
+                    return False
+            except OSError:
+                if mtime is not None:
+                    return False
+        return True
+
+    def refresh(self):
+        """
+        Searches again every root that is new or has a changed folder, and picks one path per
+        Kontakt version and type.  A default install path wins over other copies it finds.
+        """
+        with self.lock:
+            roots = get_install_roots()
+            changed = set(self.roots) != set(roots)
+            for root in roots:
+                if root not in self.roots or not self.is_current(self.roots[root]):
+                    self.roots[root] = self.scan_root(root)
+                    changed = True
+            self.roots = {root: self.roots[root] for root in roots}
+            if changed:
+                self.save()
+
+            installs = {}
+            for root in roots:
+                for path, kontakt_version, install_type in self.roots[root]["found"]:
+                    key = (kontakt_version, install_type)
+                    defaults = get_default_install_paths(kontakt_version)
+                    if key not in installs or path in defaults:
+                        installs[key] = path
+            self.installs = installs
+            self.refreshed = time.monotonic()
+
+    def find(self, kontakt_version):
+        """
+        Returns the exe, vst and aax paths of one Kontakt version, refreshing the index first
+        when it was last checked more than INSTALL_INDEX_AGE seconds ago.
+        """
+        with self.lock:
+            if self.refreshed is None or time.monotonic() - self.refreshed > INSTALL_INDEX_AGE:
+                self.refresh()
+            defaults = get_default_install_paths(kontakt_version)
+            return tuple(self.installs.get((kontakt_version, install_type), default)
+                         for install_type, default in zip(INSTALL_TYPES, defaults))
+
+    def versions(self):
+        """
+        Returns the Kontakt versions installed, along with the usual ones.
+        """
+        with self.lock:
+            if self.refreshed is None:
+                self.refresh()
+            return sorted(set(KONTAKT_VERSIONS) | {kontakt_version for kontakt_version, _ in self.installs})
+
+INSTALL_INDEX = None
+INSTALL_INDEX_LOCK = threading.Lock()
+
+def get_install_index():
+    global INSTALL_INDEX
+    with INSTALL_INDEX_LOCK:
+        if INSTALL_INDEX is None:
+            INSTALL_INDEX = InstallIndex()
+        return INSTALL_INDEX
+
+# ----------------------------------------------------------------------------------]
+# Install Watcher
+
+# With Store New Installs ticked, a watcher thread keeps an eye on the install paths of every
+# Kontakt.  On Windows it sleeps on change notifications for their folders, elsewhere it stats
+# the paths every few seconds.  A changed file is stored once the installer has left it alone
+# for WATCH_SETTLE seconds, under the version read from the binary.  When the watcher starts,
+# an installed version missing from the library is stored straight away, so the version an
+# update replaces is already in the library by the time it is overwritten.
+
+WATCH_SETTLE         = 10.0      # seconds a changed file has to stay the same before it is stored
+WATCH_POLL_INTERVAL  = 5.0       # seconds between checks without change notifications
+WATCH_IDLE_INTERVAL  = 60.0      # seconds between checks of paths whose folder does not exist yet
+FILE_NOTIFY_FILTER   = 0x01 | 0x02 | 0x08 | 0x10    # file name, folder name, size and last write changes
+
+def get_install_signature(path):
+    """
+    Returns what changes when an installed file or bundle is written, or None when it is missing.
+    """
+    try:
+        if os.path.isdir(path):
+            files = walk_bundle(path).values()
+            return [len(files), sum(stat.st_size for stat in files), max((stat.st_mtime_ns for stat in files), default=0)]
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        return None
+
+def is_install_readable(path):
+    """
+    False while an installer still holds the installed binary open for writing.
+    """
+    try:
+        with open(find_bundle_binary(path) if os.path.isdir(path) else path, "rb") as f:
+            f.read(1)
+        return True
+    except (OSError, ValueError):
+        return False
+
+def store_new_install(path, file_extension, kontakt_version, library_path, storage_mode, text_widget):
+    """
+    Stores the binary installed at path under the version it reports, unless the library
+    already holds it.  Returns True when it was stored.
+    """
+    index = get_library_index(library_path)
+    if not index.available or not os.path.exists(path):
+        return False
+    if find_installed_version(index, path, file_extension, kontakt_version):
+        return False
+
+    try:
+        version_info = get_version_detector().detect(find_bundle_binary(path) if os.path.isdir(path) else path)
+    except (OSError, ValueError):
+        version_info = None
+    numbers = re.findall(r"\d+", format_pe_version(version_info)) if version_info else []
+    if not numbers or int(numbers[0]) != kontakt_version:
+        text_widget.insert(END,f"\nKontakt {kontakt_version}{file_extension} has changed but its version cannot be read, store it by hand")
+        return False
+    version = ".".join(numbers[:3])
+    if index.find(f'Kontakt {version}{file_extension}'):
+        text_widget.insert(END,f"\nThe installed Kontakt {version}{file_extension} differs from the one in the library, store it by hand under another name")
+        return False
+
+    text_widget.insert(END,f"\nNew install of Kontakt {version}{file_extension} found")
+    return store_kontakt(path, library_path, version, kontakt_version, text_widget, storage_mode)
+
+class ChangeNotifier:
+    """
+    Waits for changes in a set of folders with FindFirstChangeNotification on Windows.
+    Elsewhere, or when no folder can be watched, it only waits for the timeout.
+    """
+    def __init__(self, directories):
+        self.handles = []
+        self.wake_handle = None
+        self.wake_event = threading.Event()
+        if sys.platform != "win32":
+            return
+        try:
+            import ctypes
+            self.ctypes = ctypes
+            self.kernel32 = ctypes.windll.kernel32
+            self.kernel32.FindFirstChangeNotificationW.restype = ctypes.c_void_p
+            self.kernel32.FindFirstChangeNotificationW.argtypes = [ctypes.c_wchar_p, ctypes.c_int, ctypes.c_uint32]
+            self.kernel32.FindNextChangeNotification.argtypes = [ctypes.c_void_p]
+            self.kernel32.FindCloseChangeNotification.argtypes = [ctypes.c_void_p]
+            self.kernel32.CreateEventW.restype = ctypes.c_void_p
+            self.kernel32.CreateEventW.argtypes = [ctypes.c_void_p, ctypes.c_int, ctypes.c_int, ctypes.c_wchar_p]
+            self.kernel32.SetEvent.argtypes = [ctypes.c_void_p]
+            self.kernel32.CloseHandle.argtypes = [ctypes.c_void_p]
+            self.kernel32.WaitForMultipleObjects.argtypes = [ctypes.c_uint32, ctypes.POINTER(ctypes.c_void_p), ctypes.c_int, ctypes.c_uint32]
+            self.kernel32.WaitForMultipleObjects.restype = ctypes.c_uint32
+        except (ImportError, AttributeError, OSError):
+            return
+
+        invalid_handle = ctypes.c_void_p(-1).value
+        # WaitForMultipleObjects takes at most 64 handles, one of them the wake event
+        for directory in directories[:63]:
+            handle = self.kernel32.FindFirstChangeNotificationW(directory, True, FILE_NOTIFY_FILTER)
+            if handle and handle != invalid_handle:
+                self.handles.append(handle)
+        if self.handles:
+            self.wake_handle = self.kernel32.CreateEventW(None, True, False, None)
+
+    def wait(self, timeout):
+        """
+        Returns once a watched folder changes, wake() is called or timeout seconds pass.
+        """
+        if not self.wake_handle:
+            self.wake_event.wait(timeout)
+            return
+        handles = self.handles + [self.wake_handle]
+        array = (self.ctypes.c_void_p * len(handles))(*handles)
+        signalled = self.kernel32.WaitForMultipleObjects(len(handles), array, False, int(timeout * 1000))
+        if signalled < len(self.handles):
+            self.kernel32.FindNextChangeNotification(self.handles[signalled])
+
+    def wake(self):
+        self.wake_event.set()
+        if self.wake_handle:
+            self.kernel32.SetEvent(self.wake_handle)
+
+    def close(self):
+        for handle in self.handles:
+            self.kernel32.FindCloseChangeNotification(handle)
+        if self.wake_handle:
+            self.kernel32.CloseHandle(self.wake_handle)
+        self.handles = []
+        self.wake_handle = None
+
+class InstallWatcher:
+    """
+    Watches the installed exe, vst and aax of every Kontakt and stores each new version
+    into the library once the installer has finished with it.
+    """
+    def __init__(self, text_widget, library_path, storage_mode="files", include_vst=True, include_aax=True):
+        self.text_widget = text_widget
+        self.lock = threading.Lock()
+        self.stopped = False
+        self.notifier = None
+        self.thread = None
+        self.include_vst = include_vst
+        self.include_aax = include_aax
+        self.configure(library_path, storage_mode)
+
+    def configure(self, library_path, storage_mode):
+        """
+        Sets the library and storage mode used for the versions stored from now on.
+        """
+        with self.lock:
+            self.library_path = library_path
+            self.storage_mode = storage_mode
+
+    def get_targets(self):
+        included = {'.exe': True, '.vst3': self.include_vst, '.aaxplugin': self.include_aax}
+        targets = []
+        for kontakt_version in get_install_index().versions():
+            for path, file_extension in zip(set_kontakt_version(kontakt_version), ('.exe', '.vst3', '.aaxplugin')):
+                if included[file_extension]:
+                    targets.append((path, file_extension, kontakt_version))
+        return targets
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            if self.notifier:
+                self.notifier.wake()
+
+    def store(self, path, file_extension, kontakt_version):
+        with self.lock:
+            library_path, storage_mode = self.library_path, self.storage_mode
+        try:
+            store_new_install(path, file_extension, kontakt_version, library_path, storage_mode, self.text_widget)
+        except Exception as e:
+            self.text_widget.insert(END,f"\nFailed to store the new install of Kontakt {kontakt_version}{file_extension}. Error: {e}\n")
+
+    def run(self):
+        lower_thread_priority()
+        targets = self.get_targets()
+        # Anything installed that the library does not hold yet is kept before it can be replaced
+        for target in targets:
+            self.store(*target)
+        signatures = {path: get_install_signature(path) for path, _, _ in targets}
+        changed = {}
+
+        directories = sorted({os.path.dirname(path) for path, _, _ in targets if os.path.isdir(os.path.dirname(path))})
+        notifier = ChangeNotifier(directories)
+        with self.lock:
+            self.notifier = notifier
+            stopped = self.stopped
+        try:
+            while not stopped:
+                if changed:
+                    timeout = 1.0
+                else:
+                    timeout = WATCH_IDLE_INTERVAL if notifier.handles else WATCH_POLL_INTERVAL
+                notifier.wait(timeout)
+                with self.lock:
+                    stopped = self.stopped
+                if stopped:
+                    break
+
+                # Each write restarts the wait, so a file is only stored after the installer is done
+                now = time.monotonic()
+                for path, _, _ in targets:
+                    signature = get_install_signature(path)
+                    if signature != signatures[path]:
+                        signatures[path] = signature
+                        changed[path] = now
+                for path, file_extension, kontakt_version in targets:
+                    if path in changed and now - changed[path] >= WATCH_SETTLE and is_install_readable(path):
+                        del changed[path]
+                        self.store(path, file_extension, kontakt_version)
+                        signatures[path] = get_install_signature(path)
+        finally:
+            notifier.close()
+
+# ----------------------------------------------------------------------------------]
+# Config Store
+
+class ConfigStore:
+    """
+    Keeps settings.ini in memory.  Reads are answered from memory and writes are collected
+    until the outermost batch() ends, then flushed once with a temp file and os.replace, so
+    the file on disk is never half written.  If another program changes the file, it is
+    read again on the next access and any unsaved changes are applied on top.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.RLock()
+        self.config = configparser.ConfigParser()
+        self.mtime = None
+        self.pending = {}
+        self.batch_depth = 0
+        self.reported = set()
+        self.check_external_change()
+
+    def check_external_change(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self.mtime:
+            return
+
+        self.config = configparser.ConfigParser()
+        if mtime is not None:
+            self.config.read(self.path, encoding="utf-8")
+        self.mtime = mtime
+        for (section, option), value in self.pending.items():
+            self.apply(section, option, value)
+
+    def apply(self, section, option, value):
+        if value is None:
+            if self.config.has_section(section):
+                self.config.remove_option(section, option)
+            return
+        if not self.config.has_section(section):
+            self.config.add_section(section)
+        self.config[section][option] = value
 
-# ----------------------------------------------------------------------------------]
-# Imports
+    def refresh(self):
+        with self.lock:
+            # Inside a batch the file was checked when the batch started
+            if self.batch_depth == 0:
+                self.check_external_change()
 
-from appdirs import user_config_dir
-import tkinter as tk
-from tkinter import ttk
-import os
-import shutil
-from colorama import Fore, Style
-import configparser
-import webbrowser
+    def get(self, section, option, fallback=None):
+        with self.lock:
+            self.refresh()
+            return self.config.get(section, option, fallback=fallback)
+
+    def items(self, section):
+        """
+        Returns every option of a section as a dictionary, empty when the section is missing.
+        """
+        with self.lock:
+            self.refresh()
+            if not self.config.has_section(section):
+                return {}
+            return {option: self.config.get(section, option, raw=True) for option in self.config.options(section)}
+
+    def get_converted(self, section, option, convert, fallback=None):
+        """
+        Returns an option converted with convert, or fallback when it is missing.  A value
+        that cannot be converted, as after a typo in settings.ini, is reported once on
+        stderr and fallback is used, so it never stops the program from starting.
+        """
+        with self.lock:
+            self.refresh()
+            value = self.config.get(section, option, fallback=None)
+            if value is None:
+                return fallback
+            try:
+                return convert(value.strip())
+            except (ValueError, KeyError):
+                if (section, option, value) not in self.reported:
+                    self.reported.add((section, option, value))
+                    print(f"settings.ini: '{option} = {value}' is not valid, using {fallback}", file=sys.stderr)
+                return fallback
+
+    def getint(self, section, option, fallback=None):
+        return self.get_converted(section, option, int, fallback)
+
+    def getfloat(self, section, option, fallback=None):
+        return self.get_converted(section, option, float, fallback)
+
+    def getboolean(self, section, option, fallback=None):
+        return self.get_converted(section, option, lambda value: self.config.BOOLEAN_STATES[value.lower()], fallback)
+
+    def set(self, section, option, value):
+        """
+        Sets an option, or removes it when value is None.  Written at the end of the
+        current batch, or straight away outside of one.
+        """
+        with self.lock:
+            self.refresh()
+            self.pending[(section, self.config.optionxform(option))] = value
+            self.apply(section, option, value)
+            if self.batch_depth == 0:
+                self.flush()
+
+    @contextmanager
+    def batch(self):
+        """
+        Collects every write made inside the with block, from any thread, into one flush.
+        """
+        with self.lock:
+            if self.batch_depth == 0:
+                self.check_external_change()
+            self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.batch_depth -= 1
+                if self.batch_depth == 0:
+                    self.flush()
+
+    def flush(self):
+        with self.lock:
+            if not self.pending:
+                return
+            temp_path = get_part_path(self.path)
+            try:
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    self.config.write(f)
+                os.replace(temp_path, self.path)
+            except BaseException:
+                remove_quietly(temp_path)
+                raise
+            self.mtime = os.stat(self.path).st_mtime_ns
+            self.pending = {}
+
+CONFIG_STORE = None
+CONFIG_STORE_LOCK = threading.Lock()
+
+def get_config_store():
+    """
+    Returns the shared ConfigStore for settings.ini.
+    """
+    global CONFIG_STORE
+    with CONFIG_STORE_LOCK:
+        if CONFIG_STORE is None:
+            CONFIG_STORE = ConfigStore(get_config_path())
+        return CONFIG_STORE
 
 # ----------------------------------------------------------------------------------]
-# Options
+# Version Detection
 
-APP_NAME             = 'Kontakt Version Manager'
-APP_AUTHOR           = 'Its All Noise'     
-CONFIG_SECTION       = "Settings"
-VERSIONS_SECTION     = "Versions"
+def read_pe_version(path):
+    """
+    Reads the VS_VERSIONINFO resource of a Windows binary.  The file is memory mapped and
+    only the resource directory is parsed, so just the headers and the resource pages are
+    read from disk.  Returns {"product_version", "file_version"} or None.
+    """
+    import pefile
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        try:
+            pe = pefile.PE(data=mapped, fast_load=True)
+            pe.parse_data_directories(directories=[pefile.DIRECTORY_ENTRY["IMAGE_DIRECTORY_ENTRY_RESOURCE"]])
+        except pefile.PEFormatError:
+            return None
+
+        file_version = None
+        fixed_info = getattr(pe, "VS_FIXEDFILEINFO", None)
+        if fixed_info:
+            fixed_info = fixed_info[0]
+            file_version = ".".join(str(part) for part in (
+                fixed_info.FileVersionMS >> 16, fixed_info.FileVersionMS & 0xFFFF,
+                fixed_info.FileVersionLS >> 16, fixed_info.FileVersionLS & 0xFFFF))
+
+        strings = {}
+        for file_info in getattr(pe, "FileInfo", None) or []:
+            for entry in file_info:
+                for table in getattr(entry, "StringTable", []):
+                    for key, value in table.entries.items():
+                        strings[key.decode("utf-8", "replace")] = value.decode("utf-8", "replace").strip()
+        pe.close()
+
+    product_version = strings.get("ProductVersion") or strings.get("FileVersion")
+    if file_version is None and product_version is None:
+        return None
+    return {"product_version": product_version, "file_version": file_version}
+
+def format_pe_version(version_info):
+    if version_info is None:
+        return "no version resource"
+    return version_info["product_version"] or version_info["file_version"]
+
+def version_matches(version, version_info):
+    """
+    True when the numbers at the start of a library version name, e.g. 8.2 in '8.2 beta',
+    agree with the version embedded in the binary.
+    """
+    if version_info is None:
+        return False
+    wanted = re.match(r"\d+(?:\.\d+)*", version)
+    if wanted is None:
+        return False
+    wanted = wanted.group().split(".")
+    for embedded in (version_info["product_version"], version_info["file_version"]):
+        numbers = re.findall(r"\d+", embedded or "")
+        if [int(part) for part in numbers[:len(wanted)]] == [int(part) for part in wanted]:
+            return True
+    return False
+
+class VersionDetector:
+    """
+    Reads the version embedded in Kontakt binaries and caches it in the config directory,
+    keyed by path, size and mtime.  An unchanged file is answered from the cache with a
+    single stat.  Versions held in the chunk store or compressed are keyed by their content
+    hash instead.
+    """
+    def __init__(self):
+        self.cache_path = os.path.join(get_config_dir(), "version_cache.json")
+        self.lock = threading.RLock()
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                self.cache = json.load(f)
+        except (OSError, ValueError):
+            self.cache = {}
+
+    def save(self):
+        with self.lock:
+            write_file_atomic(self.cache_path, json.dumps(self.cache).encode("utf-8"))
+
+    def detect(self, path, save=True):
+        """
+        Returns the embedded version of the binary at path, see read_pe_version.
+        """
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self.lock:
+            cached = self.cache.get(key)
+            if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+                return cached["version"]
+
+        version_info = read_pe_version(path)
+        with self.lock:
+            self.cache[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "version": version_info}
+            if save:
+                self.save()
+        return version_info
+
+    def detect_library_entry(self, index, file_name, save=True):
+        """
+        Returns the embedded version of a library entry in any storage format.
+        """
+        entry = index.find(file_name)
+        if entry["format"] == "files":
+            return self.detect(os.path.join(index.library_path, file_name), save)
+        if entry["format"] == "bundle":
+            return self.detect(find_bundle_binary(os.path.join(index.library_path, file_name)), save)
+
+        key = f"hash:{entry['hash']}"
+        with self.lock:
+            if key in self.cache:
+                return self.cache[key]["version"]
+
+        # pefile needs random access, so the version is rebuilt into a temporary file once
+        with materialized_library_entry(index, file_name) as temp_path:
+            version_info = read_pe_version(temp_path)
+        with self.lock:
+            self.cache[key] = {"version": version_info}
+            if save:
+                self.save()
+        return version_info
+
+VERSION_DETECTOR = None
+VERSION_DETECTOR_LOCK = threading.Lock()
+
+def get_version_detector():
+    global VERSION_DETECTOR
+    with VERSION_DETECTOR_LOCK:
+        if VERSION_DETECTOR is None:
+            VERSION_DETECTOR = VersionDetector()
+        return VERSION_DETECTOR
 
 # ----------------------------------------------------------------------------------]
 # Functions
@@ -55,149 +3368,159 @@ You can use any naming system.
 include VST: Check this box if you want to manage the VST version of Kontakt.
 include AAX: Check this box if you want to manage the AAX version of Kontakt.
 
+Library storage: 'files' keeps a full copy of each version.  'chunked' only writes the parts
+of a new version that differ from the versions already stored, which saves a lot of disk space.
+'compressed' keeps the most recently loaded versions as files and compresses the others after
+each store.  'delta' stores each version as the difference to the closest stored version.  Measure reports how well each compression method does on the installed files.
+
 Load: Set the selected version of Kontakt as the active version.
 
 Store: Save the currently active version of Kontakt for future loading.
 
 Read: Display the currently active version of Kontakt.
 
+Verify: Check that every library file contains the version its name says it does.
+
+Scrub: Read the whole library back and list the versions that are damaged or missing.
+
+Retention: Show which versions would be moved to the archive to keep the library within its size budget.
+
+Store new installs automatically: Store each new version an update installs, and any installed version the library does not hold yet.
+
 This program needs to be run with administrator privileges to access the Kontakt installation directories.
     '''
     config_file = get_config_path()
     final_text = f'{instruction_text}\n\nProgram Data Stored here:\n{config_file}'
-    text_widget.insert(tk.END, final_text)
+    text_widget.insert(END, final_text)
 
-def get_config_path():
+def get_config_dir():
     """
-    Returns the full path to a config.ini file in the user's OS-specific config directory.
+    Returns the user's OS-specific config directory for this program, creating it if necessary.
     """
-    config_dir = user_config_dir(appname=APP_NAME, appauthor=APP_AUTHOR)
+    # KVM_CONFIG_DIR keeps benchmarks and scripts away from the real settings
+    config_dir = os.environ.get("KVM_CONFIG_DIR") or user_config_dir(appname=APP_NAME, appauthor=APP_AUTHOR)
     # Make sure the directory exists
     os.makedirs(config_dir, exist_ok=True)
+    return config_dir
+
+def get_config_path():
+    """
+    Returns the full path to a config.ini file in the user's OS-specific config directory.
+    """
     # Store settings in 'settings.ini' inside that directory
-    return os.path.join(config_dir, "settings.ini")
+    return os.path.join(get_config_dir(), "settings.ini")
 
 def load_library_path():
     """
     Reads the 'LibraryPath' from the config file if it exists.
     """
-    config_file = get_config_path()
-    config = configparser.ConfigParser()
-
-    if os.path.exists(config_file):
-        config.read(config_file)
-        if config.has_section(CONFIG_SECTION) and config.has_option(CONFIG_SECTION, "LibraryPath"):
-            return config[CONFIG_SECTION]["LibraryPath"]
-    return "Set the Library Path"
+    return get_config_store().get(CONFIG_SECTION, "LibraryPath", fallback="Set the Library Path")
 
 def save_library_path(path):
     """
     Saves 'LibraryPath' into the config file, creating the [Settings] section if necessary.
     """
-    config_file = get_config_path()
-    config = configparser.ConfigParser()
-
-    # If a config file already exists, read it first to preserve other settings
-    if os.path.exists(config_file):
-        config.read(config_file)
-    
-    # Make sure section exists
-    if not config.has_section(CONFIG_SECTION):
-        config.add_section(CONFIG_SECTION)
-    
-    # Set the new path
-    config[CONFIG_SECTION]["LibraryPath"] = path
-    with open(config_file, "w", encoding="utf-8") as f:
-        config.write(f)
+    get_config_store().set(CONFIG_SECTION, "LibraryPath", path)
 
 def load_config_settings():
     """
     Reads the LibraryPath, KontaktVersion, and NewVersion from the config file.
     Returns a dictionary with the settings.
     """
-    config_file = get_config_path()
-    config = configparser.ConfigParser()
+    config = get_config_store()
     settings = {
-        "LibraryPath": "",
-        "KontaktVersion": "8",
-        "NewVersion": "8.0.0",
-        "IncludeVST": True,
-        "IncludeAAX": True
+        "LibraryPath": config.get(CONFIG_SECTION, "LibraryPath", fallback=""),
+        "KontaktVersion": config.get(CONFIG_SECTION, "KontaktVersion", fallback="8"),
+        "NewVersion": config.get(CONFIG_SECTION, "NewVersion", fallback="8.0.0"),
+        "IncludeVST": config.getboolean(CONFIG_SECTION, "IncludeVST", fallback=True),
+        "IncludeAAX": config.getboolean(CONFIG_SECTION, "IncludeAAX", fallback=True),
+        "LibraryFormat": config.get(CONFIG_SECTION, "LibraryFormat", fallback="files"),
+        "CompressionCodec": config.get(CONFIG_SECTION, "CompressionCodec", fallback="zlib"),
+        "KeepUncompressed": config.getint(CONFIG_SECTION, "KeepUncompressed", fallback=2),
+        "DeltaKeyframeInterval": config.getint(CONFIG_SECTION, "DeltaKeyframeInterval", fallback=8),
+        "TimingLog": config.getboolean(CONFIG_SECTION, "TimingLog", fallback=True),
+        "PrefetchBudgetMB": config.getint(CONFIG_SECTION, "PrefetchBudgetMB", fallback=512),
+        "LibraryBudgetGB": config.getfloat(CONFIG_SECTION, "LibraryBudgetGB", fallback=0.0),
+        "ArchivePath": config.get(CONFIG_SECTION, "ArchivePath", fallback=""),
+        "ArchiveCodec": config.get(CONFIG_SECTION, "ArchiveCodec", fallback=""),
+        "AutoStore": config.getboolean(CONFIG_SECTION, "AutoStore", fallback=False),
+        "RemoteCacheMB": config.getint(CONFIG_SECTION, "RemoteCacheMB", fallback=4096),
+        "InstallRoots": config.get(CONFIG_SECTION, "InstallRoots", fallback=""),
+        "PluginRoots": config.get(CONFIG_SECTION, "PluginRoots", fallback="")
     }
-
-    if os.path.exists(config_file):
-        config.read(config_file)
-        if config.has_section(CONFIG_SECTION):
-            settings["LibraryPath"] = config.get(CONFIG_SECTION, "LibraryPath", fallback="")
-            settings["KontaktVersion"] = config.get(CONFIG_SECTION, "KontaktVersion", fallback="8")
-            settings["NewVersion"] = config.get(CONFIG_SECTION, "NewVersion", fallback="8.0.0")
-            settings["IncludeVST"] = config.getboolean(CONFIG_SECTION, "IncludeVST", fallback=True)
-            settings["IncludeAAX"] = config.getboolean(CONFIG_SECTION, "IncludeAAX", fallback=True)
-
     return settings
 
-def save_config_settings(library_path, kontakt_version, new_version,include_vst,include_aax):
+def save_config_settings(library_path, kontakt_version, new_version,include_vst,include_aax,library_format="files"):
     """
     Saves the last used settings into the config file.
     """
-    config_file = get_config_path()
-    config = configparser.ConfigParser()
-
-    # Read existing config file if it exists
-    if os.path.exists(config_file):
-        config.read(config_file)
-
-    # Ensure the [Settings] section exists
-    if not config.has_section(CONFIG_SECTION):
-        config.add_section(CONFIG_SECTION)
-
-    # Update values
-    config[CONFIG_SECTION]["LibraryPath"] = library_path
-    config[CONFIG_SECTION]["KontaktVersion"] = kontakt_version
-    config[CONFIG_SECTION]["NewVersion"] = new_version
-    config[CONFIG_SECTION]["IncludeVST"] = str(include_vst)
-    config[CONFIG_SECTION]["IncludeAAX"] = str(include_aax)
-
-    # Write the updated config back to file
-    with open(config_file, "w", encoding="utf-8") as f:
-        config.write(f)
+    config = get_config_store()
+    with config.batch():
+        config.set(CONFIG_SECTION, "LibraryPath", library_path)
+        config.set(CONFIG_SECTION, "KontaktVersion", kontakt_version)
+        config.set(CONFIG_SECTION, "NewVersion", new_version)
+        config.set(CONFIG_SECTION, "IncludeVST", str(include_vst))
+        config.set(CONFIG_SECTION, "IncludeAAX", str(include_aax))
+        config.set(CONFIG_SECTION, "LibraryFormat", library_format)
 
 def store_kontakt_version_in_config(kontakt_version, file_extension, version_string):
     """
     Stores the version for the specified kontakt_version and file_extension
     in the config file under a [Versions] section.
     """
-    config_file = get_config_path()
-    config = configparser.ConfigParser()
-    
-    if os.path.exists(config_file):
-        config.read(config_file)
-    
-    if not config.has_section(VERSIONS_SECTION):
-        config.add_section(VERSIONS_SECTION)
-    
     # Use the kontakt_version and file_extension to create a key
     key = f"Kontakt {kontakt_version}{file_extension}"
-    config[VERSIONS_SECTION][key] = f'Kontakt {version_string}{file_extension}'
-    with open(config_file, "w", encoding="utf-8") as f:
-        config.write(f)
+    get_config_store().set(VERSIONS_SECTION, key, f'Kontakt {version_string}{file_extension}')
 
 def load_kontakt_version_from_config(kontakt_version, file_extension):
     """
     Returns the stored version string for the given kontakt_version and file_extension,
     """
-    config_file = get_config_path()
-    config = configparser.ConfigParser()
-
-    if os.path.exists(config_file):
-        config.read(config_file)
-        if config.has_section(VERSIONS_SECTION):
-            key = f"Kontakt {kontakt_version}{file_extension}"
-            if key in config[VERSIONS_SECTION]:
-                return config[VERSIONS_SECTION][key]
+    key = f"Kontakt {kontakt_version}{file_extension}"
+    stored_version = get_config_store().get(VERSIONS_SECTION, key)
+    if stored_version is not None:
+        return stored_version
     nil_message = f"You need to Load or Store a Kontakt Version for Kontakt {kontakt_version}{file_extension} before reading is possible"
     return nil_message
 
+def load_profiles():
+    """
+    Returns the saved profiles by name.  Each profile is a list of the versions it loads:
+    {"kontakt_version", "version", "include_vst", "include_aax"}.
+    """
+    profiles = {}
+    for value in get_config_store().items(PROFILES_SECTION).values():
+        try:
+            profile = json.loads(value)
+            profiles[profile["name"]] = profile["versions"]
+        except (ValueError, KeyError, TypeError):
+            continue
+    return profiles
+
+def check_profile_versions(versions):
+    """
+    Raises ValueError when a profile lists two versions of the same Kontakt, which would be
+    staged to and switched into the same installed files.
+    """
+    listed = set()
+    for version in versions:
+        if version["kontakt_version"] in listed:
+            raise ValueError(f"Kontakt {version['kontakt_version']} is listed more than once, a profile can only hold one version of each Kontakt")
+        listed.add(version["kontakt_version"])
+
+def save_profile(name, versions):
+    """
+    Saves a profile under name, replacing a profile of the same name.
+    """
+    name = name.strip()
+    if not name or any(character in name for character in "%=:[]"):
+        raise ValueError("Profile names cannot be empty or contain % = : [ ]")
+    check_profile_versions(versions)
+    get_config_store().set(PROFILES_SECTION, name, json.dumps({"name": name, "versions": versions}))
+
+def delete_profile(name):
+    get_config_store().set(PROFILES_SECTION, name.strip(), None)
+
 def check_version_match(new_version,kontakt_version,text_widget):
     # Extract the first part of the version number before any space or dot
     first_part = new_version.split()[0].split('.')[0]
@@ -206,48 +3529,147 @@ def check_version_match(new_version,kontakt_version,text_widget):
         # Convert the extracted part to an integer
         version_number = int(first_part)
     except ValueError:
-        text_widget.insert(tk.END,f"\nError: Invalid version format.")
+        text_widget.insert(END,f"\nError: Invalid version format.")
         match = False
         return match
     
     # Compare the extracted version number with kontakt_version
     if version_number != kontakt_version:
-        text_widget.insert(tk.END,"\nKontakt Version mismatch\n\nMake sure that the version number in the detail field matches the selected Kontakt version")
+        text_widget.insert(END,"\nKontakt Version mismatch\n\nMake sure that the version number in the detail field matches the selected Kontakt version")
         match = False
         return match
     else:
         match = True
         return match
 
-def copy_kontakt(source, destination, file_extension,new_version,kontakt_version,text_widget):
+def stage_kontakt(source, destination, file_extension,new_version,kontakt_version,text_widget,timer=NULL_TIMER):
     """
-    Loads Selected version as current working version of Kontakt.
+    Prepares loading one target by writing the selected version next to the installed file.
+    Returns the target for commit_load_transaction, with 'staged' set to None when the
+    installed file is already current, or None when the version cannot be loaded.
     """
-    if not os.path.isdir(source):
-        text_widget.insert(tk.END,f"\nDirectory does not exist or cannot be accessed : \n{source}")
-        return
-
     file_to_copy = f'Kontakt {new_version}{file_extension}'
-    source_file_path = os.path.join(source, file_to_copy)
-
-    if not os.path.exists(source_file_path):
-        text_widget.insert(tk.END,f"\n{file_to_copy} is not available.\nAvailable versions include :")
-        # List all files that start with "Kontakt" and end with the correct file extension
-        for file in os.listdir(source):
-            if file.startswith(f"Kontakt {kontakt_version}") and file.endswith(f"{file_extension}"):
-                text_widget.insert(tk.END,f"\n{file}")
-        text_widget.insert(tk.END,"\n")
-        return
+    target = {"destination": destination, "staged": None, "file_name": file_to_copy, "library_path": source,
+              "kontakt_version": kontakt_version, "extension": file_extension, "version": new_version,
+              "hash": None, "method": None}
+    if is_remote_library(source):
+        remote = get_remote_library(source)
+        try:
+            # Compared against the listing first, so an installed version is never downloaded
+            with timer.span("validation", file_to_copy):
+                remote_entry = remote.entries().get(file_to_copy)
+                current = remote_entry is not None and is_remote_entry_installed(remote_entry, destination)
+            if current:
+                if remote_entry["format"] != "bundle" and os.path.isdir(destination):
+                    target["destination"] = find_bundle_binary(destination)
+                target["library_path"] = remote.cache_path
+                target["hash"] = remote_entry["hash"]
+                return target
+            with timer.span("fetch", file_to_copy):
+                downloaded = remote.fetch_entry(file_to_copy, make_progress_callback(text_widget, file_to_copy))
+        except OperationCancelled:
+            text_widget.insert(END,f"\nLoading {file_to_copy} cancelled")
+            return None
+        except Exception as e:
+            text_widget.insert(END,f"\nFailed to fetch {file_to_copy} from {source}. Error: {e}\n")
+            return None
+        if downloaded is None:
+            text_widget.insert(END,f"\n{file_to_copy} is not available.\nAvailable versions include :")
+            for file in remote.versions(kontakt_version, file_extension):
+                text_widget.insert(END,f"\n{file}")
+            text_widget.insert(END,"\n")
+            return None
+        if downloaded:
+            text_widget.insert(END,f"\n{file_to_copy} fetched from {source} ({downloaded / 1048576:.1f} MB downloaded)")
+        # From here on it loads from the local cache like from any library folder
+        source = target["library_path"] = remote.cache_path
+
+    with timer.span("lookup", file_to_copy):
+        index = get_library_index(source)
+        entry = index.find(file_to_copy) if index.available else None
+
+    if not index.available:
+        text_widget.insert(END,f"\nDirectory does not exist or cannot be accessed : \n{source}")
+        return None
 
-    # Copy it directly to the destination, overwriting the file already there
+    if entry is None and find_archived_entry(file_to_copy):
+        try:
+            with timer.span("unarchive", file_to_copy):
+                unarchive_library_entry(index, file_to_copy, make_progress_callback(text_widget, file_to_copy))
+            text_widget.insert(END,f"\n{file_to_copy} moved back from the archive")
+            entry = index.find(file_to_copy)
+        except OperationCancelled:
+            text_widget.insert(END,f"\nLoading {file_to_copy} cancelled")
+            return None
+        except Exception as e:
+            text_widget.insert(END,f"\nFailed to move {file_to_copy} back from the archive. Error: {e}\n")
+            return None
+
+    if entry is None:
+        text_widget.insert(END,f"\n{file_to_copy} is not available.\nAvailable versions include :")
+        # List all versions of this Kontakt with the correct file extension
+        for file in index.versions(kontakt_version, file_extension):
+            text_widget.insert(END,f"\n{file}")
+        text_widget.insert(END,"\n")
+        return None
+
+    target["hash"] = entry["hash"]
     try:
-        shutil.copy2(source_file_path, destination)
-        text_widget.insert(tk.END,f"\n{file_to_copy} loaded")
-        store_kontakt_version_in_config(kontakt_version, file_extension, new_version)
+        progress = make_progress_callback(text_widget, file_to_copy)
+        if entry["format"] == "bundle":
+            return stage_bundle_target(target, index, destination, progress, timer)
+        if os.path.isdir(destination):
+            # A version stored as a single file goes into the binary of the installed bundle
+            destination = target["destination"] = find_bundle_binary(destination)
+        with timer.span("validation", file_to_copy):
+            current = is_already_current(index, file_to_copy, destination, progress)
+        if current:
+            return target
+
+        target["staged"] = get_staged_path(destination)
+        with timer.span("copy", file_to_copy, entry["size"]):
+            target["method"] = restore_library_entry(index, file_to_copy, target["staged"], progress)
+        # Plain files have no hash in the index until first asked; the store recorded it
+        # in the fingerprint cache, so this is usually a lookup rather than a read
+        target["hash"] = index.content_hash(file_to_copy)
+        return target
+    except OperationCancelled:
+        text_widget.insert(END,f"\nLoading {file_to_copy} cancelled")
     except Exception as e:
-        text_widget.insert(tk.END,f"\nFailed to load {file_to_copy}. Error: {e}\n")
+        text_widget.insert(END,f"\nFailed to load {file_to_copy}. Error: {e}\n")
+    return None
+
+def stage_bundle_target(target, index, destination, progress, timer):
+    """
+    Stages the files of a bundle that differ from the installed bundle.
+    """
+    file_name = target["file_name"]
+    if os.path.isfile(destination):
+        raise IOError(f"{destination} is a single file but {file_name} is a bundle folder")
+    with timer.span("validation", file_name):
+        plan = plan_bundle_sync(load_bundle_manifest(index.library_path, file_name), destination)
+    if not plan["copied"] and not plan["removed"]:
+        return target
+
+    target["staged"] = get_staged_path(destination)
+    target["bundle"] = plan
+    with timer.span("copy", file_name, plan["bytes"]):
+        target["method"] = stage_bundle(index.library_path, file_name, plan, target["staged"], progress)
+    return target
 
-def store_kontakt(source, destination,new_version,kontakt_version,text_widget):
+def copy_kontakt(source, destination, file_extension,new_version,kontakt_version,text_widget):
+    """
+    Loads Selected version as current working version of Kontakt.
+    """
+    begin_load_transaction([destination])
+    with pin_remote_entries(source, [f'Kontakt {new_version}{file_extension}']):
+        target = stage_kontakt(source, destination, file_extension, new_version, kontakt_version, text_widget)
+        if target is None:
+            abort_load_transaction([destination])
+        else:
+            commit_load_transaction([target], text_widget)
+
+def store_kontakt(source, destination,new_version,kontakt_version,text_widget,storage_mode="files",timer=NULL_TIMER):
     """
     Stores current working version of Kontakt into the version library.
     """
@@ -257,88 +3679,490 @@ def store_kontakt(source, destination,new_version,kontakt_version,text_widget):
 
     # Check if the specific version file exists in the source directory
     if not os.path.exists(source):
-        text_widget.insert(tk.END,f"\n{filename}{file_extension} not found")
-        return
+        text_widget.insert(END,f"\n{filename}{file_extension} not found")
+        return False
 
     # Check if the destination file already exists to avoid overwriting
-    if os.path.exists(dest_file_path):
-        text_widget.insert(tk.END,f"\n{file_to_store} already exists and will not be overwritten")
-        return
+    with timer.span("lookup", file_to_store):
+        if is_remote_library(destination):
+            exists = file_to_store in get_remote_library(destination).entries()
+        else:
+            exists = get_library_index(destination).find(file_to_store) is not None
+    if exists:
+        text_widget.insert(END,f"\n{file_to_store} already exists and will not be overwritten")
+        return False
     
     # Copy it directly to the destination, but only if it doesn't already exist
     try:
-        shutil.copy2(source, dest_file_path)
-        text_widget.insert(tk.END,f"\n{file_to_store} Stored")
-        store_kontakt_version_in_config(kontakt_version, file_extension, new_version)
+        progress = make_progress_callback(text_widget, file_to_store)
+        with timer.span("copy", file_to_store, get_target_size(source)):
+            if is_remote_library(destination):
+                chunk_count, sent_chunks, bytes_sent = get_remote_library(destination).upload(source, file_to_store, progress)
+                text_widget.insert(END,f"\n{file_to_store} Stored on {destination} ({sent_chunks} of {chunk_count} chunks sent, {bytes_sent / 1048576:.1f} MB)")
+            elif os.path.isdir(source):
+                # Bundles are always stored as folders, whatever the library storage
+                file_count, bytes_written = store_bundle(source, destination, file_to_store, progress)
+                text_widget.insert(END,f"\n{file_to_store} Stored as a bundle ({file_count} files, {bytes_written / 1048576:.1f} MB)")
+            elif storage_mode == "chunked":
+                chunk_count, new_chunks, bytes_written = store_file_chunked(source, destination, file_to_store, progress)
+                text_widget.insert(END,f"\n{file_to_store} Stored ({new_chunks} of {chunk_count} chunks new, {bytes_written / 1048576:.1f} MB written)")
+            elif storage_mode == "delta":
+                keyframe_interval = load_config_settings()["DeltaKeyframeInterval"]
+                base_name, depth, bytes_written = store_file_delta(source, get_library_index(destination), file_to_store, keyframe_interval, progress)
+                if base_name is None:
+                    text_widget.insert(END,f"\n{file_to_store} Stored as a full keyframe")
+                else:
+                    text_widget.insert(END,f"\n{file_to_store} Stored as a delta of {base_name} ({bytes_written / 1048576:.1f} MB written, chain of {depth})")
+            elif storage_mode in ("files", "compressed"):
+                # Hashed in the same pass as the copy, so the library can be checked for damage later
+                content_hash, method = store_file_hashed(source, destination, file_to_store, progress)
+                if storage_mode == "compressed":
+                    # Stored plain as the most recent version, apply_compression_policy compresses it later
+                    add_to_compression_tier(destination, file_to_store)
+                text_widget.insert(END,f"\n{file_to_store} Stored ({method}, checksum {content_hash[:12]})")
+            else:
+                raise ValueError(f"Unknown library storage {storage_mode}")
+        with timer.span("finish", file_to_store):
+            index = get_library_index(destination, refresh=False)
+            index.invalidate()
+            record_library_use(index.library_path, file_to_store)
+            store_kontakt_version_in_config(kontakt_version, file_extension, new_version)
+        return True
+    except OperationCancelled:
+        text_widget.insert(END,f"\nStoring {file_to_store} cancelled")
     except Exception as e:
-        text_widget.insert(tk.END,f"\nFailed to store {file_to_store}. \nError: {e}\n")
+        text_widget.insert(END,f"\nFailed to store {file_to_store}. \nError: {e}\n")
+    return False
 
 def read_kontakt_version(source,kontakt_version,text_widget):
     """
     Checks the config file to see the current loaded version and print it.
+    Returns the loaded and installed versions, or None when the file is not installed.
     """
     if not os.path.exists(source):
-        return
+        return None
 
     _, file_extension = os.path.splitext(source)
     stored_version = load_kontakt_version_from_config(kontakt_version, file_extension)
-    text_widget.insert(tk.END, f"\n{stored_version}")
+    try:
+        binary = find_bundle_binary(source) if os.path.isdir(source) else source
+        installed_version = format_pe_version(get_version_detector().detect(binary))
+    except (OSError, ValueError) as e:
+        installed_version = f"unreadable : {e}"
+    text_widget.insert(END, f"\n{stored_version}\n    installed file reports {installed_version}")
+    return {"path": source, "loaded": stored_version, "installed": installed_version}
+
+def verify_library_versions(library_path, kontakt_version, text_widget):
+    """
+    Checks that each library entry contains the version given in its name.
+    Returns the names that do not match, or None when the library cannot be read.
+    """
+    index = get_library_index(library_path)
+    if not index.available:
+        text_widget.insert(END,f"\nDirectory does not exist or cannot be accessed : \n{library_path}")
+        return None
+
+    detector = get_version_detector()
+    names = index.versions(kontakt_version)
+    mismatches = []
+    text_widget.insert(END,f"\nVerifying {len(names)} library versions:")
+    for name in names:
+        try:
+            version_info = detector.detect_library_entry(index, name, save=False)
+        except (OSError, ValueError) as e:
+            text_widget.insert(END,f"\n{name} could not be read. Error: {e}")
+            mismatches.append(name)
+            continue
+        if not version_matches(index.find(name)["version"], version_info):
+            text_widget.insert(END,f"\n{name} contains {format_pe_version(version_info)}")
+            mismatches.append(name)
+    detector.save()
+    text_widget.insert(END,f"\n\n{len(names) - len(mismatches)} of {len(names)} versions match their file name\n")
+    return mismatches
+
+def get_profile_targets(kontakt_version, new_version, include_vst, include_aax):
+    """
+    Returns the (installed path, file extension, kontakt_version, new_version) targets of
+    loading one version.
+    """
+    kontakt_exe_path,kontakt_vst_path,kontakt_aax_path = set_kontakt_version(kontakt_version)
+    targets = [(kontakt_exe_path, '.exe', kontakt_version, new_version)]
+    if include_vst:
+        targets.append((kontakt_vst_path, '.vst3', kontakt_version, new_version))
+    if include_aax:
+        targets.append((kontakt_aax_path, '.aaxplugin', kontakt_version, new_version))
+    return targets
+
+def load_targets(targets, library_path, text_widget, timer=NULL_TIMER):
+    """
+    Loads every target as one transaction.  The targets are independent files, so they are
+    staged concurrently and only switched once all of them are ready.  Returns True when
+    the load was committed.
+    """
+    destinations = [path for path, _, _, _ in targets]
+    begin_load_transaction(destinations)
+    with pin_remote_entries(library_path, [f'Kontakt {version}{extension}' for _, extension, _, version in targets]):
+        with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            staged = list(pool.map(lambda target: stage_kontakt(library_path, target[0], target[1], target[3], target[2], text_widget, timer), targets))
+        if None in staged:
+            abort_load_transaction(destinations + [target["destination"] for target in staged if target])
+            text_widget.insert(END,"\nNothing was changed, so every installed file stays on the version it had")
+            return False
+        return commit_load_transaction(staged, text_widget, timer)
+
+def apply_profile(profile_name, library_path, text_widget, timer=NULL_TIMER):
+    """
+    Loads every version of a profile, across Kontakt versions, as one transaction.
+    """
+    versions = load_profiles().get(profile_name)
+    if not versions:
+        text_widget.insert(END,f"\nThere is no profile named '{profile_name}'")
+        return False
+    try:
+        # A profile edited by hand in settings.ini is checked again
+        check_profile_versions(versions)
+    except ValueError as e:
+        text_widget.insert(END,f"\nThe profile '{profile_name}' cannot be applied. {e}")
+        return False
+
+    targets = []
+    text_widget.insert(END,f"\nApplying profile '{profile_name}':")
+    for version in versions:
+        if not check_version_match(version["version"], version["kontakt_version"], text_widget):
+            return False
+        targets.extend(get_profile_targets(version["kontakt_version"], version["version"], version["include_vst"], version["include_aax"]))
+    return load_targets(targets, library_path, text_widget, timer)
+
+def find_installed_version(index, path, file_extension, kontakt_version):
+    """
+    Returns the library version whose content is installed at path, or None.  The version
+    last loaded or stored is tried first, so usually only that one is compared.
+    """
+    if not os.path.exists(path):
+        return None
+    loaded = load_kontakt_version_from_config(kontakt_version, file_extension)
+    names = index.versions(kontakt_version, file_extension)
+    names.sort(key=lambda name: name != loaded)
+    for name in names:
+        if index.find(name)["format"] == "bundle":
+            if os.path.isdir(path):
+                plan = plan_bundle_sync(load_bundle_manifest(index.library_path, name), path)
+                if not plan["copied"] and not plan["removed"]:
+                    return index.find(name)["version"]
+        elif is_already_current(index, name, find_bundle_binary(path) if os.path.isdir(path) else path):
+            return index.find(name)["version"]
+    return None
+
+def snapshot_profile(profile_name, library_path, text_widget):
+    """
+    Saves the versions installed for every Kontakt as a profile.  A VST or AAX is only
+    included when it holds the same version as its exe.
+    """
+    index = get_library_index(library_path)
+    if not index.available:
+        text_widget.insert(END,f"\nDirectory does not exist or cannot be accessed : \n{library_path}")
+        return False
 
-def run_kontakt_operation(mode, kontakt_version, new_version, include_vst, include_aax,text_widget,library_path):
+    versions = []
+    text_widget.insert(END,f"\nSaving the installed versions as profile '{profile_name}':")
+    for kontakt_version in get_install_index().versions():
+        kontakt_exe_path,kontakt_vst_path,kontakt_aax_path = set_kontakt_version(kontakt_version)
+        version = find_installed_version(index, kontakt_exe_path, '.exe', kontakt_version)
+        if version is None:
+            if os.path.exists(kontakt_exe_path):
+                text_widget.insert(END,f"\nKontakt {kontakt_version} is installed but not in the library, store it first")
+            continue
+        include_vst = find_installed_version(index, kontakt_vst_path, '.vst3', kontakt_version) == version
+        include_aax = find_installed_version(index, kontakt_aax_path, '.aaxplugin', kontakt_version) == version
+        versions.append({"kontakt_version": kontakt_version, "version": version, "include_vst": include_vst, "include_aax": include_aax})
+        types = "exe" + (", vst" if include_vst else "") + (", aax" if include_aax else "")
+        text_widget.insert(END,f"\nKontakt {version} ({types})")
+
+    if not versions:
+        text_widget.insert(END,"\nNo installed version was found in the library, the profile was not saved")
+        return False
+    try:
+        save_profile(profile_name, versions)
+    except ValueError as e:
+        text_widget.insert(END,f"\nThe profile was not saved. {e}")
+        return False
+    return True
+
+def run_kontakt_operation(mode, kontakt_version, new_version, include_vst, include_aax,text_widget,library_path,storage_mode="files",profile_name=None):
     """
-    Runs the essential logic for the selected operation mode.
+    Runs the essential logic for the selected operation mode.  The 'profile' and 'snapshot'
+    modes apply or save the profile profile_name.
+    Returns a result dictionary whose 'ok' entry tells whether the operation succeeded.
     """
     kontakt_exe_path,kontakt_vst_path,kontakt_aax_path = set_kontakt_version(kontakt_version)
+    result = {"ok": True}
+    timer = OperationTimer(mode) if load_config_settings()["TimingLog"] else NULL_TIMER
 
     if mode == 'read':
-        text_widget.insert(tk.END,"\nCurrently Loaded Versions:")
-        read_kontakt_version(kontakt_exe_path,kontakt_version,text_widget)
-        if include_vst:
-            read_kontakt_version(kontakt_vst_path,kontakt_version,text_widget)
-        if include_aax:
-            read_kontakt_version(kontakt_aax_path,kontakt_version,text_widget)
-        text_widget.insert(tk.END,f"\n\nThis display shows the version last loaded or stored.  This could differ from the actual version present if the version has been changed by other methods")
+        text_widget.insert(END,"\nCurrently Loaded Versions:")
+        result["installed"] = {}
+        for path, extension, included in ((kontakt_exe_path, '.exe', True), (kontakt_vst_path, '.vst3', include_vst), (kontakt_aax_path, '.aaxplugin', include_aax)):
+            if included:
+                with timer.span("read", os.path.basename(path)):
+                    result["installed"][extension] = read_kontakt_version(path,kontakt_version,text_widget)
+        text_widget.insert(END,f"\n\nThis display shows the version last loaded or stored, followed by the version read from the installed file itself.  They differ if the version has been changed by other methods")
+    elif mode == 'list':
+        with timer.span("lookup"):
+            index = get_library_index(library_path)
+            result["ok"] = index.available
+            result["versions"] = get_library_versions(library_path, kontakt_version)
+        text_widget.insert(END,f"\nKontakt {kontakt_version} versions in the library:")
+        for name in result["versions"]:
+            text_widget.insert(END,f"\n{name}")
+    elif mode == 'verify':
+        with timer.span("validation"):
+            mismatches = verify_library_versions(library_path, kontakt_version, text_widget)
+        result["ok"] = mismatches == []
+        result["mismatches"] = mismatches
+    elif mode == 'scrub':
+        text_widget.insert(END,"\nChecking the library against its checksums:")
+        with timer.span("scrub"):
+            scrub = scrub_library(library_path, text_widget)
+        result["ok"] = bool(scrub) and not scrub["damaged"] and not scrub["missing"]
+        if scrub:
+            result.update(scrub)
+    elif mode in ('pin', 'unpin'):
+        result["ok"] = bool(new_version.strip())
+        if result["ok"]:
+            set_version_pinned(new_version.strip(), mode == 'pin')
+            text_widget.insert(END,f"\nKontakt {new_version.strip()} is {'pinned and is never' if mode == 'pin' else 'no longer pinned and can be'} moved to the archive")
+    elif mode in ('retention', 'archive'):
+        with timer.span("retention"):
+            plan = apply_retention_policy(library_path, text_widget, dry_run=mode == 'retention')
+        result["ok"] = plan is not None
+        if plan:
+            result["evict"] = [name for name, _ in plan["evict"]]
+            result["freed"] = sum(size for _, size in plan["evict"])
+    elif mode == 'profile':
+        with get_config_store().batch():
+            result["ok"] = apply_profile(profile_name, library_path, text_widget, timer)
+            with timer.span("config write"):
+                get_config_store().flush()
+    elif mode == 'snapshot':
+        with timer.span("validation"):
+            result["ok"] = snapshot_profile(profile_name, library_path, text_widget)
+    elif mode == 'watch':
+        text_widget.insert(END,"\nWatching the installed files, press Ctrl+C to stop")
+        try:
+            InstallWatcher(text_widget, library_path, storage_mode, include_vst, include_aax).run()
+        except KeyboardInterrupt:
+            text_widget.insert(END,"\nStopped watching")
+    elif mode == 'measure':
+        text_widget.insert(END,"\nCompression of the installed files:")
+        for path in (kontakt_exe_path, kontakt_vst_path if include_vst else None, kontakt_aax_path if include_aax else None):
+            if path and os.path.isfile(path):
+                with timer.span("measure", os.path.basename(path), os.path.getsize(path)):
+                    measure_compression(path, text_widget)
     else:
-        match = check_version_match(new_version,kontakt_version,text_widget)
+        with timer.span("validation"):
+            match = check_version_match(new_version,kontakt_version,text_widget)
+        result["ok"] = match
         if match:
-            if mode == 'load':
-                copy_kontakt(library_path, kontakt_exe_path, '.exe',new_version,kontakt_version,text_widget)
-                if include_vst:
-                    copy_kontakt(library_path, kontakt_vst_path, '.vst3',new_version,kontakt_version,text_widget)
-                if include_aax:
-                    copy_kontakt(library_path, kontakt_aax_path, '.aaxplugin',new_version,kontakt_version,text_widget)
-                text_widget.see(tk.END)
-            elif mode == 'store':
-                store_kontakt(kontakt_exe_path, library_path,new_version,kontakt_version,text_widget)
-                if include_vst:
-                    store_kontakt(kontakt_vst_path, library_path,new_version,kontakt_version,text_widget)
-                if include_aax:
-                    store_kontakt(kontakt_aax_path, library_path,new_version,kontakt_version,text_widget)
+            targets = get_profile_targets(kontakt_version, new_version, include_vst, include_aax)
+
+            # The exe, vst and aax files are independent, so they are copied concurrently.
+            # Their config updates are written to settings.ini once, when all are done.
+            with get_config_store().batch():
+                if mode == 'load':
+                    result["ok"] = load_targets(targets, library_path, text_widget, timer)
+                elif mode == 'store':
+                    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+                        jobs = [pool.submit(store_kontakt, path, library_path, new_version, kontakt_version, text_widget, storage_mode, timer)
+                                for path, _, _, _ in targets]
+                        result["ok"] = all([job.result() for job in jobs])
+                with timer.span("config write"):
+                    get_config_store().flush()
+
+            # A remote library is kept by its server, only the local cache is trimmed here
+            if mode == 'store' and storage_mode == 'compressed' and not is_remote_library(library_path):
+                settings = load_config_settings()
+                with timer.span("compression"):
+                    apply_compression_policy(library_path, settings["CompressionCodec"], settings["KeepUncompressed"], text_widget)
+            if result["ok"] and load_config_settings()["LibraryBudgetGB"] > 0 and not is_remote_library(library_path):
+                with timer.span("retention"):
+                    apply_retention_policy(library_path, text_widget)
+            text_widget.see(END)
+
+    if timer is not NULL_TIMER:
+        text_widget.insert(END,f"\n\n{timer.summary()}")
+        result["timings"] = timer.spans
+        try:
+            timer.write_log({"kontakt_version": kontakt_version, "version": new_version, "ok": result["ok"]})
+        except OSError:
+            pass
+    return result
+
+def get_install_path(*parts):
+    """
+    Returns a path under Program Files.  KVM_INSTALL_ROOT points it somewhere else, such
+    as the fake install tree of the benchmarks.
+    """
+    return os.path.join(os.environ.get("KVM_INSTALL_ROOT", "C:\\Program Files"), *parts)
 
 def set_kontakt_version(kontakt_version):
     """
-    Sets the file paths - this is windows specific.
-    """
-    if kontakt_version   == 8: 
-        kontakt_exe_path = 'C:\\Program Files\\Native Instruments\\Kontakt 8\\Kontakt 8.exe'
-        kontakt_vst_path = 'C:\\Program Files\\Common Files\\VST3\\Kontakt 8.vst3'
-        kontakt_aax_path = 'C:\\Program Files\\Common Files\\Avid\\Audio\\Plug-Ins\\Kontakt 8.aaxplugin\\Contents\\x64\\Kontakt 8.aaxplugin'
-    elif kontakt_version == 7: 
-        kontakt_exe_path = 'C:\\Program Files\\Native Instruments\\Kontakt 7\\Kontakt 7.exe'
-        kontakt_vst_path = 'C:\\Program Files\\Common Files\\VST3\\Kontakt 7.vst3'
-        kontakt_aax_path = 'C:\\Program Files\\Common Files\\Avid\\Audio\\Plug-Ins\\Kontakt 7.aaxplugin\\Contents\\x64\\Kontakt 7.aaxplugin'
-    elif kontakt_version == 6: 
-        kontakt_exe_path = 'C:\\Program Files\\Native Instruments\\Kontakt\\Kontakt.exe'
-        kontakt_vst_path = 'C:\\Program Files\\Common Files\\VST3\\Kontakt.vst3'
-        kontakt_aax_path = 'C:\\Program Files\\Common Files\\Avid\\Audio\\Plug-Ins\\Kontakt.aaxplugin\\Contents\\x64\\Kontakt.aaxplugin'
-    elif kontakt_version == 5: 
-        kontakt_exe_path = 'C:\\Program Files\\Native Instruments\\Kontakt 5\\Kontakt 5.exe'
-        kontakt_vst_path = 'C:\\Program Files\\Steinberg\\VSTPlugins\\Native Instruments64\\Kontakt 5.dll'
-        kontakt_aax_path = 'C:\\Program Files\\Common Files\\Avid\\Audio\\Plug-Ins\\Kontakt 5.aaxplugin\\Contents\\x64\\Kontakt 5.aaxplugin'
-        
-    return kontakt_exe_path,kontakt_vst_path,kontakt_aax_path
+    Returns the exe, vst and aax paths of a Kontakt version, as found by the install index.
+    """
+    return get_install_index().find(kontakt_version)
+
+# ----------------------------------------------------------------------------------]
+# Command Line
+
+CLI_OPERATIONS       = ["load", "store", "read", "list", "verify", "scrub", "pin", "unpin", "retention", "archive", "watch", "profile", "snapshot"]
+
+class ResultWriter:
+    """
+    Collects the output of an operation in place of the text widget, for the command line.
+    """
+    def __init__(self):
+        self.parts = []
+
+    def insert(self, index, text):
+        self.parts.append(text)
+
+    def see(self, index):
+        pass
+
+    def lines(self):
+        return [line for line in "".join(self.parts).splitlines() if line.strip()]
+
+class BatchLineParser(argparse.ArgumentParser):
+    """
+    Parses one line of a batch file.  Errors are raised instead of printed with the usage,
+    so the only report of a bad line is its entry in the JSON results.
+    """
+    def error(self, message):
+        raise ValueError(message)
+
+def build_cli_parser(batch_line=False):
+    """
+    Builds the parser for one command line operation, or with batch_line for one line of a
+    batch file.  Options left out fall back to the settings saved by the window.
+    """
+    parser_class = BatchLineParser if batch_line else argparse.ArgumentParser
+    parser = parser_class(prog="Kontakt Version Manager", add_help=not batch_line,
+                          description="Loads, stores and checks Kontakt versions without opening the window. "
+                                      "Results are written as JSON.")
+    parser.add_argument("operation", choices=CLI_OPERATIONS + ["batch"])
+    parser.add_argument("version", nargs="?", help="detail version to load or store, profile to apply or save, "
+                                                   "or the batch file ('-' reads standard input)")
+    parser.add_argument("--kontakt", type=int, help="Kontakt version (integer), taken from the detail version when left out")
+    parser.add_argument("--library", help="path to the version library")
+    parser.add_argument("--storage", choices=STORAGE_MODES, help="library storage used when storing")
+    parser.add_argument("--vst", action=argparse.BooleanOptionalAction, default=None, help="include the vst")
+    parser.add_argument("--aax", action=argparse.BooleanOptionalAction, default=None, help="include the aax")
+    parser.add_argument("--output", help="write the JSON results to this file instead of standard output")
+    return parser
+
+def read_batch_file(path):
+    """
+    Returns the operations of a batch file, one command line per line.  Blank lines and
+    lines starting with # are skipped.
+    """
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+    # Non-posix splitting keeps the backslashes of Windows paths, but also keeps the quotes
+    return [[word.strip('"') for word in shlex.split(line, posix=False)] for line in text.splitlines()
+            if line.strip() and not line.lstrip().startswith("#")]
+
+def run_cli_operation(args, defaults):
+    """
+    Runs one parsed command line operation and returns its JSON result.
+    Settings not given on the line come from the batch line defaults, then settings.ini.
+    """
+    settings = load_config_settings()
+    def option(name, setting):
+        value = getattr(args, name)
+        if value is None:
+            value = getattr(defaults, name, None)
+        return settings[setting] if value is None else value
+
+    result = {"operation": args.operation, "version": args.version}
+    writer = ResultWriter()
+    started = time.perf_counter()
+    try:
+        if args.operation in ("load", "store", "pin", "unpin", "profile", "snapshot") and not args.version:
+            raise ValueError(f"{args.operation} needs the detail version or profile name, for example 8.0.0")
+        kontakt_version = args.kontakt if args.kontakt is not None else getattr(defaults, "kontakt", None)
+        if kontakt_version is None:
+            version = args.version if args.operation in ("load", "store") else None
+            kontakt_version = int((version or settings["KontaktVersion"]).split()[0].split('.')[0])
+        result["kontakt_version"] = kontakt_version
+        result.update(run_kontakt_operation(
+            mode=args.operation,
+            kontakt_version=kontakt_version,
+            new_version=args.version or "",
+            include_vst=option("vst", "IncludeVST"),
+            include_aax=option("aax", "IncludeAAX"),
+            text_widget=writer,
+            library_path=option("library", "LibraryPath"),
+            storage_mode=option("storage", "LibraryFormat"),
+            profile_name=args.version
+        ))
+    except Exception as e:
+        result["ok"] = False
+        writer.insert(END, f"\n{args.operation} failed. Error: {e}")
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    result["messages"] = writer.lines()
+    return result
+
+def run_cli(argv):
+    """
+    Runs the command line operations and writes their results as JSON.
+    Returns the exit code, 0 when every operation succeeded.
+    """
+    parser = build_cli_parser()
+    args = parser.parse_args(argv)
+
+    results = []
+    writer = ResultWriter()
+    recover_load_transaction(writer)
+    if writer.lines():
+        results.append({"operation": "recover", "ok": True, "messages": writer.lines()})
+
+    if args.operation == "batch":
+        # The operations run in this process one after another, sharing the library index
+        # and fingerprint caches, so later operations skip the work earlier ones did
+        try:
+            lines = read_batch_file(args.version or "-")
+        except OSError as e:
+            lines = []
+            results.append({"operation": "batch", "ok": False, "messages": [f"Could not read the batch file. Error: {e}"]})
+        line_parser = build_cli_parser(batch_line=True)
+        for line in lines:
+            try:
+                line_args = line_parser.parse_args(line)
+                if line_args.operation == "batch":
+                    raise ValueError("a batch file cannot run another batch")
+            except ValueError as e:
+                results.append({"operation": " ".join(line), "ok": False, "messages": [f"Invalid batch line: {e}"]})
+                continue
+            results.append(run_cli_operation(line_args, args))
+    else:
+        results.append(run_cli_operation(args, None))
+
+    ok = all(result["ok"] for result in results)
+    output = json.dumps({"ok": ok, "results": results}, indent=2)
+    if args.output:
+        write_file_atomic(args.output, output.encode("utf-8"))
+    elif sys.stdout is not None:
+        # The windowed build has no console, so it needs --output
+        print(output)
+    return 0 if ok else 1
 
 def main():
+    # tkinter is only imported for the window, so the command line starts without it
+    import tkinter as tk
+    from tkinter import ttk
+
     # Create the main window
     root = tk.Tk()
     root.title("Kontakt Version Manager")
@@ -380,7 +4204,7 @@ def main():
     version_entry = ttk.Combobox(
         main_version_frame,
         textvariable=version_var,
-        values=["5", "6", "7","8"],
+        values=[str(kontakt_version) for kontakt_version in get_install_index().versions()],
         state="readonly",
         width=10
     )
@@ -391,7 +4215,25 @@ def main():
     detail_version_frame.pack(anchor="w", padx=30, pady=10)
     tk.Label(detail_version_frame, text="Kontakt Version (detail) :").pack(side="left")
     new_version_var = tk.StringVar(value="8.0.0")
-    new_version_entry = ttk.Entry(detail_version_frame, textvariable=new_version_var, width=20)
+
+    # The drop down lists the versions in the library index for the selected Kontakt
+    def list_library_versions():
+        values = []
+        try:
+            for name in get_library_versions(library_path_var.get(), int(version_var.get()), ".exe"):
+                values.append(parse_library_name(name)[0])
+            # Archived versions can be loaded too, they are moved back first
+            archive_path = load_config_settings()["ArchivePath"]
+            if archive_path and os.path.isdir(archive_path):
+                archive = get_library_index(archive_path)
+                values.extend(archive.find(name)["version"] for name in archive.versions(int(version_var.get()), ".exe")
+                              if archive.find(name)["version"] not in values)
+        except (OSError, ValueError):
+            pass
+        new_version_entry.configure(values=values)
+
+    new_version_entry = ttk.Combobox(detail_version_frame, textvariable=new_version_var, width=20,
+                                     postcommand=list_library_versions)
     new_version_entry.pack(side="left")
 
     # Include VST
@@ -403,6 +4245,37 @@ def main():
     include_aax_var = tk.BooleanVar(value=True)
     aax_check = ttk.Checkbutton(root, text="Include AAX", variable=include_aax_var)
     aax_check.pack(anchor="w", padx=30)
+
+    # Store new versions as soon as an update has installed them
+    auto_store_var = tk.BooleanVar(value=False)
+    auto_store_check = ttk.Checkbutton(root, text="Store new installs automatically", variable=auto_store_var)
+    auto_store_check.pack(anchor="w", padx=30)
+
+    # Library storage format used when storing
+    storage_frame = ttk.Frame(root)
+    storage_frame.pack(anchor="w", padx=30, pady=10)
+    tk.Label(storage_frame, text="Library storage :").pack(side="left")
+    storage_mode_var = tk.StringVar(value="files")
+    storage_mode_entry = ttk.Combobox(
+        storage_frame,
+        textvariable=storage_mode_var,
+        values=STORAGE_MODES,
+        state="readonly",
+        width=10
+    )
+    storage_mode_entry.pack(side="left", padx=5)
+
+    # Profiles load a saved set of versions for several Kontakt versions at once
+    profile_frame = ttk.Frame(root)
+    profile_frame.pack(anchor="w", padx=30, pady=10)
+    tk.Label(profile_frame, text="Profile :").pack(side="left")
+    profile_var = tk.StringVar(value="")
+
+    def list_profiles():
+        profile_entry.configure(values=sorted(load_profiles()))
+
+    profile_entry = ttk.Combobox(profile_frame, textvariable=profile_var, width=30, postcommand=list_profiles)
+    profile_entry.pack(side="left", padx=5)
     
     # Status label for a quick summary of the operation
     status_var = tk.StringVar(value="")
@@ -418,36 +4291,94 @@ def main():
     new_version_var.set(settings["NewVersion"])
     include_vst_var.set(settings["IncludeVST"])
     include_aax_var.set(settings["IncludeAAX"])
+    storage_mode_var.set(settings["LibraryFormat"])
+    auto_store_var.set(settings["AutoStore"])
 
-    # ------------------
-    # Define Callback Functions for each button: Load, Store, Read
-    def on_load():
-        text_output.delete("1.0", tk.END)  # clear previous output
+    # Warm the library files of the version being typed, so loading it starts from memory
+    prefetcher = LibraryPrefetcher()
+
+    def get_selected_version():
+        return (library_path_var.get(), int(version_var.get()), new_version_var.get(),
+                include_vst_var.get(), include_aax_var.get())
 
+    def on_version_change(*args):
+        if running["thread"] is not None:
+            return
+        # A path still being typed would only fill the index cache with partial paths
+        library_path = library_path_var.get()
+        if not is_remote_library(library_path) and not os.path.isdir(library_path):
+            prefetcher.cancel()
+            return
         try:
-            kontakt_version_int = int(version_var.get())
+            prefetcher.request(get_selected_version())
         except ValueError:
-            status_var.set("Error: Kontakt version must be an integer.")
+            pass
+
+    pending_path = {"after": None}
+
+    def on_library_path_settled():
+        pending_path["after"] = None
+        on_version_change()
+
+    def on_library_path_change(*args):
+        # The path entry changes with every keystroke, so wait for typing to pause
+        if pending_path["after"] is not None:
+            root.after_cancel(pending_path["after"])
+        pending_path["after"] = root.after(int(PREFETCH_DEBOUNCE * 1000), on_library_path_settled)
+
+    for variable in (new_version_var, version_var, include_vst_var, include_aax_var):
+        variable.trace_add("write", on_version_change)
+    library_path_var.trace_add("write", on_library_path_change)
+
+    # The watcher stores new installs while the window is open.  Its output is drained here,
+    # like an operation's, but it runs alongside operations rather than blocking them.
+    watching = {"watcher": None}
+
+    def poll_watcher(watcher):
+        if watching["watcher"] is not watcher:
             return
+        try:
+            while True:
+                message = watcher.text_widget.messages.get_nowait()
+                if message[0] == "text":
+                    text_output.insert(tk.END, message[1])
+                    text_output.see(tk.END)
+        except queue.Empty:
+            pass
+        root.after(500, poll_watcher, watcher)
 
-        new_version = new_version_var.get()
-        include_vst = include_vst_var.get()
-        include_aax = include_aax_var.get()
+    def on_auto_store_change(*args):
+        if watching["watcher"] is not None:
+            watching["watcher"].stop()
+            watching["watcher"] = None
+        if auto_store_var.get():
+            watcher = InstallWatcher(QueueWriter(), library_path_var.get(), storage_mode_var.get(),
+                                     include_vst_var.get(), include_aax_var.get())
+            watching["watcher"] = watcher
+            watcher.start()
+            poll_watcher(watcher)
 
-        # Call the "load" operation
-        run_kontakt_operation(
-            mode="load",
-            kontakt_version=kontakt_version_int,
-            new_version=new_version,
-            include_vst=include_vst,
-            include_aax=include_aax,
-            text_widget=text_output,
-            library_path=library_path_var.get()
-        )
-        status_var.set("Completed load operation!")
+    def on_library_change(*args):
+        if watching["watcher"] is not None:
+            watching["watcher"].configure(library_path_var.get(), storage_mode_var.get())
 
-    def on_store():
-        text_output.delete("1.0", tk.END)
+    for variable in (auto_store_var, include_vst_var, include_aax_var):
+        variable.trace_add("write", on_auto_store_change)
+    for variable in (library_path_var, storage_mode_var):
+        variable.trace_add("write", on_library_change)
+
+    # ------------------
+    # Define Callback Functions for each button: Load, Store, Read, Cancel
+    # Operations run on a worker thread.  Their output arrives through a QueueWriter that
+    # poll_operation drains on the Tk thread.
+    running = {"writer": None, "thread": None, "progress": {}}
+    # Start warming the version saved from last time
+    on_version_change()
+
+    def start_operation(mode):
+        if running["thread"] is not None:
+            return
+        text_output.delete("1.0", tk.END)  # clear previous output
 
         try:
             kontakt_version_int = int(version_var.get())
@@ -455,47 +4386,125 @@ def main():
             status_var.set("Error: Kontakt version must be an integer.")
             return
 
-        new_version = new_version_var.get()
-        include_vst = include_vst_var.get()
-        include_aax = include_aax_var.get()
-
-        # Call the "store" operation
-        run_kontakt_operation(
-            mode="store",
+        writer = QueueWriter()
+        operation = dict(
+            mode=mode,
             kontakt_version=kontakt_version_int,
-            new_version=new_version,
-            include_vst=include_vst,
-            include_aax=include_aax,
-            text_widget=text_output,
-            library_path=library_path_var.get()
+            new_version=new_version_var.get(),
+            include_vst=include_vst_var.get(),
+            include_aax=include_aax_var.get(),
+            text_widget=writer,
+            library_path=library_path_var.get(),
+            storage_mode=storage_mode_var.get(),
+            profile_name=profile_var.get().strip()
         )
-        status_var.set("Completed store operation!")
 
-    def on_read():
-        text_output.delete("1.0", tk.END)
+        # The operation gets the disk to itself
+        prefetcher.cancel()
+        selected_version = get_selected_version()
+
+        def worker():
+            try:
+                result = run_kontakt_operation(**operation)
+                if mode == 'load' and result["ok"]:
+                    prefetcher.remember(selected_version)
+            except Exception as e:
+                writer.insert(tk.END, f"\n{mode} failed. Error: {e}\n")
+            if writer.cancel_event.is_set():
+                writer.messages.put(("done", f"Cancelled {mode} operation."))
+            else:
+                writer.messages.put(("done", f"Completed {mode} operation!"))
 
+        running["writer"] = writer
+        running["progress"] = {}
+        running["thread"] = threading.Thread(target=worker, daemon=True)
+        for button in (btn_load, btn_store, btn_read, btn_verify, btn_scrub, btn_retention, btn_measure, btn_profile, btn_snapshot, btn_pin, btn_unpin):
+            button.state(["disabled"])
+        btn_cancel.state(["!disabled"])
+        progress_bar["value"] = 0
+        status_var.set(f"Running {mode} operation...")
+        running["thread"].start()
+        root.after(50, poll_operation)
+
+    def poll_operation():
+        writer = running["writer"]
+        finished = None
         try:
-            kontakt_version_int = int(version_var.get())
-        except ValueError:
-            status_var.set("Error: Kontakt version must be an integer.")
+            while True:
+                message = writer.messages.get_nowait()
+                if message[0] == "text":
+                    text_output.insert(tk.END, message[1])
+                    text_output.see(tk.END)
+                elif message[0] == "progress":
+                    _, name, copied, total = message
+                    running["progress"][name] = (copied, total)
+                elif message[0] == "done":
+                    finished = message[1]
+        except queue.Empty:
+            pass
+
+        if running["progress"]:
+            copied = sum(done for done, _ in running["progress"].values())
+            total = sum(size for _, size in running["progress"].values())
+            progress_bar["value"] = 100 * copied / total if total else 100
+            status_var.set("\n".join(
+                f"{name} : {done / 1048576:.0f} of {size / 1048576:.0f} MB"
+                for name, (done, size) in sorted(running["progress"].items())))
+
+        if finished is None:
+            root.after(50, poll_operation)
             return
 
-        new_version = new_version_var.get()
-        include_vst = include_vst_var.get()
-        include_aax = include_aax_var.get()
+        running["thread"].join()
+        running["thread"] = None
+        for button in (btn_load, btn_store, btn_read, btn_verify, btn_scrub, btn_retention, btn_measure, btn_profile, btn_snapshot, btn_pin, btn_unpin):
+            button.state(["!disabled"])
+        btn_cancel.state(["disabled"])
+        status_var.set(finished)
 
-        # Call the "read" operation
-        run_kontakt_operation(
-            mode="read",
-            kontakt_version=kontakt_version_int,
-            new_version=new_version,
-            include_vst=include_vst,
-            include_aax=include_aax,
-            text_widget=text_output,
-            library_path=library_path_var.get()
-        )
+    def on_load():
+        start_operation("load")
+
+    def on_store():
+        start_operation("store")
+
+    def on_read():
+        start_operation("read")
+
+    def on_verify():
+        start_operation("verify")
+
+    def on_scrub():
+        start_operation("scrub")
+
+    def on_retention():
+        start_operation("retention")
+
+    def on_pin():
+        start_operation("pin")
+
+    def on_unpin():
+        start_operation("unpin")
+
+    def on_measure():
+        start_operation("measure")
+
+    def on_profile():
+        if not profile_var.get().strip():
+            status_var.set("Error: choose a profile to apply.")
+            return
+        start_operation("profile")
+
+    def on_snapshot():
+        if not profile_var.get().strip():
+            status_var.set("Error: type a name for the new profile.")
+            return
+        start_operation("snapshot")
 
-        status_var.set(f"Completed read operation!")
+    def on_cancel():
+        if running["thread"] is not None:
+            running["writer"].cancel()
+            status_var.set("Cancelling...")
 
     # ------------------
     
@@ -508,6 +4517,31 @@ def main():
     btn_store.pack(side="left", padx=5)
     btn_read = ttk.Button(btn_frame, text="Read", command=on_read)
     btn_read.pack(side="left", padx=5)
+    btn_verify = ttk.Button(btn_frame, text="Verify", command=on_verify)
+    btn_verify.pack(side="left", padx=5)
+    btn_scrub = ttk.Button(btn_frame, text="Scrub", command=on_scrub)
+    btn_scrub.pack(side="left", padx=5)
+    btn_retention = ttk.Button(btn_frame, text="Retention", command=on_retention)
+    btn_retention.pack(side="left", padx=5)
+    btn_measure = ttk.Button(btn_frame, text="Measure", command=on_measure)
+    btn_measure.pack(side="left", padx=5)
+    btn_cancel = ttk.Button(btn_frame, text="Cancel", command=on_cancel)
+    btn_cancel.pack(side="left", padx=5)
+    btn_cancel.state(["disabled"])
+
+    btn_profile = ttk.Button(profile_frame, text="Apply Profile", command=on_profile)
+    btn_profile.pack(side="left", padx=5)
+    btn_snapshot = ttk.Button(profile_frame, text="Save Installed As Profile", command=on_snapshot)
+    btn_snapshot.pack(side="left", padx=5)
+
+    btn_pin = ttk.Button(detail_version_frame, text="Pin", command=on_pin)
+    btn_pin.pack(side="left", padx=5)
+    btn_unpin = ttk.Button(detail_version_frame, text="Unpin", command=on_unpin)
+    btn_unpin.pack(side="left")
+
+    # Byte progress of the files being copied
+    progress_bar = ttk.Progressbar(root, orient="horizontal", length=400, mode="determinate", maximum=100)
+    progress_bar.pack(pady=5)
 
     #credit link
     link_label = tk.Label(
@@ -527,15 +4561,31 @@ def main():
 
     #display instructions at startup
     write_instructions(text_output)
+    # Finish or undo a load that was interrupted last time
+    recover_load_transaction(text_output)
+    # Carry on watching the installed files if that was left on last time
+    on_auto_store_change()
     
-    # Save settings when the window is closed
-    root.protocol("WM_DELETE_WINDOW", lambda: (save_config_settings(
-        library_path_var.get(),
-        version_var.get(),
-        new_version_var.get(),
-        include_vst_var.get(),
-        include_aax_var.get()
-    ), root.destroy()))
+    # Save settings when the window is closed, letting a running operation stop cleanly first
+    def on_close():
+        if running["thread"] is not None:
+            running["writer"].cancel()
+            root.after(100, on_close)
+            return
+        prefetcher.stop()
+        if watching["watcher"] is not None:
+            watching["watcher"].stop()
+        get_config_store().set(CONFIG_SECTION, "AutoStore", str(auto_store_var.get()))
+        save_config_settings(
+            library_path_var.get(),
+            version_var.get(),
+            new_version_var.get(),
+            include_vst_var.get(),
+            include_aax_var.get(),
+            storage_mode_var.get()
+        )
+        root.destroy()
+    root.protocol("WM_DELETE_WINDOW", on_close)
 
     # Start the event loop
     root.mainloop()
@@ -544,4 +4594,7 @@ def main():
 # Execute script
 
 if __name__ == "__main__":
+    # Any arguments run the command line instead of the window
+    if len(sys.argv) > 1:
+        sys.exit(run_cli(sys.argv[1:]))
     main()
\ No newline at end of file
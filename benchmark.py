@@ -0,0 +1,263 @@
+'''
+
+Kontakt Version Manager benchmarks
+
+Times loading, storing, reading and library lookups against a synthetic library and a fake
+install tree, so nothing touches the real Program Files folder or settings.
+
+    python benchmark.py --entries 10,100,1000,10000 --output bench.json
+    python benchmark.py --output bench_new.json --compare bench.json
+
+Each library holds the requested number of small entries, so the listing and lookup costs
+grow with it, plus a short series of full size releases that share most of their content
+the way neighbouring Kontakt point releases do.
+'''
+
+# ----------------------------------------------------------------------------------]
+# Imports
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import Kontakt_Version_Manager as kvm
+
+# ----------------------------------------------------------------------------------]
+# Options
+
+KONTAKT_VERSION      = 8
+ENTRY_EXTENSIONS     = ['.exe', '.vst3', '.aaxplugin']
+RELEASE_MINOR        = 900       # full size releases are 8.900.x, away from the small entries
+EDIT_MAX_SIZE        = 64 * 1024
+SLOWER_THRESHOLD     = 1.2
+
+# ----------------------------------------------------------------------------------]
+# Synthetic Library
+
+def make_release_series(count, size, rng):
+    """
+    Returns the content of count releases.  Each release is the previous one with a few
+    regions replaced, inserted or removed, so most of the content is shared but shifted.
+    """
+    releases = [rng.randbytes(size)]
+    for _ in range(count - 1):
+        data = bytearray(releases[-1])
+        for _ in range(rng.randint(4, 12)):
+            offset = rng.randrange(len(data))
+            length = rng.randint(1, EDIT_MAX_SIZE)
+            edit = rng.random()
+            if edit < 0.6:
+                data[offset:offset + length] = rng.randbytes(length)
+            elif edit < 0.8:
+                data[offset:offset] = rng.randbytes(length)
+            else:
+                del data[offset:offset + length]
+        releases.append(bytes(data))
+    return releases
+
+def get_entry_name(number):
+    """
+    Returns the library file name of small entry number, cycling through the file types.
+    """
+    release = number // len(ENTRY_EXTENSIONS)
+    extension = ENTRY_EXTENSIONS[number % len(ENTRY_EXTENSIONS)]
+    return f"Kontakt {KONTAKT_VERSION}.{release // 100}.{release % 100}{extension}"
+
+def make_library(library_path, entries, entry_size, rng):
+    """
+    Fills library_path with the given number of small entries.
+    """
+    os.makedirs(library_path, exist_ok=True)
+    for number in range(entries):
+        with open(os.path.join(library_path, get_entry_name(number)), "wb") as f:
+            f.write(rng.randbytes(entry_size))
+
+def make_install_tree(content):
+    """
+    Creates the exe, vst and aax under KVM_INSTALL_ROOT and returns their paths.
+    """
+    paths = kvm.set_kontakt_version(KONTAKT_VERSION)
+    for path in paths:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+    return paths
+
+# ----------------------------------------------------------------------------------]
+# Timing
+
+def time_call(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+def summarize(benchmark, entries, storage, timings, size=None):
+    """
+    Returns one result row, with the throughput when the operation moves size bytes.
+    """
+    result = {
+        "benchmark": benchmark,
+        "entries": entries,
+        "storage": storage,
+        "runs": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings)
+    }
+    if size is not None:
+        result["mb_per_s"] = size / 1048576 / max(result["median"], 1e-9)
+    return result
+
+def benchmark_lookups(library_path, entries, lookups, rng):
+    """
+    Times a full index scan, a refresh with nothing changed, lookups and version listing.
+    """
+    kvm.LIBRARY_INDEXES.pop(library_path, None)
+    kvm.remove_quietly(kvm.LibraryIndex(library_path).index_path)
+    results = [summarize("index_scan", entries, None, [time_call(kvm.get_library_index, library_path)])]
+    results.append(summarize("index_refresh", entries, None, [time_call(kvm.get_library_index, library_path) for _ in range(5)]))
+
+    index = kvm.get_library_index(library_path, refresh=False)
+    names = [get_entry_name(rng.randrange(entries)) for _ in range(lookups)]
+    started = time.perf_counter()
+    for name in names:
+        index.find(name)
+    results.append(summarize("find", entries, None, [(time.perf_counter() - started) / lookups]))
+    results.append(summarize("versions", entries, None, [time_call(index.versions, KONTAKT_VERSION) for _ in range(5)]))
+    return results
+
+def store_release(exe_path, library_path, version, storage, writer):
+    """
+    Stores one release the way the store operation does, compressing the older releases
+    afterwards with 'compressed' storage.
+    """
+    kvm.store_kontakt(exe_path, library_path, version, KONTAKT_VERSION, writer, storage)
+    if storage == "compressed":
+        settings = kvm.load_config_settings()
+        kvm.apply_compression_policy(library_path, settings["CompressionCodec"], settings["KeepUncompressed"], writer)
+
+def benchmark_releases(library_path, entries, storage, releases):
+    """
+    Times storing each release from the install tree, loading each one back, loading a
+    release that is already installed, and reading the installed version.
+    """
+    writer = kvm.ResultWriter()
+    exe_path = make_install_tree(releases[0])[0]
+    size = len(releases[0])
+    versions = [f"{KONTAKT_VERSION}.{RELEASE_MINOR}.{number}" for number in range(len(releases))]
+
+    store_timings = []
+    for version, content in zip(versions, releases):
+        with open(exe_path, "wb") as f:
+            f.write(content)
+        store_timings.append(time_call(store_release, exe_path, library_path, version, storage, writer))
+
+    load_timings = []
+    current_timings = []
+    for version in versions:
+        load_timings.append(time_call(kvm.copy_kontakt, library_path, exe_path, '.exe', version, KONTAKT_VERSION, writer))
+        current_timings.append(time_call(kvm.copy_kontakt, library_path, exe_path, '.exe', version, KONTAKT_VERSION, writer))
+
+    read_timings = [time_call(kvm.read_kontakt_version, exe_path, KONTAKT_VERSION, writer) for _ in range(5)]
+
+    failures = [line for line in writer.lines() if "Failed" in line or "not available" in line]
+    if failures:
+        raise RuntimeError(f"{storage} benchmark failed: {failures[0]}")
+    return [summarize("store_kontakt", entries, storage, store_timings, size),
+            summarize("copy_kontakt", entries, storage, load_timings, size),
+            summarize("copy_kontakt_current", entries, storage, current_timings),
+            summarize("read_kontakt_version", entries, storage, read_timings)]
+
+# ----------------------------------------------------------------------------------]
+# Reporting
+
+def get_result_key(result):
+    return (result["benchmark"], result["entries"], result["storage"])
+
+def compare_results(results, previous_path, threshold):
+    """
+    Prints how each median changed against an earlier results file.
+    Returns the number of benchmarks that got slower than the threshold.
+    """
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {get_result_key(result): result for result in json.load(f)["results"]}
+    slower = 0
+    print(f"\n{'benchmark':<24}{'entries':>8}  {'storage':<12}{'ratio':>8}")
+    for result in results:
+        before = previous.get(get_result_key(result))
+        if before is None:
+            continue
+        ratio = result["median"] / max(before["median"], 1e-9)
+        flag = "  slower" if ratio > threshold else ""
+        slower += ratio > threshold
+        print(f"{result['benchmark']:<24}{result['entries']:>8}  {result['storage'] or '-':<12}{ratio:>8.2f}{flag}")
+    return slower
+
+def print_results(results):
+    print(f"{'benchmark':<24}{'entries':>8}  {'storage':<12}{'median ms':>12}{'MB/s':>10}")
+    for result in results:
+        throughput = f"{result['mb_per_s']:.0f}" if "mb_per_s" in result else ""
+        print(f"{result['benchmark']:<24}{result['entries']:>8}  {result['storage'] or '-':<12}{result['median'] * 1000:>12.3f}{throughput:>10}")
+
+# ----------------------------------------------------------------------------------]
+# Main
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Benchmarks Kontakt Version Manager against a synthetic library.")
+    parser.add_argument("--entries", default="10,100,1000,10000", help="comma separated library sizes")
+    parser.add_argument("--storage", default="files,chunked", help="comma separated library storage modes")
+    parser.add_argument("--releases", type=int, default=3, help="full size releases stored and loaded per library")
+    parser.add_argument("--release-mb", type=float, default=16, help="size of each full size release")
+    parser.add_argument("--entry-kb", type=int, default=4, help="size of each small library entry")
+    parser.add_argument("--lookups", type=int, default=10000, help="number of timed lookups")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workdir", help="directory for the libraries, install tree and config (a temp dir by default)")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=SLOWER_THRESHOLD, help="ratio reported as slower when comparing")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="kvm-bench-")
+    # Both are read when used, so setting them here redirects every path the manager touches
+    os.environ["KVM_CONFIG_DIR"] = os.path.join(workdir, "config")
+    os.environ["KVM_INSTALL_ROOT"] = os.path.join(workdir, "Program Files")
+
+    rng = random.Random(args.seed)
+    releases = make_release_series(args.releases, int(args.release_mb * 1048576), rng)
+    results = []
+    try:
+        for entries in [int(value) for value in args.entries.split(",")]:
+            for storage in args.storage.split(","):
+                library_path = os.path.join(workdir, f"library-{entries}-{storage}")
+                make_library(library_path, entries, args.entry_kb * 1024, rng)
+                if storage == args.storage.split(",")[0]:
+                    results.extend(benchmark_lookups(library_path, entries, args.lookups, rng))
+                results.extend(benchmark_releases(library_path, entries, storage, releases))
+                shutil.rmtree(library_path, ignore_errors=True)
+                print(f"{entries} entries, {storage} storage done", file=sys.stderr)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        report = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": sys.version,
+            "platform": sys.platform,
+            "parameters": vars(args),
+            "results": results
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        return 1 if compare_results(results, args.compare, args.threshold) else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,439 @@
+'''
+
+Kontakt Version Manager library server
+
+Shares one version library folder with every studio machine over HTTP.  Set the library path
+on each machine to the address of the server and loads fetch only the chunks that machine
+does not hold yet, while stores send only the chunks the server does not hold yet.
+
+    python library_server.py "D:\\Kontakt Library" --port 8765
+
+then use http://<server>:8765/ as the library path.  It is a reference server for a trusted
+studio network, so there is no authentication; put it behind a proxy to reach it from outside.
+
+The plain files of the library are hashed and split into chunks on a thread of their own, at
+start and whenever a plain file is added or changed.  Until that is done every request that
+needs it is answered 503 with a Retry-After header, which the client waits for.
+
+    GET  /index              every version with its content hash, and the files of bundles
+    GET  /chunks/<hash>      the content defined chunks of one file content
+    GET  /content/<hash>     the bytes of one file content, with Range support
+    POST /missing            the chunk hashes in the posted list the server lacks
+    PUT  /chunk/<hash>       one chunk
+    PUT  /manifest/<name>    a stored file, as a chunk manifest
+    PUT  /bundle/<name>      a stored bundle, as a chunk manifest per file
+'''
+
+# ----------------------------------------------------------------------------------]
+# Imports
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import Kontakt_Version_Manager as kvm
+
+# ----------------------------------------------------------------------------------]
+# Options
+
+DEFAULT_PORT         = 8765
+COPY_BUFFER_SIZE     = 1024 * 1024
+HASH_PATTERN         = re.compile(r"[0-9a-f]{64}")
+RETRY_AFTER          = 5         # seconds a client is asked to wait while the library is prepared
+
+# ----------------------------------------------------------------------------------]
+# Library
+
+class LibraryNotReady(Exception):
+    """
+    Raised while the library is still being hashed and chunked.
+    """
+
+def list_content_chunks(path):
+    """
+    Returns the [hash, length] of every content defined chunk of a file.
+    """
+    chunks = []
+    with open(path, "rb") as f:
+        for chunk in kvm.iter_content_chunks(f):
+            chunk_hash = kvm.new_content_hash()
+            chunk_hash.update(chunk)
+            chunks.append([chunk_hash.hexdigest(), len(chunk)])
+    return chunks
+
+class SharedLibrary:
+    """
+    The library folder being served.  Every content is addressed by its hash; a version kept
+    as anything but a plain file or bundle is rebuilt once into a scratch folder to be served.
+
+    The chunks of the plain files and bundles count as held by the server, so a store only
+    sends what the library lacks.  A stored version using them gets them copied into the
+    chunk store.  The chunk lists are kept in the config directory, keyed by content hash,
+    so a restarted server does not read the whole library again.
+
+    Reading the library is left to prepare, on a thread of its own, so no request waits
+    for it while holding the lock; requests raise LibraryNotReady until it is done.
+    """
+    def __init__(self, library_path):
+        self.library_path = library_path
+        self.lock = threading.RLock()
+        self.contents = {}
+        self.chunk_lists_path = os.path.join(kvm.get_config_dir(), "server_chunk_lists.json")
+        try:
+            with open(self.chunk_lists_path, "r", encoding="utf-8") as f:
+                self.chunk_lists = json.load(f)
+        except (OSError, ValueError):
+            self.chunk_lists = {}
+        self.chunk_locations = {}
+        self.preparer = None
+        self.failure = None
+        self.scratch_path = tempfile.mkdtemp(prefix="kvm-server-")
+
+    def read_listing(self, index):
+        """
+        Returns the entries of the library that have a content hash, a map from the hash of
+        every plain file and bundle file to its path, and the names of the entries not hashed yet.
+        """
+        entries = {}
+        paths = {}
+        unhashed = []
+        for name, entry in list(index.entries.items()):
+            if entry["hash"] is None:
+                unhashed.append(name)
+                continue
+            listed = dict(entry)
+            if entry["format"] == "bundle":
+                bundle_path = os.path.join(self.library_path, name)
+                listed["files"] = kvm.load_bundle_manifest(self.library_path, name)["files"]
+                for relative_path, (_, _, content_hash) in listed["files"].items():
+                    paths[content_hash] = kvm.get_bundle_file_path(bundle_path, relative_path)
+            elif entry["format"] == "files":
+                paths[entry["hash"]] = os.path.join(self.library_path, name)
+            entries[name] = listed
+        return entries, paths, unhashed
+
+    def start_preparing(self):
+        with self.lock:
+            if self.preparer is None or not self.preparer.is_alive():
+                self.preparer = threading.Thread(target=self.prepare, daemon=True)
+                self.preparer.start()
+
+    def prepare(self):
+        """
+        Hashes the plain files that have no hash yet, then splits every plain file and bundle
+        file without a chunk list into chunks.  Each file is read without holding the lock.
+        """
+        with self.lock:
+            self.failure = None
+        try:
+            index = kvm.get_library_index(self.library_path)
+            for name in self.read_listing(index)[2]:
+                kvm.get_fingerprint_cache().content_hash(os.path.join(self.library_path, name), save=False)
+                # Answered from the fingerprint cache, so the index lock is only held briefly
+                index.content_hash(name, save=False)
+            index.save_hashes()
+            for content_hash, path in self.read_listing(index)[1].items():
+                if content_hash not in self.chunk_lists:
+                    chunks = list_content_chunks(path)
+                    with self.lock:
+                        self.chunk_lists[content_hash] = chunks
+            with self.lock:
+                self.save_chunk_lists()
+        except Exception as e:
+            with self.lock:
+                self.failure = f"Failed to prepare the library. Error: {e}"
+            print(self.failure, file=sys.stderr)
+
+    def list_entries(self):
+        """
+        Returns the entries of the library with their content hash, and maps each content
+        hash to where it can be read.  Raises LibraryNotReady, after starting prepare, while
+        a plain file is not hashed or chunked yet.
+        """
+        with self.lock:
+            index = kvm.get_library_index(self.library_path)
+            entries, paths, unhashed = self.read_listing(index)
+            if unhashed or any(content_hash not in self.chunk_lists for content_hash in paths):
+                if self.failure and not self.preparer.is_alive():
+                    # Reported once, the next request tries again
+                    failure, self.failure = self.failure, None
+                    raise OSError(failure)
+                self.start_preparing()
+                raise LibraryNotReady()
+            self.contents.update(paths)
+            for name, entry in entries.items():
+                self.contents.setdefault(entry["hash"], name)
+            return entries
+
+    def get_content_path(self, content_hash):
+        """
+        Returns the path of a file holding the content, or None when the library has none.
+        """
+        with self.lock:
+            if content_hash not in self.contents:
+                self.list_entries()
+            location = self.contents.get(content_hash)
+            if location is None or os.path.isabs(location):
+                return location
+            path = os.path.join(self.scratch_path, content_hash)
+            kvm.restore_library_entry(kvm.get_library_index(self.library_path), location, path)
+            self.contents[content_hash] = path
+            return path
+
+    def get_chunks(self, content_hash):
+        """
+        Returns the chunk list of a content.  Plain files and bundle files have theirs from
+        prepare; a version stored otherwise is rebuilt and chunked here, one entry at a time.
+        """
+        with self.lock:
+            if content_hash not in self.chunk_lists:
+                path = self.get_content_path(content_hash)
+                if path is None:
+                    return None
+                self.chunk_lists[content_hash] = list_content_chunks(path)
+                self.save_chunk_lists()
+            return self.chunk_lists[content_hash]
+
+    def save_chunk_lists(self):
+        kvm.write_file_atomic(self.chunk_lists_path, json.dumps(self.chunk_lists).encode("utf-8"))
+
+    def locate_chunks(self):
+        """
+        Maps the hash of every chunk of the plain files and bundles to where it can be read,
+        as (path, offset, length), from the chunk lists prepare made.
+        """
+        with self.lock:
+            self.list_entries()
+            locations = {}
+            for content_hash, path in self.contents.items():
+                if not os.path.isabs(path):
+                    continue
+                offset = 0
+                for chunk_hash, length in self.chunk_lists.get(content_hash, []):
+                    locations.setdefault(chunk_hash, (path, offset, length))
+                    offset += length
+            self.chunk_locations = locations
+
+    def find_missing(self, chunk_hashes):
+        self.locate_chunks()
+        return [chunk_hash for chunk_hash in chunk_hashes if not self.has_chunk(chunk_hash)]
+
+    def has_chunk(self, chunk_hash):
+        return chunk_hash in self.chunk_locations or os.path.exists(kvm.get_chunk_path(self.library_path, chunk_hash))
+
+    def collect_chunks(self, file_name, chunks):
+        """
+        Makes sure the chunk store holds every chunk in chunks, copying the ones only found
+        in a plain file or bundle out of it.  Raises ValueError when any cannot be found.
+        """
+        self.locate_chunks()
+        missing = 0
+        for chunk_hash, _ in chunks:
+            chunk_path = kvm.get_chunk_path(self.library_path, chunk_hash)
+            if os.path.exists(chunk_path):
+                continue
+            location = self.chunk_locations.get(chunk_hash)
+            if location is None:
+                missing += 1
+                continue
+            path, offset, length = location
+            with open(path, "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+            received_hash = kvm.new_content_hash()
+            received_hash.update(data)
+            if received_hash.hexdigest() != chunk_hash:
+                # The file changed since it was chunked
+                missing += 1
+                continue
+            kvm.write_file_atomic(chunk_path, data)
+        if missing:
+            raise ValueError(f"{missing} chunks of {file_name} have not been sent")
+
+    def store_manifest(self, file_name, manifest):
+        """
+        Adds a version stored as a chunk manifest, once all of its chunks are in the library.
+        """
+        with self.lock:
+            self.collect_chunks(file_name, manifest["chunks"])
+            self.chunk_lists[manifest["hash"]] = manifest["chunks"]
+            manifest["name"] = file_name
+            kvm.write_file_atomic(kvm.get_manifest_path(self.library_path, file_name), json.dumps(manifest).encode("utf-8"))
+            kvm.get_library_index(self.library_path, refresh=False).invalidate()
+
+    def store_bundle(self, file_name, files):
+        with self.lock:
+            for manifest in files.values():
+                self.collect_chunks(file_name, manifest["chunks"])
+                # Known from the upload, so the new bundle files need no chunking
+                self.chunk_lists[manifest["hash"]] = manifest["chunks"]
+            kvm.restore_bundle_chunked(self.library_path, file_name, files)
+            self.save_chunk_lists()
+            kvm.get_library_index(self.library_path, refresh=False).invalidate()
+
+# ----------------------------------------------------------------------------------]
+# HTTP
+
+class LibraryRequestHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so clients reuse their pooled connections
+    protocol_version = "HTTP/1.1"
+    library = None
+
+    def send_json(self, value, status=200):
+        body = json.dumps(value).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_failure(self, status, message, headers=None):
+        body = message.encode("utf-8")
+        self.send_response(status, message)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_not_ready(self):
+        self.send_failure(503, "The library is still being indexed", {"Retry-After": str(RETRY_AFTER)})
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def get_route(self):
+        """
+        Returns the first path segment and the unquoted rest of the request path.
+        """
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path).lstrip("/")
+        route, _, argument = path.partition("/")
+        return route, argument
+
+    def do_GET(self):
+        route, argument = self.get_route()
+        try:
+            if route == "index":
+                self.send_json({"entries": self.library.list_entries()})
+            elif route == "chunks" and HASH_PATTERN.fullmatch(argument):
+                chunks = self.library.get_chunks(argument)
+                if chunks is None:
+                    self.send_failure(404, "Unknown content")
+                else:
+                    self.send_json({"chunks": chunks})
+            elif route == "content" and HASH_PATTERN.fullmatch(argument):
+                self.send_content(argument)
+            else:
+                self.send_failure(404, "Not found")
+        except LibraryNotReady:
+            self.send_not_ready()
+        except (OSError, ValueError) as e:
+            self.send_failure(500, str(e))
+
+    def send_content(self, content_hash):
+        path = self.library.get_content_path(content_hash)
+        if path is None:
+            self.send_failure(404, "Unknown content")
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        requested = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if requested:
+            start = int(requested.group(1))
+            end = min(int(requested.group(2) or end), size - 1)
+            if start > end:
+                self.send_failure(416, "Range not satisfiable")
+                return
+        self.send_response(206 if requested else 200)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start + 1))
+        if requested:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                block = f.read(min(remaining, COPY_BUFFER_SIZE))
+                if not block:
+                    break
+                self.wfile.write(block)
+                remaining -= len(block)
+
+    def do_POST(self):
+        route, _ = self.get_route()
+        body = self.read_body()
+        if route != "missing":
+            self.send_failure(404, "Not found")
+            return
+        try:
+            chunk_hashes = json.loads(body)
+            if not isinstance(chunk_hashes, list) or not all(isinstance(chunk_hash, str) and HASH_PATTERN.fullmatch(chunk_hash)
+                                                              for chunk_hash in chunk_hashes):
+                raise ValueError("Expected a list of chunk hashes")
+            self.send_json(self.library.find_missing(chunk_hashes))
+        except LibraryNotReady:
+            self.send_not_ready()
+        except (OSError, ValueError, TypeError) as e:
+            self.send_failure(400, str(e))
+
+    def do_PUT(self):
+        route, argument = self.get_route()
+        body = self.read_body()
+        try:
+            if route == "chunk" and HASH_PATTERN.fullmatch(argument):
+                chunk_hash = kvm.new_content_hash()
+                chunk_hash.update(body)
+                if chunk_hash.hexdigest() != argument:
+                    self.send_failure(400, "Chunk does not match its hash")
+                    return
+                kvm.write_file_atomic(kvm.get_chunk_path(self.library.library_path, argument), body)
+                self.send_json({"ok": True})
+            elif route in ("manifest", "bundle") and kvm.parse_library_name(argument) and "/" not in argument:
+                if route == "manifest":
+                    self.library.store_manifest(argument, json.loads(body))
+                else:
+                    self.library.store_bundle(argument, json.loads(body)["files"])
+                self.send_json({"ok": True})
+            else:
+                self.send_failure(404, "Not found")
+        except LibraryNotReady:
+            self.send_not_ready()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self.send_failure(400, str(e))
+
+# ----------------------------------------------------------------------------------]
+# Main
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Shares a Kontakt version library over HTTP.")
+    parser.add_argument("library", help="the library folder to share")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.library):
+        parser.error(f"{args.library} is not a folder")
+    LibraryRequestHandler.library = SharedLibrary(os.path.abspath(args.library))
+    LibraryRequestHandler.library.start_preparing()
+    server = ThreadingHTTPServer((args.host, args.port), LibraryRequestHandler)
+    print(f"Sharing {args.library} on http://{args.host}:{args.port}/, indexing it in the background", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        shutil.rmtree(LibraryRequestHandler.library.scratch_path, ignore_errors=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
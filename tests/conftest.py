@@ -0,0 +1,105 @@
+'''
+
+Shared fixtures for the Kontakt Version Manager tests.
+
+Every test gets its own settings folder and Program Files folder under tmp_path, through
+KVM_CONFIG_DIR and KVM_INSTALL_ROOT, so nothing touches the real settings or installs.
+'''
+
+import os
+import struct
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Kontakt_Version_Manager as kvm
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    """
+    Points the settings and install folders into tmp_path and drops every shared cache,
+    so each test starts like a fresh run.
+    """
+    monkeypatch.setenv("KVM_CONFIG_DIR", str(tmp_path / "config"))
+    monkeypatch.setenv("KVM_INSTALL_ROOT", str(tmp_path / "Program Files"))
+    for name in ("CONFIG_STORE", "INSTALL_INDEX", "FINGERPRINT_CACHE", "VERSION_DETECTOR"):
+        monkeypatch.setattr(kvm, name, None)
+    monkeypatch.setattr(kvm, "LIBRARY_INDEXES", {})
+    return tmp_path
+
+@pytest.fixture
+def install_root(tmp_path):
+    return tmp_path / "Program Files"
+
+# ----------------------------------------------------------------------------------]
+# Sample PE binaries
+
+def pad4(data):
+    return data + b"\0" * (-len(data) % 4)
+
+def version_block(key, value=b"", value_length=0, value_type=1, children=b""):
+    """
+    Returns one VS_VERSIONINFO style block: length, value length, type, key, value, children.
+    """
+    head = pad4(struct.pack("<HHH", 0, value_length, value_type) + (key + "\0").encode("utf-16-le"))
+    body = pad4(head + value) + children
+    return struct.pack("<H", len(body)) + body[2:]
+
+def version_resource(file_version, product_version):
+    """
+    Returns a VS_VERSIONINFO resource with a fixed file version and a ProductVersion string.
+    """
+    numbers = [int(part) for part in file_version.split(".")]
+    fixed_info = struct.pack("<13I", 0xFEEF04BD, 0x10000,
+                             numbers[0] << 16 | numbers[1], numbers[2] << 16 | numbers[3],
+                             numbers[0] << 16 | numbers[1], numbers[2] << 16 | numbers[3],
+                             0x3F, 0, 0x40004, 1, 0, 0, 0)
+    value = (product_version + "\0").encode("utf-16-le")
+    string = version_block("ProductVersion", value, len(product_version) + 1)
+    table = version_block("040904B0", children=pad4(string))
+    string_info = version_block("StringFileInfo", children=pad4(table))
+    return version_block("VS_VERSION_INFO", fixed_info, len(fixed_info), 0, pad4(string_info))
+
+def build_pe(file_version="8.2.0.3", product_version="8.2.0"):
+    """
+    Returns the bytes of a minimal 32 bit PE image whose only section holds a version resource.
+    """
+    section_rva, section_offset, alignment = 0x1000, 0x200, 0x200
+    # Resource tree: type RT_VERSION (16) -> name 1 -> language 0x409 -> data entry
+    def directory(entry_id, target):
+        return struct.pack("<IIHHHHII", 0, 0, 0, 0, 0, 1, entry_id, target)
+
+    data = version_resource(file_version, product_version)
+    tree = (directory(16, 0x80000000 | 24) + directory(1, 0x80000000 | 48) +
+            directory(0x409, 72) + struct.pack("<IIII", section_rva + 88, len(data), 0, 0))
+    section = pad4(tree) + data
+    raw_size = len(section) + (-len(section) % alignment)
+
+    dos_header = b"MZ" + b"\0" * 58 + struct.pack("<I", 0x40)
+    file_header = struct.pack("<HHIIIHH", 0x14C, 1, 0, 0, 0, 0xE0, 0x0102)
+    data_directories = [(0, 0)] * 16
+    data_directories[2] = (section_rva, len(section))
+    optional_header = struct.pack("<HBBIIIIIIIIIHHHHHHIIIIHHIIIIII",
+                                  0x10B, 14, 0, 0, raw_size, 0, 0, 0, section_rva, 0x400000,
+                                  0x1000, alignment, 6, 0, 0, 0, 6, 0, 0,
+                                  section_rva + 0x1000, section_offset, 0, 2, 0,
+                                  0x100000, 0x1000, 0x100000, 0x1000, 0, 16)
+    optional_header += b"".join(struct.pack("<II", *entry) for entry in data_directories)
+    section_header = struct.pack("<8sIIIIIIHHI", b".rsrc", len(section), section_rva, raw_size,
+                                 section_offset, 0, 0, 0, 0, 0x40000040)
+    headers = dos_header + b"PE\0\0" + file_header + optional_header + section_header
+    return headers.ljust(section_offset, b"\0") + section.ljust(raw_size, b"\0")
+
+@pytest.fixture
+def make_pe():
+    """
+    Writes a sample PE with a version resource to a path, creating its folders.
+    """
+    def write(path, file_version="8.2.0.3", product_version="8.2.0"):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(build_pe(file_version, product_version))
+        return path
+    return write
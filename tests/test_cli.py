@@ -0,0 +1,35 @@
+import json
+
+import Kontakt_Version_Manager as kvm
+
+def run_batch(tmp_path, capsys, text):
+    batch_path = tmp_path / "batch.txt"
+    batch_path.write_text(text, encoding="utf-8")
+    library_path = tmp_path / "library"
+    library_path.mkdir(exist_ok=True)
+    exit_code = kvm.run_cli(["batch", str(batch_path), "--library", str(library_path), "--kontakt", "8"])
+    captured = capsys.readouterr()
+    return exit_code, json.loads(captured.out), captured.err
+
+def test_invalid_batch_lines_are_only_reported_in_the_results(tmp_path, capsys):
+    exit_code, output, stderr = run_batch(tmp_path, capsys, "\n".join([
+        "list",
+        "uninstall 8.0.0",
+        "list --kontakt eight",
+        "list -h",
+        "batch other.txt",
+        "list",
+    ]))
+    assert exit_code == 1
+    assert stderr == ""
+    results = output["results"]
+    assert [result["ok"] for result in results] == [True, False, False, False, False, True]
+    assert "invalid choice: 'uninstall'" in results[1]["messages"][0]
+    assert "invalid int value: 'eight'" in results[2]["messages"][0]
+    assert "unrecognized arguments: -h" in results[3]["messages"][0]
+    assert results[4]["messages"] == ["Invalid batch line: a batch file cannot run another batch"]
+
+def test_valid_batch_succeeds(tmp_path, capsys):
+    exit_code, output, stderr = run_batch(tmp_path, capsys, "# comment\n\nlist\nverify\n")
+    assert exit_code == 0 and output["ok"]
+    assert [result["operation"] for result in output["results"]] == ["list", "verify"]
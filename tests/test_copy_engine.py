@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+SIZE = 3 * 256 * 1024 + 1234
+
+def fail(*args):
+    raise OSError("not supported here")
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "Kontakt 8.exe"
+    path.write_bytes(os.urandom(SIZE))
+    os.utime(path, ns=(1_600_000_000_000_000_000, 1_600_000_000_000_000_000))
+    return path
+
+@pytest.fixture
+def small_blocks(monkeypatch):
+    # Several blocks per file, so a primitive can fail part way
+    monkeypatch.setattr(kvm, "READ_BUFFER_SIZE", 256 * 1024)
+
+def test_copy_keeps_content_and_mtime(source, tmp_path):
+    destination = tmp_path / "copy.exe"
+    method = kvm.copy_file_fast(str(source), str(destination))
+    assert method in ("reflink", "copy_file_range", "sendfile", "stream", "CopyFile2")
+    assert destination.read_bytes() == source.read_bytes()
+    assert destination.stat().st_mtime_ns == source.stat().st_mtime_ns
+
+def test_copy_into_folder_keeps_the_name(source, tmp_path):
+    folder = tmp_path / "library"
+    folder.mkdir()
+    kvm.copy_file_fast(str(source), str(folder))
+    assert (folder / source.name).read_bytes() == source.read_bytes()
+
+@pytest.mark.parametrize("unavailable, expected", [
+    (["clone_file"], ("copy_file_range", "sendfile", "stream")),
+    (["clone_file", "copy_file_range"], ("sendfile", "stream")),
+    (["clone_file", "copy_file_range", "sendfile"], ("stream",)),
+])
+def test_falls_back_to_the_next_primitive(source, tmp_path, monkeypatch, small_blocks, unavailable, expected):
+    if "clone_file" in unavailable:
+        monkeypatch.setattr(kvm, "clone_file", fail)
+    for name in unavailable[1:]:
+        monkeypatch.setattr(os, name, fail, raising=False)
+    destination = tmp_path / "copy.exe"
+    assert kvm.copy_file_fast(str(source), str(destination)) in expected
+    assert destination.read_bytes() == source.read_bytes()
+
+def test_primitive_failing_part_way_is_continued(source, tmp_path, monkeypatch, small_blocks):
+    if not hasattr(os, "copy_file_range"):
+        pytest.skip("copy_file_range is not available")
+    copy_file_range = os.copy_file_range
+    calls = []
+
+    def copy_one_block(*args):
+        calls.append(args)
+        if len(calls) > 1:
+            raise OSError("cross device")
+        return copy_file_range(*args)
+
+    monkeypatch.setattr(kvm, "clone_file", fail)
+    monkeypatch.setattr(os, "copy_file_range", copy_one_block)
+    monkeypatch.setattr(os, "sendfile", fail, raising=False)
+    destination = tmp_path / "copy.exe"
+    content_hash, method = kvm.copy_file_hashed(str(source), str(destination))
+    assert method == "stream"
+    assert destination.read_bytes() == source.read_bytes()
+    # The block copied before the failure is part of the hash too
+    assert content_hash == kvm.hash_file(str(source))
+
+def test_cancelled_copy_leaves_the_destination_alone(source, tmp_path, monkeypatch, small_blocks):
+    monkeypatch.setattr(kvm, "clone_file", fail)
+    destination = tmp_path / "copy.exe"
+    destination.write_bytes(b"previous version")
+
+    def cancel(copied, size):
+        raise kvm.OperationCancelled("copy.exe")
+
+    with pytest.raises(kvm.OperationCancelled):
+        kvm.copy_file_fast(str(source), str(destination), cancel)
+    assert destination.read_bytes() == b"previous version"
+    assert not any(name.endswith(".kvm-part") for name in os.listdir(tmp_path))
+
+@pytest.mark.parametrize("stream_only", [False, True])
+def test_hashed_copy_matches_the_content(source, tmp_path, monkeypatch, small_blocks, stream_only):
+    if stream_only:
+        monkeypatch.setattr(kvm, "clone_file", fail)
+        monkeypatch.setattr(os, "copy_file_range", fail, raising=False)
+        monkeypatch.setattr(os, "sendfile", fail, raising=False)
+    destination = tmp_path / "copy.exe"
+    content_hash, method = kvm.copy_file_hashed(str(source), str(destination))
+    assert content_hash == kvm.hash_file(str(source))
+    if stream_only:
+        assert method == "stream"
+    assert destination.read_bytes() == source.read_bytes()
+
+def test_hashed_copy_never_reads_the_copy_back(source, tmp_path, monkeypatch, small_blocks):
+    hash_file = kvm.hash_file
+
+    def unexpected_read(path, progress=None):
+        raise AssertionError("the copy was read back to hash it")
+
+    monkeypatch.setattr(kvm, "hash_file", unexpected_read)
+    content_hash, method = kvm.copy_file_hashed(str(source), str(tmp_path / "copy.exe"))
+    assert method != "stream" or not hasattr(os, "copy_file_range")
+    assert content_hash == hash_file(str(source))
+
+def test_hashed_copy_reports_progress_behind_a_kernel_primitive(source, tmp_path, monkeypatch, small_blocks):
+    if not hasattr(os, "copy_file_range"):
+        pytest.skip("copy_file_range is not available")
+    monkeypatch.setattr(kvm, "clone_file", fail)
+    calls = []
+    content_hash, method = kvm.copy_file_hashed(str(source), str(tmp_path / "copy.exe"),
+                                                lambda copied, size: calls.append(copied))
+    assert method == "copy_file_range"
+    assert calls[-1] == SIZE
+    assert content_hash == kvm.hash_file(str(source))
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+class TextLog:
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, position, text):
+        self.lines.append(text)
+
+def touch(path, content=b"binary"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+@pytest.fixture
+def installs(install_root):
+    """
+    An install tree with Kontakt 8 where the installer puts it, and Kontakt 9 and 10 in
+    layouts the default paths do not cover.
+    """
+    return {
+        (8, "exe"): touch(install_root / "Native Instruments" / "Kontakt 8" / "Kontakt 8.exe"),
+        (8, "vst"): touch(install_root / "Common Files" / "VST3" / "Kontakt 8.vst3"),
+        (9, "vst"): touch(install_root / "Common Files" / "VST3" / "Native Instruments" / "Kontakt 9.vst3"),
+        (10, "exe"): touch(install_root / "Native Instruments" / "Kontakt 10" / "bin" / "Kontakt 10.exe"),
+        (10, "aax"): os.path.join(str(install_root / "Common Files" / "Avid" / "Audio" / "Plug-Ins"),
+                                  "Kontakt 10.aaxplugin"),
+    }
+
+@pytest.fixture
+def aax_bundle(installs):
+    binary = os.path.join(installs[(10, "aax")], "Contents", "x64", "Kontakt 10.aaxplugin")
+    touch(binary)
+    return binary
+
+def test_finds_installs_outside_the_default_paths(installs, aax_bundle):
+    index = kvm.get_install_index()
+    assert index.find(8)[:2] == (installs[(8, "exe")], installs[(8, "vst")])
+    assert index.find(9)[1] == installs[(9, "vst")]
+    assert index.find(10)[0] == installs[(10, "exe")]
+    assert index.find(10)[2] == installs[(10, "aax")]
+    assert {9, 10} <= set(index.versions())
+
+def test_missing_installs_get_the_installer_path(installs):
+    exe_path, vst_path, aax_path = kvm.get_install_index().find(9)
+    assert exe_path == kvm.get_default_install_paths(9)[0]
+    assert aax_path == kvm.get_default_install_paths(9)[2]
+    assert kvm.get_install_index().find(11) == kvm.get_default_install_paths(11)
+
+def test_search_stops_at_the_depth_limit(install_root):
+    deep = touch(install_root / "Native Instruments" / "a" / "b" / "c" / "Kontakt 11.exe")
+    kvm.INSTALL_INDEX = None
+    assert kvm.get_install_index().find(11)[0] != deep
+    assert 11 not in kvm.get_install_index().versions()
+
+    shallow = touch(install_root / "Native Instruments" / "a" / "b" / "Kontakt 11.exe")
+    kvm.INSTALL_INDEX = None
+    assert kvm.get_install_index().find(11)[0] == shallow
+
+def test_bundles_are_not_searched_inside(installs, aax_bundle):
+    bundle = installs[(10, "aax")]
+    scanned = kvm.get_install_index().scan_root(os.path.dirname(bundle))
+    assert [path for path, _, _ in scanned["found"]] == [bundle]
+    assert bundle not in scanned["directories"]
+
+def test_unnumbered_kontakt_is_asked_its_version(install_root, make_pe):
+    plain = touch(install_root / "Native Instruments" / "Kontakt" / "Kontakt.exe", b"no version resource")
+    assert kvm.classify_install(plain, "Kontakt.exe", False) == (6, "exe")
+    sample = make_pe(str(install_root / "Native Instruments" / "Kontakt 7 Beta" / "Kontakt.exe"), "7.10.1.0", "7.10.1")
+    assert kvm.classify_install(sample, "Kontakt.exe", False) == (7, "exe")
+    assert kvm.classify_install(sample, "Kontakt.exe", True) is None
+    assert kvm.classify_install(sample, "Komplete.exe", False) is None
+
+def test_unchanged_roots_are_not_searched_again(installs, monkeypatch):
+    assert 10 in kvm.get_install_index().versions()
+    searched = []
+    scan_root = kvm.InstallIndex.scan_root
+
+    def counting_scan(self, root):
+        searched.append(root)
+        return scan_root(self, root)
+
+    monkeypatch.setattr(kvm.InstallIndex, "scan_root", counting_scan)
+    kvm.INSTALL_INDEX = None
+    assert 10 in kvm.get_install_index().versions()
+    assert searched == []
+
+    # A new install changes one folder of one root, and only that root is searched again
+    touch(os.path.join(os.path.dirname(installs[(8, "exe")]), "..", "Kontakt 12", "Kontakt 12.exe"))
+    kvm.INSTALL_INDEX = None
+    assert 12 in kvm.get_install_index().versions()
+    assert searched == [kvm.get_install_path("Native Instruments")]
+
+def test_install_roots_setting(tmp_path, installs):
+    elsewhere = touch(tmp_path / "D" / "Audio" / "Kontakt 9" / "Kontakt 9.exe")
+    kvm.get_config_store().set("Settings", "InstallRoots", str(tmp_path / "D"))
+    kvm.INSTALL_INDEX = None
+    assert kvm.get_install_index().find(9)[0] == elsewhere
+    # Plugin roots keep their defaults
+    assert kvm.get_install_index().find(9)[1] == installs[(9, "vst")]
+    assert kvm.get_install_index().find(10)[0] == kvm.get_default_install_paths(10)[0]
+
+def test_snapshot_includes_discovered_versions(tmp_path, installs):
+    library_path = tmp_path / "library"
+    library_path.mkdir()
+    log = TextLog()
+    assert kvm.store_kontakt(installs[(10, "exe")], str(library_path), "10.0.1", 10, log)
+    assert kvm.snapshot_profile("studio", str(library_path), log), log.lines
+    assert kvm.load_profiles()["studio"] == [
+        {"kontakt_version": 10, "version": "10.0.1", "include_vst": False, "include_aax": False}]
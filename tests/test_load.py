@@ -0,0 +1,193 @@
+import os
+import shutil
+
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+class TextLog:
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, position, text):
+        self.lines.append(text)
+
+    def text(self):
+        return "".join(self.lines)
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+    return str(path)
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def read_tree(path):
+    """
+    Returns every file of a folder with its content, and every folder in it.
+    """
+    files, folders = {}, set()
+    for root, directories, names in os.walk(path):
+        folders.update(os.path.relpath(os.path.join(root, name), path) for name in directories)
+        files.update({os.path.relpath(os.path.join(root, name), path): read(os.path.join(root, name)) for name in names})
+    return files, folders
+
+def write_tree(path, files):
+    shutil.rmtree(path, ignore_errors=True)
+    for relative_path, content in files.items():
+        write(os.path.join(path, *relative_path.split("/")), content)
+
+def leftovers(install_root):
+    return [os.path.join(root, name) for root, directories, names in os.walk(install_root)
+            for name in directories + names if name.endswith((kvm.STAGED_SUFFIX, kvm.BACKUP_SUFFIX))]
+
+@pytest.fixture
+def library(tmp_path):
+    """
+    A library holding the exe and a single file vst3 of Kontakt 8.1.0 and 8.2.0 as plain
+    files, with 8.1.0 installed.
+    """
+    library_path = tmp_path / "library"
+    library_path.mkdir()
+    log = TextLog()
+    exe_path, vst_path, _ = kvm.get_default_install_paths(8)
+    for version in ("8.1.0", "8.2.0"):
+        for path in (exe_path, vst_path):
+            write(path, os.urandom(64 * 1024) + version.encode())
+            assert kvm.store_kontakt(path, str(library_path), version, 8, log), log.text()
+    write(exe_path, (library_path / "Kontakt 8.1.0.exe").read_bytes())
+    write(vst_path, (library_path / "Kontakt 8.1.0.vst3").read_bytes())
+    return str(library_path)
+
+def fail_second_switch(monkeypatch, error):
+    """
+    Makes the second target switched raise error, after the first was switched for real.
+    Every later switch goes through, as after a restart.
+    """
+    switch_staged_file = kvm.switch_staged_file
+    switched = []
+
+    def switch(target):
+        switched.append(target["destination"])
+        if len(switched) == 2:
+            raise error
+        switch_staged_file(target)
+
+    monkeypatch.setattr(kvm, "switch_staged_file", switch)
+    return switched
+
+def test_second_load_of_a_version_reads_no_installed_file(library, monkeypatch):
+    exe_path = kvm.get_default_install_paths(8)[0]
+    log = TextLog()
+    kvm.copy_kontakt(library, exe_path, ".exe", "8.2.0", 8, log)
+    assert "Kontakt 8.2.0.exe loaded" in log.text()
+    with open(exe_path, "rb") as f:
+        assert f.read() == open(os.path.join(library, "Kontakt 8.2.0.exe"), "rb").read()
+
+    hashed = []
+    hash_file = kvm.hash_file
+
+    def spy(path, progress=None):
+        hashed.append(os.path.abspath(path))
+        return hash_file(path, progress)
+
+    monkeypatch.setattr(kvm, "hash_file", spy)
+    kvm.FINGERPRINT_CACHE = None
+    kvm.LIBRARY_INDEXES.clear()
+    log = TextLog()
+    kvm.copy_kontakt(library, exe_path, ".exe", "8.2.0", 8, log)
+    assert "Kontakt 8.2.0.exe already current" in log.text()
+    assert os.path.abspath(exe_path) not in hashed
+
+def test_failed_switch_rolls_back_the_targets_already_switched(library, monkeypatch):
+    exe_path, vst_path, _ = kvm.get_default_install_paths(8)
+    switched = fail_second_switch(monkeypatch, PermissionError("Kontakt 8.vst3 is in use"))
+    log = TextLog()
+    assert not kvm.load_targets(kvm.get_profile_targets(8, "8.2.0", True, False), library, log)
+    assert switched == [exe_path, vst_path]
+    assert "the previous versions were put back" in log.text()
+    assert read(exe_path) == read(os.path.join(library, "Kontakt 8.1.0.exe"))
+    assert read(vst_path) == read(os.path.join(library, "Kontakt 8.1.0.vst3"))
+    assert leftovers(kvm.get_install_path()) == []
+    assert not os.path.exists(kvm.get_journal_path())
+
+class Crash(BaseException):
+    """
+    Stands in for the process dying, which no except clause of the load sees.
+    """
+
+def crash_mid_commit(library, monkeypatch):
+    fail_second_switch(monkeypatch, Crash())
+    with pytest.raises(Crash):
+        kvm.load_targets(kvm.get_profile_targets(8, "8.2.0", True, False), library, TextLog())
+    assert os.path.exists(kvm.get_journal_path())
+
+def test_interrupted_commit_is_completed_on_the_next_start(library, monkeypatch):
+    exe_path, vst_path, _ = kvm.get_default_install_paths(8)
+    crash_mid_commit(library, monkeypatch)
+    kvm.CONFIG_STORE = None
+    log = TextLog()
+    kvm.recover_load_transaction(log)
+    assert "Completed a load that was interrupted" in log.text()
+    assert read(exe_path) == read(os.path.join(library, "Kontakt 8.2.0.exe"))
+    assert read(vst_path) == read(os.path.join(library, "Kontakt 8.2.0.vst3"))
+    assert kvm.load_kontakt_version_from_config(8, ".vst3") == "Kontakt 8.2.0.vst3"
+    assert leftovers(kvm.get_install_path()) == []
+    assert not os.path.exists(kvm.get_journal_path())
+
+def test_interrupted_commit_missing_its_staged_file_is_undone(library, monkeypatch):
+    exe_path, vst_path, _ = kvm.get_default_install_paths(8)
+    crash_mid_commit(library, monkeypatch)
+    os.remove(kvm.get_staged_path(vst_path))
+    log = TextLog()
+    kvm.recover_load_transaction(log)
+    assert "Undid a load that was interrupted" in log.text()
+    assert read(exe_path) == read(os.path.join(library, "Kontakt 8.1.0.exe"))
+    assert read(vst_path) == read(os.path.join(library, "Kontakt 8.1.0.vst3"))
+    assert leftovers(kvm.get_install_path()) == []
+
+def test_interrupted_staging_is_cleaned_up(library):
+    exe_path, vst_path, _ = kvm.get_default_install_paths(8)
+    kvm.begin_load_transaction([exe_path, vst_path])
+    write(kvm.get_staged_path(exe_path), b"half written")
+    kvm.recover_load_transaction(TextLog())
+    assert read(exe_path) == read(os.path.join(library, "Kontakt 8.1.0.exe"))
+    assert leftovers(kvm.get_install_path()) == []
+    assert not os.path.exists(kvm.get_journal_path())
+
+def test_bundle_rollback_restores_the_installed_folder(tmp_path, monkeypatch):
+    library_path = str(tmp_path / "bundles")
+    os.makedirs(library_path)
+    exe_path, vst_path, _ = kvm.get_default_install_paths(8)
+    versions = {
+        "8.1.0": {"Contents/x86_64-win/Kontakt 8.vst3": b"binary 8.1.0" * 1000,
+                  "Contents/Resources/old/legacy.bin": b"dropped in 8.2.0",
+                  "Contents/Resources/shared.bin": b"unchanged" * 1000},
+        "8.2.0": {"Contents/x86_64-win/Kontakt 8.vst3": b"binary 8.2.0" * 1100,
+                  "Contents/Resources/new/added.bin": b"added in 8.2.0",
+                  "Contents/Resources/shared.bin": b"unchanged" * 1000},
+    }
+    log = TextLog()
+    for version, files in versions.items():
+        write_tree(vst_path, files)
+        write(exe_path, version.encode() * 1000)
+        assert kvm.store_kontakt(vst_path, library_path, version, 8, log), log.text()
+        assert kvm.store_kontakt(exe_path, library_path, version, 8, log), log.text()
+    write_tree(vst_path, versions["8.1.0"])
+    write(exe_path, b"8.1.0" * 1000)
+    installed = read_tree(vst_path)
+
+    # The bundle is switched first, then the exe fails
+    fail_second_switch(monkeypatch, PermissionError("Kontakt 8.exe is in use"))
+    targets = [(vst_path, ".vst3", 8, "8.2.0"), (exe_path, ".exe", 8, "8.2.0")]
+    assert not kvm.load_targets(targets, library_path, log)
+    assert read_tree(vst_path) == installed
+    assert read(exe_path) == b"8.1.0" * 1000
+    assert leftovers(kvm.get_install_path()) == []
+
+    assert kvm.load_targets(targets, library_path, log), log.text()
+    assert read_tree(vst_path)[0] == {os.path.join(*path.split("/")): content
+                                      for path, content in versions["8.2.0"].items()}
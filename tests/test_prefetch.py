@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+@pytest.fixture
+def prefetcher(monkeypatch):
+    """
+    A prefetcher with a short debounce whose passes are recorded instead of reading files.
+    """
+    monkeypatch.setattr(kvm, "PREFETCH_DEBOUNCE", 0.2)
+    passes = []
+    warmed = threading.Event()
+
+    def warm(self, versions, buffer, is_cancelled):
+        passes.append(versions)
+        warmed.set()
+
+    monkeypatch.setattr(kvm.LibraryPrefetcher, "warm", warm)
+    prefetcher = kvm.LibraryPrefetcher()
+    prefetcher.passes = passes
+    prefetcher.warmed = warmed
+    yield prefetcher
+    prefetcher.stop()
+    prefetcher.thread.join(1)
+
+def test_warms_the_wanted_version_then_the_recent_ones(prefetcher):
+    recent = ("library", 8, "8.1.0", False, False)
+    wanted = ("library", 8, "8.2.0", True, False)
+    prefetcher.remember(recent)
+    prefetcher.request(wanted)
+    assert prefetcher.warmed.wait(1)
+    assert prefetcher.passes == [[wanted, recent]]
+
+def test_cancel_during_the_debounce_starts_no_pass(prefetcher):
+    recent = ("library", 8, "8.1.0", False, False)
+    prefetcher.remember(recent)
+    prefetcher.request(("library", 8, "8.2.0", True, False))
+    # Pressing Load while the thread waits for typing to pause
+    time.sleep(kvm.PREFETCH_DEBOUNCE / 4)
+    prefetcher.cancel()
+    assert not prefetcher.warmed.wait(2 * kvm.PREFETCH_DEBOUNCE)
+    assert prefetcher.passes == []
+
+    # The thread is still there for the next request
+    wanted = ("library", 8, "8.3.0", False, False)
+    prefetcher.request(wanted)
+    assert prefetcher.warmed.wait(1)
+    assert prefetcher.passes == [[wanted, recent]]
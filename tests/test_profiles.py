@@ -0,0 +1,39 @@
+import json
+import os
+
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+class TextLog:
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, position, text):
+        self.lines.append(text)
+
+    def text(self):
+        return "".join(self.lines)
+
+DUPLICATE_MAJOR = [
+    {"kontakt_version": 8, "version": "8.1.0", "include_vst": True, "include_aax": False},
+    {"kontakt_version": 7, "version": "7.10.1", "include_vst": False, "include_aax": False},
+    {"kontakt_version": 8, "version": "8.2.0", "include_vst": False, "include_aax": False},
+]
+
+def test_saving_two_versions_of_one_kontakt_is_refused():
+    with pytest.raises(ValueError, match="Kontakt 8 is listed more than once"):
+        kvm.save_profile("studio", DUPLICATE_MAJOR)
+    assert "studio" not in kvm.load_profiles()
+
+    kvm.save_profile("studio", DUPLICATE_MAJOR[:2])
+    assert kvm.load_profiles()["studio"] == DUPLICATE_MAJOR[:2]
+
+def test_applying_a_hand_edited_profile_with_two_versions_of_one_kontakt(tmp_path):
+    library_path = tmp_path / "library"
+    library_path.mkdir()
+    kvm.get_config_store().set(kvm.PROFILES_SECTION, "studio", json.dumps({"name": "studio", "versions": DUPLICATE_MAJOR}))
+    log = TextLog()
+    assert not kvm.apply_profile("studio", str(library_path), log)
+    assert "Kontakt 8 is listed more than once" in log.text()
+    assert not os.path.exists(kvm.get_journal_path())
@@ -0,0 +1,42 @@
+import os
+
+import Kontakt_Version_Manager as kvm
+
+def write_settings(text):
+    path = kvm.get_config_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+def test_defaults_without_a_settings_file():
+    settings = kvm.load_config_settings()
+    assert settings["KeepUncompressed"] == 2
+    assert settings["LibraryBudgetGB"] == 0.0
+    assert settings["IncludeVST"] is True
+
+def test_settings_are_converted():
+    write_settings("[Settings]\nKeepUncompressed = 5\nLibraryBudgetGB = 1.5\nIncludeVST = no\nRemoteCacheMB = 100\n")
+    settings = kvm.load_config_settings()
+    assert settings["KeepUncompressed"] == 5
+    assert settings["LibraryBudgetGB"] == 1.5
+    assert settings["IncludeVST"] is False
+    assert settings["RemoteCacheMB"] == 100
+
+def test_bad_values_fall_back_to_the_defaults(capsys):
+    write_settings("[Settings]\nLibraryPath = D:\\\\Kontakt\nKeepUncompressed = two\nLibraryBudgetGB = 1,5\n"
+                   "PrefetchBudgetMB = \nDeltaKeyframeInterval = 8.5\nRemoteCacheMB = 4 GB\nAutoStore = sometimes\n")
+    settings = kvm.load_config_settings()
+    assert settings["LibraryPath"] == "D:\\\\Kontakt"
+    assert settings["KeepUncompressed"] == 2
+    assert settings["LibraryBudgetGB"] == 0.0
+    assert settings["PrefetchBudgetMB"] == 512
+    assert settings["DeltaKeyframeInterval"] == 8
+    assert settings["RemoteCacheMB"] == 4096
+    assert settings["AutoStore"] is False
+
+    reported = capsys.readouterr().err
+    assert "'KeepUncompressed = two' is not valid, using 2" in reported
+    assert "'AutoStore = sometimes' is not valid, using False" in reported
+    # Each bad value is reported once, not on every read
+    kvm.load_config_settings()
+    assert capsys.readouterr().err == ""
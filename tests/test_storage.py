@@ -0,0 +1,208 @@
+import json
+import os
+import random
+import zlib
+
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+class TextLog:
+    def __init__(self):
+        self.lines = []
+
+    def insert(self, position, text):
+        self.lines.append(text)
+
+    def text(self):
+        return "".join(self.lines)
+
+def make_releases(count, size=3 * 1024 * 1024, seed=8):
+    """
+    Returns the binaries of count neighbouring point releases: each one is the previous one
+    with two small ranges rewritten, like a rebuilt binary.
+    """
+    rng = random.Random(seed)
+    releases = [rng.randbytes(size)]
+    for _ in range(count - 1):
+        content = bytearray(releases[-1])
+        for _ in range(2):
+            offset = rng.randrange(size - 4096)
+            content[offset:offset + 4096] = rng.randbytes(4096)
+        releases.append(bytes(content))
+    return releases
+
+@pytest.fixture
+def library(tmp_path):
+    library_path = tmp_path / "library"
+    library_path.mkdir()
+    return str(library_path)
+
+def store(library, version, content, storage_mode):
+    """
+    Installs content as the Kontakt 8 exe and stores it as version with storage_mode.
+    """
+    exe_path = kvm.get_default_install_paths(8)[0]
+    os.makedirs(os.path.dirname(exe_path), exist_ok=True)
+    with open(exe_path, "wb") as f:
+        f.write(content)
+    log = TextLog()
+    assert kvm.store_kontakt(exe_path, library, version, 8, log, storage_mode), log.text()
+    return log.text()
+
+def restore(library, version, tmp_path):
+    """
+    Returns the content of a library version as a load writes it.
+    """
+    index = kvm.get_library_index(library)
+    destination = str(tmp_path / "restored.exe")
+    kvm.restore_library_entry(index, f"Kontakt {version}.exe", destination)
+    with open(destination, "rb") as f:
+        return f.read()
+
+def write_source(library, content):
+    path = os.path.join(os.path.dirname(library), "source.exe")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+def load(library, version):
+    """
+    Loads a version over a different installed Kontakt 8 exe and returns what was installed.
+    """
+    exe_path = kvm.get_default_install_paths(8)[0]
+    with open(exe_path, "wb") as f:
+        f.write(b"another version")
+    log = TextLog()
+    kvm.copy_kontakt(library, exe_path, ".exe", version, 8, log)
+    assert f"Kontakt {version}.exe loaded" in log.text(), log.text()
+    with open(exe_path, "rb") as f:
+        return f.read()
+
+def test_chunk_store_round_trip(library, tmp_path):
+    releases = make_releases(3)
+    for number, content in enumerate(releases):
+        store(library, f"8.0.{number}", content, "chunked")
+    assert sorted(os.listdir(library)) == [kvm.CHUNK_STORE_DIR]
+
+    index = kvm.get_library_index(library)
+    for number, content in enumerate(releases):
+        assert index.find(f"Kontakt 8.0.{number}.exe")["format"] == "chunked"
+        assert restore(library, f"8.0.{number}", tmp_path) == content
+    assert load(library, "8.0.1") == releases[1]
+
+def test_chunk_store_shares_chunks_between_releases(library):
+    first, second = make_releases(2)
+    chunk_count, new_chunks, _ = kvm.store_file_chunked(write_source(library, first), library, "Kontakt 8.0.0.exe")
+    assert new_chunks == chunk_count
+    chunk_count, new_chunks, bytes_written = kvm.store_file_chunked(write_source(library, second), library, "Kontakt 8.0.1.exe")
+    assert new_chunks < chunk_count
+    assert bytes_written < len(second) / 2
+
+def test_damaged_chunk_is_detected_on_restore(library, tmp_path):
+    content = make_releases(1)[0]
+    store(library, "8.0.0", content, "chunked")
+    with open(os.path.join(kvm.get_manifest_dir(library), "Kontakt 8.0.0.exe.json"), "r", encoding="utf-8") as f:
+        chunk_hash = json.load(f)["chunks"][0][0]
+    with open(kvm.get_chunk_path(library, chunk_hash), "r+b") as f:
+        f.write(b"\0" * 16)
+    with pytest.raises(IOError):
+        restore(library, "8.0.0", tmp_path)
+    assert not os.path.exists(tmp_path / "restored.exe")
+
+@pytest.mark.parametrize("codec_name", sorted(kvm.COMPRESSION_CODECS))
+def test_compressed_file_round_trip(library, tmp_path, codec_name):
+    # Compressible, like the code and resources of a real binary
+    content = make_releases(1, 512 * 1024)[0] + bytes(range(256)) * 4096
+    source = write_source(library, content)
+    compressed_path = kvm.get_compressed_path(library, "Kontakt 8.0.0.exe")
+    assert kvm.compress_file(source, compressed_path, codec_name) < len(content)
+    destination = str(tmp_path / "restored.exe")
+    kvm.decompress_file(compressed_path, destination)
+    with open(destination, "rb") as f:
+        assert f.read() == content
+    assert os.path.getmtime(destination) == os.path.getmtime(source)
+
+def test_compressed_storage_round_trip(library, tmp_path):
+    releases = make_releases(3)
+    for number, content in enumerate(releases):
+        store(library, f"8.0.{number}", content, "compressed")
+    kvm.apply_compression_policy(library, "zlib", 1, TextLog())
+
+    index = kvm.get_library_index(library)
+    formats = [index.find(f"Kontakt 8.0.{number}.exe")["format"] for number in range(3)]
+    assert formats == ["compressed", "compressed", "files"]
+    for number, content in enumerate(releases):
+        assert restore(library, f"8.0.{number}", tmp_path) == content
+    assert load(library, "8.0.0") == releases[0]
+
+def test_damaged_compressed_entry_is_detected_on_restore(library, tmp_path):
+    store(library, "8.0.0", make_releases(1)[0], "compressed")
+    store(library, "8.0.1", make_releases(1, seed=9)[0], "compressed")
+    kvm.apply_compression_policy(library, "zlib", 1, TextLog())
+    compressed_path = kvm.get_compressed_path(library, "Kontakt 8.0.0.exe")
+    with open(compressed_path, "r+b") as f:
+        f.seek(kvm.COMPRESSED_HEADER_SIZE + 1000)
+        f.write(b"\0" * 64)
+    # Caught by the codec's own check, or else by the hash recorded when it was compressed
+    with pytest.raises((IOError, zlib.error)):
+        restore(library, "8.0.0", tmp_path)
+    assert not os.path.exists(tmp_path / "restored.exe")
+
+def test_delta_storage_round_trip_with_keyframes(library, tmp_path):
+    kvm.get_config_store().set("Settings", "DeltaKeyframeInterval", "3")
+    releases = make_releases(5)
+    for number, content in enumerate(releases):
+        store(library, f"8.0.{number}", content, "delta")
+
+    index = kvm.get_library_index(library)
+    formats = [index.find(f"Kontakt 8.0.{number}.exe")["format"] for number in range(5)]
+    assert formats == ["files", "delta", "delta", "files", "delta"]
+    assert [kvm.get_delta_depth(index, f"Kontakt 8.0.{number}.exe") for number in range(5)] == [0, 1, 2, 0, 1]
+    assert os.path.getsize(kvm.get_delta_path(library, "Kontakt 8.0.1.exe")) < len(releases[1]) / 2
+    for number, content in enumerate(releases):
+        assert restore(library, f"8.0.{number}", tmp_path) == content
+    assert load(library, "8.0.2") == releases[2]
+
+def test_delta_over_a_compressed_base(library, tmp_path):
+    first, second = make_releases(2)
+    store(library, "8.0.0", first, "compressed")
+    kvm.apply_compression_policy(library, "zlib", 0, TextLog())
+    assert kvm.get_library_index(library).find("Kontakt 8.0.0.exe")["format"] == "compressed"
+
+    assert "Stored as a delta of Kontakt 8.0.0.exe" in store(library, "8.0.1", second, "delta")
+    assert restore(library, "8.0.1", tmp_path) == second
+    assert load(library, "8.0.1") == second
+
+def test_delta_whose_base_is_archived(library, tmp_path):
+    archive_path = str(tmp_path / "archive")
+    kvm.get_config_store().set("Settings", "ArchivePath", archive_path)
+    first, second = make_releases(2)
+    store(library, "8.0.0", first, "delta")
+    store(library, "8.0.1", second, "delta")
+    index = kvm.get_library_index(library)
+    kvm.archive_library_entry(index, "Kontakt 8.0.1.exe", archive_path)
+    # The base goes last, compressed on its way into the archive
+    kvm.archive_library_entry(index, "Kontakt 8.0.0.exe", archive_path, "zlib")
+    index.refresh()
+    assert index.find("Kontakt 8.0.0.exe") is None and index.find("Kontakt 8.0.1.exe") is None
+
+    assert load(library, "8.0.1") == second
+    assert index.find("Kontakt 8.0.0.exe")["format"] == "files"
+    assert restore(library, "8.0.0", tmp_path) == first
+
+def test_delta_keyframes_record_their_checksum(library, monkeypatch):
+    first, second = make_releases(2)
+    assert "Stored as a full keyframe" in store(library, "8.0.0", first, "delta")
+    store(library, "8.0.1", second, "delta")
+    content_hash = kvm.hash_file(os.path.join(library, "Kontakt 8.0.0.exe"))
+    assert kvm.load_library_checksums(library) == {"Kontakt 8.0.0.exe": content_hash}
+
+    def unexpected_read(path, progress=None):
+        raise AssertionError(f"{path} was hashed again")
+
+    # The fingerprint recorded at store time answers the first lookup
+    monkeypatch.setattr(kvm, "hash_file", unexpected_read)
+    kvm.FINGERPRINT_CACHE = None
+    kvm.LIBRARY_INDEXES.clear()
+    assert kvm.get_library_index(library).content_hash("Kontakt 8.0.0.exe") == content_hash
@@ -0,0 +1,54 @@
+import pytest
+
+import Kontakt_Version_Manager as kvm
+
+def test_reads_the_version_resource(tmp_path, make_pe):
+    path = make_pe(str(tmp_path / "Kontakt 8.exe"), "8.2.0.3", "8.2.0")
+    assert kvm.read_pe_version(path) == {"product_version": "8.2.0", "file_version": "8.2.0.3"}
+
+def test_file_without_pe_header_has_no_version(tmp_path):
+    path = tmp_path / "Kontakt 8.exe"
+    path.write_bytes(b"not a windows binary" * 100)
+    assert kvm.read_pe_version(str(path)) is None
+    assert kvm.format_pe_version(None) == "no version resource"
+
+@pytest.mark.parametrize("version, matches", [
+    ("8.2.0", True),
+    ("8.2", True),
+    ("8.2 beta", True),
+    ("8.2.0.3", True),
+    ("8.3.0", False),
+    ("7.2.0", False),
+    ("beta", False),
+])
+def test_version_matches(tmp_path, make_pe, version, matches):
+    version_info = kvm.read_pe_version(make_pe(str(tmp_path / "Kontakt 8.exe"), "8.2.0.3", "8.2.0"))
+    assert kvm.version_matches(version, version_info) is matches
+
+def test_detector_answers_unchanged_files_from_its_cache(tmp_path, make_pe, monkeypatch):
+    path = make_pe(str(tmp_path / "Kontakt 8.exe"))
+    assert kvm.get_version_detector().detect(path)["product_version"] == "8.2.0"
+    assert (tmp_path / "config" / "version_cache.json").is_file()
+
+    def unexpected_read(path):
+        raise AssertionError("an unchanged file was read again")
+
+    monkeypatch.setattr(kvm, "read_pe_version", unexpected_read)
+    kvm.VERSION_DETECTOR = None
+    assert kvm.get_version_detector().detect(path)["product_version"] == "8.2.0"
+
+def test_detector_reads_a_changed_file_again(tmp_path, make_pe):
+    path = make_pe(str(tmp_path / "Kontakt 8.exe"), "8.2.0.3", "8.2.0")
+    assert kvm.get_version_detector().detect(path)["product_version"] == "8.2.0"
+    make_pe(path, "8.3.1.7", "8.3.1")
+    assert kvm.get_version_detector().detect(path)["product_version"] == "8.3.1"
+
+def test_detects_library_entries_in_the_chunk_store(tmp_path, make_pe):
+    library_path = tmp_path / "library"
+    library_path.mkdir()
+    source = make_pe(str(tmp_path / "Kontakt 8.exe"), "8.1.0.0", "8.1.0")
+    kvm.store_file_chunked(source, str(library_path), "Kontakt 8.1.0.exe")
+    index = kvm.get_library_index(str(library_path))
+    assert index.find("Kontakt 8.1.0.exe")["format"] == "chunked"
+    version_info = kvm.get_version_detector().detect_library_entry(index, "Kontakt 8.1.0.exe")
+    assert kvm.version_matches("8.1.0", version_info)